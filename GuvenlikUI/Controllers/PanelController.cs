@@ -71,12 +71,28 @@ namespace GuvenlikUI.Controllers {
         }
 
         // Ana dashboard
-        public IActionResult AdminDashboard(){
+        public async Task<IActionResult> AdminDashboard(){
             // Sadece admin ve security girebilsin
             var role = HttpContext.Session.GetString("UserRole");
             if (role != "Admin" && role != "Security") return RedirectToAction("Login", "Account");
 
-            return View();
+            // Son 24 saatin istatistikleri (saatlik)
+            var stats = new TrafficStatsModel();
+            var token = HttpContext.Session.GetString("JWToken");
+            _httpClient.DefaultRequestHeaders.Authorization = new AuthenticationHeaderValue("Bearer", token);
+
+            try {
+                var response = await _httpClient.GetAsync($"{_pythonApiUrl}/admin/stats?bucket=hour&top=5");
+                if (response.IsSuccessStatusCode){
+                    var jsonString = await response.Content.ReadAsStringAsync();
+                    stats = JsonConvert.DeserializeObject<TrafficStatsModel>(jsonString);
+                }
+            }
+            catch (HttpRequestException) {
+                // API kapalıysa panel istatistiksiz açılır
+            }
+
+            return View(stats);
         }
         
 
@@ -6,6 +6,7 @@ namespace GuvenlikUI.Models {
         public string vlm_description {get; set;}
         public DateTime timestamp {get; set;}
         public string related_user {get; set;} // Python'dan gelen kullanıcı adı
+        public double? match_distance {get; set;} // Yakın eşleşmeyle kabul edildiyse OCR uzaklığı
     }
 
     public class AdminPlateModel {
@@ -14,4 +15,32 @@ namespace GuvenlikUI.Models {
         public DateTime created_at {get; set;}
         public string owner_username {get; set;} // Plakayı kim ekledi?
     }
+
+    // /admin/stats cevabı
+    public class TrafficBucketModel {
+        public DateTime start {get; set;}
+        public int allowed {get; set;}
+        public int denied {get; set;}
+    }
+
+    public class TrafficTotalsModel {
+        public int allowed {get; set;}
+        public int denied {get; set;}
+        public double? allowed_ratio {get; set;}
+    }
+
+    public class PlateStatModel {
+        public string plate {get; set;}
+        public int visits {get; set;}
+        public int allowed {get; set;}
+        public int denied {get; set;}
+        public DateTime last_seen {get; set;}
+    }
+
+    public class TrafficStatsModel {
+        public List<TrafficBucketModel> series {get; set;} = new List<TrafficBucketModel>();
+        public TrafficTotalsModel totals {get; set;} = new TrafficTotalsModel();
+        public List<PlateStatModel> top_plates {get; set;} = new List<PlateStatModel>();
+        public List<PlateStatModel> repeat_guests {get; set;} = new List<PlateStatModel>();
+    }
 }
\ No newline at end of file
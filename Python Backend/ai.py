@@ -1,78 +1,236 @@
+import asyncio
 import cv2
-import torch
+import numpy as np
 import time
+import threading
 import os
 import re
 from datetime import datetime
-from collections import Counter, deque
-from ultralytics import YOLO
-from PIL import Image 
-import google.generativeai as genai 
 
-from database import SessionLocal, AllowedPlate, AccessLog, User # Veritabanı bağlantıları
+from log_writer import log_writer
+from plate_index import allowlist_index
+from plate_match import constrain_plate
+from tracker import VehicleTracker
+from motion import MotionGate
+import detect_input
+from ocr_scheduler import OCRScheduler
+from model_backends import load_model
+from pipeline import FramePipeline, STREAM_TIERS
+from stage_timer import StageTimer
+from vlm_worker import GeminiBackend, FakeVLMBackend, VLMWorkerPool, VLM_PENDING_TEXT, VLM_FAILED_TEXT
+
+# Ağır kütüphaneler (torch, ultralytics, easyocr, Gemini) modül yüklenirken değil,
+# load_models() çağrıldığında yüklenir. Böylece API hemen ayağa kalkar.
 
 OCR_TYPE = "Easy" # varsayılanOCR modeli seçimi
+ALWAYS_DETECT = False # İzleyen olmasa da kamera ve tespit çalışmaya devam etsin mi?
+CAMERA_SOURCES = [0] # Kapı kameraları: cihaz indeksi, video dosyası veya RTSP adresi (sıra = kamera numarası)
+MODEL_BACKEND = "auto" # "auto", "pt", "engine" (TensorRT), "onnx", "openvino", "openvino-int8"
+MOTION_GATING = True # Hareket yoksa araç tespiti atlansın mı?
+STILL_DETECT_INTERVAL = 1.0 # Sahne durgunken takipteki (ör. park etmiş) araçlar için tespit en fazla bu aralıkla yenilenir (sn)
+MOTION_ROI = {} # Kamera numarası -> şerit poligonu, 0-1 arası oranlar. Örn: {0: [(0.2, 0.4), (0.8, 0.4), (1.0, 1.0), (0.0, 1.0)]}
+VEHICLE_IMGSZ = 640 # Araç modeli girdi boyutu (uzun kenar). Kare bu boyuta küçültülüp verilir, kutular tam çözünürlüğe çevrilir. None: kare olduğu gibi
+PLATE_IMGSZ = 640 # Plaka modeli girdi boyutu (tam çözünürlüklü araç kırpıntısı)
+DETECT_ROI = {} # Kamera numarası -> (x1, y1, x2, y2), 0-1 arası oranlar. Araç tespiti sadece bu dikdörtgende yapılır. Örn: {0: (0.1, 0.3, 0.9, 1.0)}
+PLATE_MATCH_THRESHOLD = 0.6 # İzinli plakaya en fazla bu uzaklıkta okuma kabul edilir (0: sadece tam eşleşme). 0/O gibi karışıklık 0.3, en fazla iki tane
+PLATE_INDEL_THRESHOLD = 0.8 # Düzene uymayan okumada eksik / fazla bir karakter (0.8) de affedilir. Düzene uyan okumada asla
 os.environ["KMP_DUPLICATE_LIB_OK"] = "True"
 
 GEMINI_API_KEY = "Gemini_api_key"
+VLM_BACKEND = "Gemini" # "Gemini" ya da "Fake" (ağ bağlantısı olmadan test için sahte VLM)
+VLM_WORKERS = 2 # Aynı anda en fazla kaç VLM isteği atılsın
 
-try:
-    genai.configure(api_key = GEMINI_API_KEY)
-    vlm_model = genai.GenerativeModel('gemini-2.5-flash')
-    VLM_ACTIVE = True
-
-except Exception as e:
-    print(f"Gemini API başlatılamadı: {e}")
-    VLM_ACTIVE = False
+def create_vlm_backend():
+    """Seçilen VLM'i başlatır. Başlatılamazsa None döner."""
+    try:
+        if VLM_BACKEND == "Fake":
+            return FakeVLMBackend()
+        return GeminiBackend(GEMINI_API_KEY)
 
-print(f"Seçilen OCR Motoru: {OCR_TYPE}")
-print(f"VLM Durumu: {"Aktif" if VLM_ACTIVE else "Pasif"}")
+    except Exception as e:
+        print(f"Gemini API başlatılamadı: {e}")
+        return None
 
-# Rapid seçildiyse
-if OCR_TYPE == "Rapid":
-    from rapidocr_onnxruntime import RapidOCR
+class CameraState:
+    """
+    Her kameranın kendi araç takibi. Kameralar birbirinin oylamasını bozmasın diye ayrı tutulur.
+    """
 
-# easyocr seçildiyse
-elif OCR_TYPE == "Easy":
-    import easyocr
+    def __init__(self, camera_id = 0):
+        self.camera_id = camera_id
+        self.tracker = VehicleTracker(max_age = 3.0) # 3 saniye görülmeyen araç unutulur
+        self.motion_gate = MotionGate(roi = MOTION_ROI.get(camera_id)) if MOTION_GATING else None
+        self.detect_roi = DETECT_ROI.get(camera_id)
+        self.frame_count = 0
+        self.skipped_frames = 0 # Hareket olmadığı için tespit yapılmayan kareler
+        self.last_detect = None # Son araç tespitinin kare zamanı
 
 class AccessControlSystem:
 
-    def __init__(self, vehicle_weights = "weights/yolo26m.pt", plate_weights = "weights/best_plate.pt", use_gpu = True):
+    def __init__(self, vehicle_weights = "weights/yolo26m.pt", plate_weights = "weights/best_plate.pt", use_gpu = True, camera_sources = None, lazy = False, use_vlm = True):
+        """
+        lazy = True ise modeller burada yüklenmez; load_models() veya start_background_load() ile yüklenir.
+        use_vlm = False ise araç tanımı (VLM) hiç başlatılmaz.
+        """
+        self.vehicle_weights = vehicle_weights
+        self.plate_weights = plate_weights
+        self.use_gpu = use_gpu
+        self.use_vlm = use_vlm
+
+        self.device = None
+        self.vehicle_model = None
+        self.vehicle_backend = None
+        self.plate_model = None
+        self.plate_backend = None
+        self.reader = None
+        self.vlm_backend = None
+
+        # Model başına yükleme durumu: pending / loading / ready / error
+        self.model_status = {name: {"state": "pending", "seconds": None, "error": None}
+                             for name in ("vehicle", "plate", "ocr", "vlm", "warmup")}
+        self.ready_event = threading.Event()
+        self.load_error = None
+        self.load_lock = threading.Lock()
+        self.load_thread = None
 
-        print("\nSistem başlatılıyor... ")
-        
-        self.device = "cuda" if torch.cuda.is_available() and use_gpu else "cpu"
-        print(f"Donanım: {self.device.upper()}")
+        self.vehicle_classes = [2, 3, 5, 7] 
+        self.vehicle_imgsz = VEHICLE_IMGSZ
+        self.plate_imgsz = PLATE_IMGSZ
+        self.camera_states = {} # Kamera numarası -> CameraState
+        self.detect_seconds = 0.0 # Kare başına araç tespiti süresi (üstel ortalama)
+        self.gate_seconds = 0.0 # Hareket kontrolüne harcanan toplam süre
+        self.stage_timer = StageTimer() # Aşama başına süreler (bench_pipeline.py, /admin/ai-stats)
 
-        if not os.path.exists("weights"):
-            os.makedirs("weights")
+        self.cooldown_tracker = {} 
+        self.cooldown_seconds = 10.0
+        self.ocr_scheduler = OCRScheduler() # OCR ne zaman ve hangi plaka görüntüsüyle çalışacak
+        self.ocr_reads = 0 # Geçerli plaka formatında okuma sayısı
+        self.cooldown_suppressed = 0 # Bekleme süresi yüzünden kaydedilmeyen kesinleşmiş plaka (araç başına bir kez)
 
-        # Araç tespit modeli
-        print(f"Araç modeli yükleniyor...")
-        self.vehicle_model = YOLO(vehicle_weights) 
+        self.camera_sources = list(camera_sources) if camera_sources is not None else list(CAMERA_SOURCES)
+        self.pipeline = None # Tüm kameralar için tek boru hattı
+        self.pipeline_lock = threading.Lock()
 
-        # Plaka tespit modeli
-        print(f"Plaka Modeli Yükleniyor...")
-        self.plate_model = YOLO(plate_weights)
+        # Araç tanımlama arka planda yapılır, log kaydı sonuç gelince güncellenir
+        self.vlm_worker = None
 
-        # OCR modeli
-        print(f"OCR Başlatılıyor... ({OCR_TYPE})")
+        self.event_listeners = [] # Kapı olayı dinleyicileri (events.py, ayrı süreçte paylaşılan bellek yayını)
+        self.write_logs = True # False: kararlar sadece olay olarak yayınlanır, veritabanına yazılmaz (offline_scan.py raporu)
 
-        if OCR_TYPE == "Rapid":
-            self.reader = RapidOCR()
-        else:
-            self.reader = easyocr.Reader(["en"], gpu = (self.device == "cuda"))
+        if not lazy:
+            self.load_models()
 
-        self.vehicle_classes = [2, 3, 5, 7] 
-        self.plate_history = deque(maxlen = 20) 
-        self.stable_plate = None              
-        self.mismatch_count = 0               
-        self.last_read_time = time.time()     
-
-        self.cooldown_tracker = {} 
-        self.cooldown_seconds = 10.0
-        self.frame_count = 0
+    def _load_step(self, name, loader):
+        """Tek bir modeli yükler, süresini ve hatasını kaydeder."""
+        status = self.model_status[name]
+        status["state"] = "loading"
+        start = time.perf_counter()
+        try:
+            loader()
+            status["state"] = "ready"
+        except Exception as e:
+            status["state"] = "error"
+            status["error"] = str(e)
+            raise
+        finally:
+            status["seconds"] = round(time.perf_counter() - start, 2)
+
+    def load_models(self, warmup = True):
+        """Tüm modelleri yükler ve isteğe bağlı olarak boş bir kare ile ısıtır."""
+        with self.load_lock:
+            if self.ready_event.is_set():
+                return
+
+            print("\nSistem başlatılıyor... ")
+            import torch
+
+            self.device = "cuda" if torch.cuda.is_available() and self.use_gpu else "cpu"
+            print(f"Donanım: {self.device.upper()}")
+
+            if not os.path.exists("weights"):
+                os.makedirs("weights")
+
+            # Araç tespit modeli (format MODEL_BACKEND ile seçilir, auto ise dışa aktarılmış dosyalara bakılır)
+            def load_vehicle():
+                print(f"Araç modeli yükleniyor...")
+                self.vehicle_model, self.vehicle_backend = load_model(self.vehicle_weights, MODEL_BACKEND, self.device)
+
+            # Plaka tespit modeli
+            def load_plate():
+                print(f"Plaka Modeli Yükleniyor...")
+                self.plate_model, self.plate_backend = load_model(self.plate_weights, MODEL_BACKEND, self.device)
+
+            # OCR modeli
+            def load_ocr():
+                print(f"OCR Başlatılıyor... ({OCR_TYPE})")
+                if OCR_TYPE == "Rapid":
+                    from rapidocr_onnxruntime import RapidOCR
+                    self.reader = RapidOCR()
+                else:
+                    import easyocr
+                    self.reader = easyocr.Reader(["en"], gpu = (self.device == "cuda"))
+
+            def load_vlm():
+                self.vlm_backend = create_vlm_backend() if self.use_vlm else None
+                print(f"VLM Durumu: {'Aktif' if self.vlm_backend else 'Pasif'}")
+                if self.vlm_backend:
+                    self.vlm_worker = VLMWorkerPool(self.vlm_backend, self.update_vlm_description, workers = VLM_WORKERS,
+                                                    timer = self.stage_timer)
+
+            self._load_step("vehicle", load_vehicle)
+            self._load_step("plate", load_plate)
+            self._load_step("ocr", load_ocr)
+            self._load_step("vlm", load_vlm)
+
+            if warmup:
+                self._load_step("warmup", self.warmup)
+            else:
+                self.model_status["warmup"]["state"] = "skipped"
+
+            self.ready_event.set()
+            print("Yapay zeka modelleri hazır")
+
+    def warmup(self):
+        """Boş karelerle bir tur çıkarım yapar, ilk gerçek karede çekirdek derleme beklenmesin."""
+        dummy_frame = np.zeros((640, 640, 3), dtype = np.uint8)
+        dummy_crop = np.zeros((240, 320, 3), dtype = np.uint8)
+        dummy_plate = np.zeros((40, 160, 3), dtype = np.uint8)
+
+        self.detect_vehicles([detect_input.prepare(dummy_frame, self.vehicle_imgsz)[0]])
+        self.detect_plates([dummy_crop])
+        self.perform_ocr(dummy_plate)
+
+    def detect_vehicles(self, images):
+        """yolo26m (Araç tespiti). Düşük güvenli kutular takibi sürdürmek için alınır."""
+        options = {"imgsz": self.vehicle_imgsz} if self.vehicle_imgsz else {}
+        return self.vehicle_model(images, classes = self.vehicle_classes, conf = 0.25, verbose = False, device = self.device, **options)
+
+    def detect_plates(self, crops):
+        """yolo26s (Plaka tespiti, kırpılmış araç görüntülerini alır.)"""
+        options = {"imgsz": self.plate_imgsz} if self.plate_imgsz else {}
+        return self.plate_model(crops, conf = 0.2, verbose = False, device = self.device, **options)
+
+    def start_background_load(self, then = None):
+        """Modelleri arka planda yükler. API bu sırada istek karşılamaya devam eder."""
+        def run():
+            try:
+                self.load_models()
+            except Exception as e:
+                self.load_error = str(e)
+                print(f"AI Sistem başlatılamadı: {e}")
+                return
+            if then is not None:
+                then()
+
+        if self.load_thread is None:
+            self.load_thread = threading.Thread(target = run, name = "model-loader", daemon = True)
+            self.load_thread.start()
+
+    def is_ready(self):
+        return self.ready_event.is_set()
+
+    def readiness(self):
+        return {"ready": self.is_ready(), "device": self.device, "error": self.load_error, "models": self.model_status}
 
     # Tespit edilen plakada regex temizliği 
     def clean_plate_text(self, text):
@@ -81,15 +239,16 @@ class AccessControlSystem:
 
         if re.match(r'^\d{2}[A-Z]{1,3}\d{2,5}$', clean_text): #2 nümerik - 1-3 alfabetik - 2-5 nümerik karakter
             return clean_text
-        
-        return None
 
-    def get_best_plate(self):
-        if not self.plate_history: return None
-        most_common = Counter(self.plate_history).most_common(1)
-        plate, count = most_common[0]
-        if count > 2: return plate 
-        return None
+        # Düzene uymuyorsa harf / rakam yerlerindeki karışık karakterleri çevir (34AB0I2 -> 34AB012)
+        return constrain_plate(clean_text)
+
+    def get_camera_state(self, camera_id = 0):
+        state = self.camera_states.get(camera_id)
+        if state is None:
+            state = CameraState(camera_id)
+            self.camera_states[camera_id] = state
+        return state
 
     def perform_ocr(self, plate_crop):
         raw_text = ""
@@ -110,169 +269,342 @@ class AccessControlSystem:
 
     def get_vehicle_description(self, vehicle_img_array):
         """
-        Kırpılmış araç görüntüsünü VLM'e gönderir ve yorum alır.
+        Kırpılmış araç görüntüsünü VLM'e gönderir ve yorum alır. (Senkron, bekletir)
         """
-        if not VLM_ACTIVE:
+        if self.vlm_backend is None:
             return "VLM Kapalı"
         
         try:
-            rgb_img = cv2.cvtColor(vehicle_img_array, cv2.COLOR_BGR2RGB) # BGR - RGB dönüşümü
-            pil_img = Image.fromarray(rgb_img) # Numpy Array - PIL Image
-            
-            prompt = """
-            Bu aracı kısaca tanımla. Sadece Marka, Model (tahmini), Renk ve Kasa Tipi (Sedan/Hatchback/SUV/Kamyon) bilgisini Türkçe olarak, 
-            virgülle ayırarak kısaca yaz. 
-            Örnek: Beyaz, Toyota Corolla, Sedan.
-            """
-            response = vlm_model.generate_content([prompt, pil_img])
-            return response.text.strip()
+            with self.stage_timer.measure("vlm_describe"):
+                return self.vlm_backend.describe(vehicle_img_array)
         except Exception as e:
             print(f"VLM Analizinde Hata: {e}")
-            return "Tanımlanamadı"
+            return VLM_FAILED_TEXT
+
+    def update_vlm_description(self, log_id, vlm_desc):
+        """VLM sonucu geldiğinde mevcut log kaydını günceller."""
+        log_writer.update_description(log_id, vlm_desc)
+        self.publish_event({"type": "description", "log_id": log_id, "vlm_description": vlm_desc})
+        print(f"Araç tanımı (log {log_id}): {vlm_desc}")
 
-    def check_database(self, plate_text, vlm_desc):
-        """Veritabanı sorgusu yapar ve log yazar."""
-        db = SessionLocal()
+    def check_database(self, plate_text, vlm_desc, timestamp = None, camera_id = None):
+        """
+        İzin kontrolü yapar ve logu yazıcı kuyruğuna bırakır. (izin durumu, sahip, log id) döner.
+        Log diske arka planda toplu olarak yazılır, kapı kararı beklemez.
+        timestamp verilmezse şimdiki zaman (kayıttan taramada karenin çekildiği zaman verilir).
+        """
         try:
-            allowed = db.query(AllowedPlate).filter(AllowedPlate.plate_number == plate_text).first() # İzin kontrolü
+            # İzin kontrolü (bellekten). Tam eşleşme yoksa OCR karışıklığı toleransıyla en yakın izinli plaka
+            allowed = allowlist_index.match(plate_text, PLATE_MATCH_THRESHOLD, PLATE_INDEL_THRESHOLD)
             
             access_status = False
             owner_name = "Misafir"
             user_id = None
+            matched_plate = None
+            match_distance = None
             
             if allowed:
                 access_status = True
-                user_id = allowed.user_id
-                user = db.query(User).filter(User.id == user_id).first()
-                if user:
-                    owner_name = user.username
+                user_id, owner_name, matched_plate, match_distance = allowed
+                if match_distance > 0:
+                    print(f"Yakın eşleşme: {plate_text} -> {matched_plate} (uzaklık {match_distance})")
 
             # Loglama 
-            new_log = AccessLog(
-                plate_number = plate_text,
-                access_status = access_status,
-                vlm_description = vlm_desc,
-                related_user_id = user_id,
-                timestamp = datetime.now()
-            )
-            db.add(new_log)
-            db.commit()
+            timestamp = timestamp or datetime.now()
+            log_id = None
+            if self.write_logs:
+                log_id = log_writer.submit(
+                    plate_number = plate_text,
+                    access_status = access_status,
+                    vlm_description = vlm_desc,
+                    related_user_id = user_id,
+                    timestamp = timestamp,
+                    matched_plate = matched_plate,
+                    match_distance = match_distance
+                )
+
+            # Güvenlik ekranına anında bildirim
+            self.publish_event({
+                "type": "access",
+                "log_id": log_id,
+                "camera": camera_id,
+                "plate": plate_text,
+                "status": access_status,
+                "owner": owner_name,
+                "matched_plate": matched_plate,
+                "match_distance": match_distance,
+                "vlm_description": vlm_desc,
+                "time": timestamp.strftime("%H:%M:%S"),
+                "timestamp": timestamp.isoformat(),
+            })
             
-            return access_status, owner_name
+            return access_status, owner_name, log_id
             
         except Exception as e:
             print(f"Veritabanı Hatası: {e}")
-            return False, "HATA"
-        
-        finally:
-            db.close()
+            return False, "HATA", None
 
-    def process_frame(self, frame):
-        self.frame_count += 1
-        
-        # 3 saniye boyunca araç tespit edilmezse hafıza sıfırlansın
-        if time.time() - self.last_read_time > 3.0:
-            if self.stable_plate:
-                self.plate_history.clear()
-                self.stable_plate = None
-                self.mismatch_count = 0
-
-        # yolo26m (Araç tespiti ve kırpma)
-        results = self.vehicle_model(frame, classes = self.vehicle_classes, conf = 0.5, verbose = False, device = self.device)[0]
-        
-        best_vehicle_box = None
-        max_vehicle_area = 0
+    def publish_event(self, event):
+        for listener in self.event_listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                print(f"Olay yayınlanamadı: {e}")
 
-        for box in results.boxes:
-            x1, y1, x2, y2 = map(int, box.xyxy[0])
-            area = (x2 - x1) * (y2 - y1)
-            if area > max_vehicle_area:
-                max_vehicle_area = area
-                best_vehicle_box = (x1, y1, x2, y2)
+    def process_frame(self, frame, camera_id = 0):
+        return self.process_batch([frame], [camera_id])[0]
 
-        if best_vehicle_box and max_vehicle_area > 5000:
-            vx1, vy1, vx2, vy2 = best_vehicle_box
-            vehicle_crop = frame[vy1:vy2, vx1:vx2] # Araç görüntüsünü kırp
+    def process_batch(self, frames, camera_ids, timestamps = None, draw = True):
+        """
+        Birden fazla kameranın karelerini tek seferde işler.
+        Araç ve plaka modelleri tüm kareler için tek bir toplu (batch) çağrı ile çalışır.
+        Her kamerada araçlar takip edilir, plaka tespiti ve OCR sadece plakası henüz
+        kesinleşmemiş araçlarda yapılır.
+        timestamps: karelerin çekildiği zaman (epoch saniye). Canlıda verilmez, şimdiki zaman kullanılır.
+        Kayıttan taramada aynı kameranın art arda kareleri de tek partide gelebilir, takip ve bekleme
+        süreleri video zamanıyla işler. draw = False ise kutular çizilmez.
+        """
+        batch_start = time.perf_counter()
+        timer = self.stage_timer
+        now = time.time()
+        times = list(timestamps) if timestamps is not None else [now] * len(frames)
+        states = [self.get_camera_state(camera_id) for camera_id in camera_ids]
+
+        # Hareket kontrolü: sahne durgunsa araç tespiti atlanır. Takipte araç varsa (kapıda bekleyen, park etmiş)
+        # takip düşmesin diye STILL_DETECT_INTERVAL'da bir tespit yapılır
+        active = []
+        for i, state in enumerate(states):
+            state.frame_count += 1
+
+            moving = True
+            if state.motion_gate is not None:
+                gate_start = time.perf_counter()
+                moving = state.motion_gate.check(frames[i], times[i])
+                gate_elapsed = time.perf_counter() - gate_start
+                self.gate_seconds += gate_elapsed
+                timer.record("motion", gate_elapsed)
+
+            if not moving and state.tracker.tracks and state.last_detect is not None:
+                moving = abs(times[i] - state.last_detect) >= STILL_DETECT_INTERVAL # Kayıttan taramada zaman geri gidebilir (abs)
+
+            if moving:
+                active.append(i)
+                state.last_detect = times[i]
+            else:
+                state.skipped_frames += 1
+                state.tracker.expire(times[i]) # Atlanan karelerde de 3 saniye kuralı işlesin
+
+        vehicle_results = []
+        inputs = [] # (küçültülmüş görüntü, dönüşüm); tüm kareler atlandıysa boş
+        if active:
+            # Araç tespiti küçültülmüş (ve varsa ROI ile kırpılmış) karelerde, tüm kameralar tek çağrıda
+            detect_start = time.perf_counter()
+            inputs = [detect_input.prepare(frames[i], self.vehicle_imgsz, states[i].detect_roi) for i in active]
+            vehicle_results = self.detect_vehicles([image for image, _ in inputs])
+            detect_elapsed = time.perf_counter() - detect_start
+            timer.record("vehicle_detect", detect_elapsed)
+            per_frame = detect_elapsed / len(active)
+            self.detect_seconds = per_frame if not self.detect_seconds else 0.9 * self.detect_seconds + 0.1 * per_frame
+
+        pending = [] # Plakası aranacak araçlar: (kare sırası, araç, araç kırpıntısı)
+        for i, results, (_, transform) in zip(active, vehicle_results, inputs):
+            state = states[i]
+            height, width = frames[i].shape[:2]
+
+            detections = []
+            for box in results.boxes:
+                x1, y1, x2, y2 = detect_input.to_frame(box.xyxy[0], transform, width, height) # Tam çözünürlük
+                if (x2 - x1) * (y2 - y1) > 5000:
+                    detections.append(((x1, y1, x2, y2), float(box.conf[0])))
+
+            with timer.measure("tracking"):
+                tracks = state.tracker.update(detections, times[i])
+
+            for track in tracks:
+                vx1, vy1, vx2, vy2 = track.box
+                vehicle_crop = frames[i][vy1:vy2, vx1:vx2] # Araç görüntüsünü kırp
+
+                if track.has_confident_plate() and not self.ocr_scheduler.wants_verification(track, times[i]):
+                    self.register_plate(frames[i], state, track, vehicle_crop, times[i])
+                else:
+                    pending.append((i, track, vehicle_crop))
+
+        if pending:
+            # Plaka tespiti tam çözünürlüklü araç kırpıntılarında. Plakası bilinen araçlar sadece doğrulama için
+            with timer.measure("plate_detect"):
+                plate_results = self.detect_plates([crop for _, _, crop in pending])
+
+            for (i, track, vehicle_crop), results in zip(pending, plate_results):
+                self.handle_plate(frames[i], states[i], track, vehicle_crop, results, times[i])
+
+        if draw:
+            for i, state in enumerate(states):
+                for track in state.tracker.tracks:
+                    if track.last_seen == times[i]:
+                        self.draw_track(frames[i], track)
+
+        timer.record("batch", time.perf_counter() - batch_start)
+        return frames
+
+    def handle_plate(self, frame, state, track, vehicle_crop, plate_results, now):
+        """Araç kırpıntısındaki plakayı okur ve aracın kendi geçmişinde oylar."""
+        best_plate_box = None
+        max_plate_area = 0
+
+        for p_box in plate_results.boxes:
+            px1, py1, px2, py2 = map(int, p_box.xyxy[0])
+            p_area = (px2 - px1) * (py2 - py1)
+
+            if p_area > max_plate_area:
+                max_plate_area = p_area
+                best_plate_box = (px1, py1, px2, py2) # Plaka görüntüsünü kırp
+
+        if not best_plate_box:
+            return
+
+        track.plate_box = best_plate_box
+        px1, py1, px2, py2 = best_plate_box
+        
+        # OCR (Plaka okuma, yolo26s tarafından kırpılmış plaka görüntüsünü alır.)
+        # Zamanlayıcı son karelerdeki en net plaka görüntüsünü seçer, gerekmiyorsa OCR atlanır
+        plate_img = self.ocr_scheduler.offer(track, vehicle_crop[py1:py2, px1:px2], now)
+        if plate_img is not None:
+            with self.stage_timer.measure("ocr"):
+                final_text = self.perform_ocr(plate_img)
+            track.ocr_calls += 1
+
+            if final_text:
+                self.ocr_reads += 1
+                with self.stage_timer.measure("voting"):
+                    track.add_reading(final_text) # Kararlı plakayı belirle
+
+        if track.has_confident_plate():
+            self.register_plate(frame, state, track, vehicle_crop, now)
+
+    def register_plate(self, frame, state, track, vehicle_crop, now):
+        """Plakası kesinleşen aracı bekleme süresi dolduysa veritabanına yazar."""
+        plate_text = track.stable_plate
+        last_check = self.cooldown_tracker.get(plate_text, 0)
+
+        # Veritabanı kaydı hemen, VLM çağrısı arka planda. Kayıttan taramada sonraki dosya daha eski olabilir (abs)
+        if abs(now - last_check) > self.cooldown_seconds:
+            print(f"Araç analizi yapılıyor... ({plate_text}, kamera {state.camera_id}, araç #{track.track_id})")
+
+            vehicle_desc = VLM_PENDING_TEXT if self.vlm_worker else "VLM Kapalı"
+            with self.stage_timer.measure("decision"):
+                _, _, log_id = self.check_database(plate_text, vehicle_desc, datetime.fromtimestamp(now), state.camera_id) # Veritabanına kaydet
+            self.stage_timer.record("time_to_plate", now - track.first_seen) # Araç görüldükten karara kadar (kare zamanı)
+
+            if self.vlm_worker and log_id is not None:
+                with self.stage_timer.measure("vlm_submit"):
+                    self.vlm_worker.submit(log_id, vehicle_crop.copy()) # Kare üzerine çizim yapılacağı için kopya
+
+            self.cooldown_tracker[plate_text] = now
+            track.decided_plate = plate_text
+        elif plate_text not in (track.decided_plate, track.suppressed_plate):
+            # Aynı plaka az önce başka bir araç / kamera ile kaydedildi. Araç kadrajda kaldıkça tekrar sayılmaz
+            self.cooldown_suppressed += 1
+            track.suppressed_plate = plate_text
+
+    def draw_track(self, frame, track):
+        vx1, vy1, vx2, vy2 = track.box
+        cv2.rectangle(frame, (vx1, vy1), (vx2, vy2), (255, 255, 0), 2)
+
+        if not track.has_confident_plate():
+            return
+
+        color = (0, 255, 255) 
+        info_text = f"{track.stable_plate}"
+
+        if track.plate_box:
+            px1, py1, px2, py2 = track.plate_box
+            g_px1, g_py1 = vx1 + px1, vy1 + py1
+            g_px2, g_py2 = vx1 + px2, vy1 + py2
+            cv2.rectangle(frame, (g_px1, g_py1), (g_px2, g_py2), color, 2)
+            cv2.putText(frame, info_text, (g_px1, g_py1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
+        else:
+            cv2.putText(frame, info_text, (vx1, vy1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
 
-            cv2.rectangle(frame, (vx1, vy1), (vx2, vy2), (255, 255, 0), 2)
+    def start_stream(self, keep_alive = ALWAYS_DETECT, frame_sink = None):
+        """
+        Tüm kameralar için tek bir boru hattı başlatır, zaten çalışıyorsa onu döner.
+        frame_sink verilirse işlenen her kare ona da iletilir (inference_service.py).
+        """
+        self.load_models() # Arka planda yükleniyorsa bitmesini bekler
+
+        with self.pipeline_lock:
+            if self.pipeline is None or not self.pipeline.is_running():
+                self.pipeline = FramePipeline(self, self.camera_sources, keep_alive = keep_alive, frame_sink = frame_sink)
+                self.pipeline.start()
+            return self.pipeline
+
+    def stop_streams(self):
+        with self.pipeline_lock:
+            pipeline = self.pipeline
+            self.pipeline = None
+        if pipeline is not None:
+            pipeline.stop()
+
+    def stats(self):
+        """Kamera, hareket kontrolü, boru hattı ve VLM istatistiklerini döner."""
+        frames = sum(state.frame_count for state in self.camera_states.values())
+        skipped = sum(state.skipped_frames for state in self.camera_states.values())
+
+        return {
+            "motion": {
+                "frames": frames,
+                "skipped": skipped,
+                "skip_ratio": round(skipped / frames, 3) if frames else 0.0,
+                "detect_ms_per_frame": round(self.detect_seconds * 1000, 2),
+                "cpu_saved_seconds": round(skipped * self.detect_seconds - self.gate_seconds, 1),
+            },
+            "cameras": {
+                camera_id: {
+                    "frames": state.frame_count,
+                    "skipped": state.skipped_frames,
+                    "tracks": len(state.tracker.tracks),
+                    "motion": state.motion_gate.stats() if state.motion_gate else None,
+                }
+                for camera_id, state in self.camera_states.items()
+            },
+            "models": {"device": self.device, "vehicle": self.vehicle_backend, "plate": self.plate_backend,
+                       "vehicle_imgsz": self.vehicle_imgsz, "plate_imgsz": self.plate_imgsz},
+            "ocr": dict(self.ocr_scheduler.stats(), valid_reads = self.ocr_reads),
+            "stages": self.stage_timer.summary(),
+            "pipeline": self.pipeline.stats() if self.pipeline else None,
+            "vlm": self.vlm_worker.stats() if self.vlm_worker else None,
+        }
+
+    def shutdown(self):
+        """Kamera boru hattını ve arka plan işçilerini durdurur."""
+        self.stop_streams()
+        if self.vlm_worker:
+            self.vlm_worker.stop()
+
+    async def generate_frames(self, camera_id = 0, profile = STREAM_TIERS["full"]):
+        """
+        Kameranın ortak boru hattına abone olur ve kodlanmış kareleri üretir.
+        Kaç kişi izlerse izlesin tespit kare başına, kodlama profil başına bir kez yapılır.
+        İzleyici olay döngüsünde bekler, thread tutmaz.
+        """
+        if camera_id < 0 or camera_id >= len(self.camera_sources):
+            return
 
-            # yolo26s (Plaka tespiti, yolo26m tarafından kırpılmış araç görüntüsünü alır.)
-            plate_results = self.plate_model(vehicle_crop, conf = 0.2, verbose = False, device = self.device)[0]
-            
-            best_plate_box = None
-            max_plate_area = 0
-
-            for p_box in plate_results.boxes:
-                px1, py1, px2, py2 = map(int, p_box.xyxy[0])
-                p_area = (px2 - px1) * (py2 - py1)
-
-                if p_area > max_plate_area:
-                    max_plate_area = p_area
-                    best_plate_box = (px1, py1, px2, py2) # Plaka görüntüsünü kırp
-
-            if best_plate_box:
-                self.last_read_time = time.time()
-                px1, py1, px2, py2 = best_plate_box
-                
-                # OCR (Plaka okuma, yolo26s tarafından kırpılmış plaka görüntüsünü alır.)
-                if self.frame_count % 3 == 0:
-                    plate_img = vehicle_crop[py1:py2, px1:px2]
-                    final_text = self.perform_ocr(plate_img)
-
-                    if final_text:
-                        if self.stable_plate and final_text != self.stable_plate:
-                            self.mismatch_count += 1
-                            if self.mismatch_count >= 3:
-                                self.plate_history.clear()
-                                self.plate_history.append(final_text)
-                                self.stable_plate = final_text
-                                self.mismatch_count = 0
-                        else:
-                            self.mismatch_count = 0
-                            self.plate_history.append(final_text)
-
-                current_best = self.get_best_plate() # Kararlı plakayı belirle
-                
-                if current_best:
-                    self.stable_plate = current_best
-                    
-                    g_px1, g_py1 = vx1 + px1, vy1 + py1
-                    g_px2, g_py2 = vx1 + px2, vy1 + py2
-                    
-                    current_time = time.time()
-                    last_check = self.cooldown_tracker.get(current_best, 0)
-                    
-                    color = (0, 255, 255) 
-                    info_text = f"{current_best}"
-
-                    # Veritabanı kaydı ve VLM çağrısı
-                    if current_time - last_check > self.cooldown_seconds:
-                        print(f"Araç analizi yapılıyor... ({current_best})")
-                        
-                        # VLM çağrısı
-                        vehicle_desc = self.get_vehicle_description(vehicle_crop)
-                        print(f"Sonuç: {vehicle_desc}")
-
-                        
-                        self.check_database(current_best, vehicle_desc) # Veritabanına kaydet
-                        self.cooldown_tracker[current_best] = current_time
-                    
-                    cv2.rectangle(frame, (g_px1, g_py1), (g_px2, g_py2), color, 2)
-                    cv2.putText(frame, info_text, (g_px1, g_py1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
-
-        return frame
-
-    def generate_frames(self):
-        cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
-        while True:
-            success, frame = cap.read()
-            if not success:
-                break
-            
-            processed_frame = self.process_frame(frame)
-            _, buffer = cv2.imencode(".jpg", processed_frame)
-            frame_bytes = buffer.tobytes()
-            yield (b'--frame\r\n'b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+        subscriber = None
+        while subscriber is None:
+            pipeline = await asyncio.to_thread(self.start_stream) # Kamera açmak olay döngüsünü bekletmesin
+            subscriber = pipeline.subscribe(camera_id, profile) # Kapanmak üzereyse yenisi açılır
+
+        try:
+            while True:
+                chunk = await subscriber.get_async(timeout = 0.5)
+                if chunk is None:
+                    if subscriber.closed:
+                        return
+                    continue
+                yield chunk
+        finally:
+            pipeline.unsubscribe(camera_id, subscriber)
 
 # Test kodu
 if __name__ == "__main__":
@@ -306,6 +638,8 @@ if __name__ == "__main__":
         
         cap.release()
         cv2.destroyAllWindows()
+        system.shutdown()
+        log_writer.stop() # Kuyrukta kalan logları yaz
         
     except Exception as e:
         print(f"HATA: {e}")
\ No newline at end of file
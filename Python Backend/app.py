@@ -4,7 +4,15 @@ from contextlib import asynccontextmanager
 from database import init_db, SessionLocal, Role, User, AccessLog 
 from sqlalchemy.orm import Session 
 from passlib.context import CryptContext
-from routes import router as api_router
+from routes import router as api_router, ai_system
+from plate_index import allowlist_index
+from log_writer import log_writer
+from ai import ALWAYS_DETECT
+from inference_service import INFERENCE_MODE
+from events import event_bus
+from archive import retention_worker
+from auth_cache import principal_cache
+from metrics import MetricsMiddleware, watch_api, watch_log_writer, watch_system
 import uvicorn
 
 pwd_context = CryptContext(schemes = ["bcrypt"], deprecated = "auto") # Şifreleme
@@ -95,11 +103,38 @@ async def lifespan(app: FastAPI):
     print("Sistem Başlatılıyor")
     init_db()
     create_initial_data()
+    allowlist_index.load() # İzinli plakalar belleğe
+    watch_api(event_bus, principal_cache) # /metrics
+    if ai_system is not None:
+        watch_system(ai_system)
+
+    if INFERENCE_MODE == "external":
+        # Loglar ve kapı tespiti inference_service.py sürecinde, worker sadece paylaşılan belleğe bağlanır
+        if ai_system is not None:
+            ai_system.start_background_load()
+            ai_system.start_event_relay(event_bus.publish)
+    else:
+        log_writer.start() # Geçiş logları arka planda toplu yazılır
+        watch_log_writer(log_writer)
+        retention_worker.start() # Eski loglar arşive
+
+        if ai_system is not None:
+            ai_system.event_listeners.append(event_bus.publish) # Kapı olayları /events akışına
+            # Modeller arka planda yüklenir, login / plaka / log uçları beklemeden çalışır.
+            # ALWAYS_DETECT açıksa yükleme bitince izleyici beklemeden kapı tespiti başlar
+            ai_system.start_background_load(then = ai_system.start_stream if ALWAYS_DETECT else None)
+
     print("Sistem Hazır ve Çalışıyor")
     
     yield 
     print("Sistem Kapatılıyor")
 
+    if ai_system is not None:
+        ai_system.shutdown()
+
+    retention_worker.stop()
+    log_writer.stop() # Kuyrukta kalan logları yaz
+
 app = FastAPI(title = "AI Guvenlik Sistemi (MVP)", lifespan = lifespan) # FastAPI uygulamasını lifespan ile başlat
 
 app.add_middleware(
@@ -108,8 +143,11 @@ app.add_middleware(
     allow_credentials = True,
     allow_methods = ["*"],
     allow_headers = ["*"],
+    expose_headers = ["X-Next-Cursor", "X-Matched-Plates"], # Log sayfalama imleci tarayıcıdan okunabilsin
 )
 
+app.add_middleware(MetricsMiddleware) # Route başına istek süreleri (/metrics)
+
 app.include_router(api_router)
 
 def get_db():
@@ -119,8 +157,20 @@ def get_db():
 
 @app.get("/latest-log")
 def get_latest_log(db: Session = Depends(get_db)):
+    """
+    Son geçiş. Eski (polling yapan) arayüzler için; yeni arayüz /events akışını dinler.
+    Olay geldiyse bellekten döner, açılıştan beri olay yoksa veritabanına bakılır.
+    """
+    last_event = event_bus.latest()
+    if last_event:
+        return {
+            "plate": last_event["plate"],
+            "status": last_event["status"],
+            "owner": last_event["owner"],
+            "time": last_event["time"]
+        }
 
-    last_log = db.query(AccessLog).order_by(AccessLog.timestamp.desc()).first() # Tarihe göre tersten sırala ve ilkini al
+    last_log = db.query(AccessLog).order_by(AccessLog.timestamp.desc()).first() # Tarihe göre tersten sırala ve ilkini al (timestamp indeksli)
     
     if last_log:
         return {
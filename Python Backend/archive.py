@@ -0,0 +1,325 @@
+"""
+Log saklama süresi ve arşiv.
+
+LOG_RETENTION_DAYS günden eski loglar günlük gzip'li NDJSON dosyalarına (archive/access_logs/2026-01-01.ndjson.gz)
+taşınır ve access_logs tablosundan küçük partiler halinde silinir. archive/index.json hangi günün hangi dosyada
+olduğunu ve satır sayısını tutar. Log listesi ve dışa aktarma, istenen tarih aralığı arşive düşüyorsa
+arşiv dosyalarını da okur.
+
+Arşive birden fazla süreç bakar (uvicorn worker'ları, çıkarım servisi): index dosyası değiştikçe (mtime) yeniden okunur,
+yazmalar index.lock ile sıralanır. Saklama işini tek bir süreç yapar: retention.lock'u alan RetentionWorker çalışır,
+diğerleri bekler ve kilidi tutan süreç kapanırsa devralır.
+
+Elle çalıştırmak için:
+    python archive.py --run
+    python archive.py --run --days 30 --vacuum
+"""
+import argparse
+import gzip
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete
+
+from database import SessionLocal, AccessLog, User
+from file_lock import FileLock
+from plate_index import normalize_plate
+
+LOG_RETENTION_DAYS = 90 # Bu günden eski loglar arşive taşınır
+ARCHIVE_DIR = os.environ.get("GUVENLIK_ARCHIVE_DIR", "./archive")
+RETENTION_INTERVAL_HOURS = 6 # Arka plan kontrol sıklığı
+
+# log_queries.log_rows ile aynı alanlar, aynı sırada
+ArchivedLog = namedtuple("ArchivedLog", "id plate_number access_status vlm_description timestamp username match_distance")
+
+
+class LogArchive:
+    """Günlük arşiv dosyaları ve index'i."""
+
+    def __init__(self, root = ARCHIVE_DIR):
+        self.root = root
+        self.segment_dir = os.path.join(root, "access_logs")
+        self.index_path = os.path.join(root, "index.json")
+        self.lock = threading.Lock()
+        self.index_stamp = None
+        self.index = {"segments": {}}
+        self._refresh()
+
+    def _stamp(self):
+        try:
+            stat = os.stat(self.index_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _refresh(self):
+        """Index dosyası başka bir süreç tarafından değiştirildiyse yeniden okur."""
+        stamp = self._stamp()
+        if stamp == self.index_stamp:
+            return
+        with self.lock:
+            try:
+                with open(self.index_path, encoding = "utf-8") as f:
+                    self.index = json.load(f)
+            except FileNotFoundError:
+                self.index = {"segments": {}}
+            self.index_stamp = stamp
+
+    def _save_index(self):
+        tmp = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding = "utf-8") as f:
+            json.dump(self.index, f, ensure_ascii = False, indent = 1, sort_keys = True)
+        os.replace(tmp, self.index_path)
+        self.index_stamp = self._stamp()
+
+    def days(self):
+        self._refresh()
+        return sorted(self.index["segments"])
+
+    def boundary(self):
+        """Arşivdeki en yeni günün ertesi. Bundan eski loglar tabloda değil arşivdedir."""
+        days = self.days()
+        if not days:
+            return None
+        return datetime.fromisoformat(days[-1]) + timedelta(days = 1)
+
+    def covers(self, date_from):
+        """date_from'dan başlayan bir sorgu arşive dokunuyor mu?"""
+        boundary = self.boundary()
+        return boundary is not None and (date_from is None or date_from < boundary)
+
+    def write_day(self, day, records):
+        """
+        Bir günün loglarını dosyaya yazar. Gün daha önce (yarım kalmış bir çalışmada) yazıldıysa
+        eski satırlarla birleştirilir, aynı id iki kez yazılmaz.
+        """
+        os.makedirs(self.segment_dir, exist_ok = True)
+        name = f"{day}.ndjson.gz"
+        path = os.path.join(self.segment_dir, name)
+
+        merged = {}
+        if os.path.exists(path):
+            for record in self._read_file(path):
+                merged[record["id"]] = record
+        for record in records:
+            merged[record["id"]] = record
+        ordered = sorted(merged.values(), key = lambda r: (r["timestamp"], r["id"]))
+
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with gzip.open(tmp, "wt", encoding = "utf-8") as f:
+            for record in ordered:
+                f.write(json.dumps(record, ensure_ascii = False) + "\n")
+        os.replace(tmp, path)
+
+        with FileLock(os.path.join(self.root, "index.lock")):
+            self._refresh() # Başka bir sürecin eklediği günler kaybolmasın
+            with self.lock:
+                self.index["segments"][day] = {
+                    "file": name,
+                    "rows": len(ordered),
+                    "first": ordered[0]["timestamp"] if ordered else None,
+                    "last": ordered[-1]["timestamp"] if ordered else None,
+                    "max_id": max((r["id"] for r in ordered), default = 0),
+                    "bytes": os.path.getsize(path),
+                }
+                self._save_index()
+
+    def _read_file(self, path):
+        with gzip.open(path, "rt", encoding = "utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def read_day(self, day):
+        """Günün logları, eskiden yeniye."""
+        self._refresh()
+        segment = self.index["segments"].get(day)
+        if segment is None:
+            return
+        for record in self._read_file(os.path.join(self.segment_dir, segment["file"])):
+            yield ArchivedLog(record["id"], record["plate_number"], record["access_status"], record["vlm_description"],
+                              datetime.fromisoformat(record["timestamp"]), record.get("related_user"), record.get("match_distance"))
+
+    def iter_logs(self, newest_first = False, plate = None, plates = None, status = None, date_from = None, date_to = None,
+                  before = None):
+        """
+        Filtrelere uyan arşiv logları. before = (timestamp, id) verilirse sadece ondan eskiler (imleçli sayfalama).
+        Tarih aralığı ve imleç dışında kalan günlerin dosyaları hiç açılmaz.
+        """
+        plate = normalize_plate(plate) if plate else None
+        plates = set(plates) if plates is not None else None
+        days = self.days()
+        if newest_first:
+            days.reverse()
+
+        for day in days:
+            day_start = datetime.fromisoformat(day)
+            day_end = day_start + timedelta(days = 1)
+            if date_from is not None and day_end <= date_from:
+                continue
+            if date_to is not None and day_start >= date_to:
+                continue
+            if before is not None and day_start > before[0]:
+                continue
+
+            rows = list(self.read_day(day))
+            if newest_first:
+                rows.reverse()
+            for row in rows:
+                if plate and row.plate_number != plate:
+                    continue
+                if plates is not None and row.plate_number not in plates:
+                    continue
+                if status is not None and row.access_status != status:
+                    continue
+                if date_from is not None and row.timestamp < date_from:
+                    continue
+                if date_to is not None and row.timestamp >= date_to:
+                    continue
+                if before is not None and (row.timestamp, row.id) >= before:
+                    continue
+                yield row
+
+    def max_id(self):
+        """Arşivdeki en büyük log id'si, arşiv boşsa 0. max_id'si olmayan eski index kayıtlarında dosya okunur."""
+        days = self.days()
+        best = 0
+        for day in days:
+            segment = self.index["segments"][day]
+            if "max_id" in segment:
+                best = max(best, segment["max_id"])
+            else:
+                best = max(best, max((r["id"] for r in self._read_file(os.path.join(self.segment_dir, segment["file"]))), default = 0))
+        return best
+
+    def stats(self):
+        days = self.days()
+        segments = self.index["segments"].values()
+        return {
+            "days": len(days),
+            "rows": sum(s["rows"] for s in segments),
+            "bytes": sum(s["bytes"] for s in segments),
+            "boundary": self.boundary(),
+        }
+
+
+def archive_old_logs(retention_days = LOG_RETENTION_DAYS, batch_size = 500, pause = 0.01, store = None, stop_event = None):
+    """
+    retention_days günden eski logları gün gün arşive yazar, sonra tablodan batch_size'lık partilerle siler.
+    Her parti ayrı transaction'dır ve arada kısa beklenir, kapı logları yazılırken tablo uzun süre kilitlenmez.
+    Arşive yazılmamış satır silinmez; yarıda kesilirse (stop_event) bir sonraki çalışma kaldığı yerden devam eder.
+    """
+    store = store or log_archive
+    cutoff = (datetime.now() - timedelta(days = retention_days)).replace(hour = 0, minute = 0, second = 0, microsecond = 0)
+    archived, start = 0, time.perf_counter()
+
+    while not (stop_event is not None and stop_event.is_set()):
+        db = SessionLocal()
+        try:
+            oldest = db.query(AccessLog.timestamp).filter(AccessLog.timestamp < cutoff) \
+                .order_by(AccessLog.timestamp).first()
+            if oldest is None:
+                break
+
+            day_start = oldest.timestamp.replace(hour = 0, minute = 0, second = 0, microsecond = 0)
+            day_end = min(day_start + timedelta(days = 1), cutoff)
+            rows = db.query(AccessLog.id, AccessLog.plate_number, AccessLog.access_status, AccessLog.vlm_description,
+                            AccessLog.timestamp, AccessLog.related_user_id, User.username,
+                            AccessLog.matched_plate, AccessLog.match_distance) \
+                .outerjoin(User, User.id == AccessLog.related_user_id) \
+                .filter(AccessLog.timestamp >= day_start, AccessLog.timestamp < day_end).all()
+        finally:
+            db.close()
+
+        store.write_day(day_start.date().isoformat(), [{
+            "id": row.id,
+            "plate_number": row.plate_number,
+            "access_status": row.access_status,
+            "vlm_description": row.vlm_description,
+            "timestamp": row.timestamp.isoformat(),
+            "related_user_id": row.related_user_id,
+            "related_user": row.username,
+            "matched_plate": row.matched_plate,
+            "match_distance": row.match_distance,
+        } for row in rows])
+
+        ids = [row.id for row in rows]
+        for i in range(0, len(ids), batch_size):
+            if stop_event is not None and stop_event.is_set():
+                break
+            db = SessionLocal()
+            try:
+                db.execute(delete(AccessLog).where(AccessLog.id.in_(ids[i:i + batch_size])))
+                db.commit()
+            finally:
+                db.close()
+            archived += len(ids[i:i + batch_size])
+            time.sleep(pause) # Log yazıcısına sıra ver
+
+    if archived:
+        print(f"{archived} log arşive taşındı ({time.perf_counter() - start:.1f} sn)")
+    return archived
+
+
+class RetentionWorker:
+    """
+    Saklama süresini arka planda düzenli olarak uygular. Her süreçte başlatılabilir, ama sadece retention.lock'u
+    tutan süreç arşivler; kilit süreç kapanana kadar bırakılmaz.
+    """
+
+    def __init__(self, retention_days = LOG_RETENTION_DAYS, interval_hours = RETENTION_INTERVAL_HOURS, root = ARCHIVE_DIR):
+        self.retention_days = retention_days
+        self.interval = interval_hours * 3600
+        self.leader_lock = FileLock(os.path.join(root, "retention.lock"))
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.stop_event.clear()
+            self.thread = threading.Thread(target = self._loop, name = "log-retention", daemon = True)
+            self.thread.start()
+
+    def _loop(self):
+        while not self.stop_event.is_set():
+            try:
+                if self.leader_lock.acquire(blocking = False): # Başka süreç arşivliyorsa bu tur atlanır
+                    archive_old_logs(self.retention_days, stop_event = self.stop_event)
+            except Exception as e:
+                print(f"Log arşivleme hatası: {e}")
+            self.stop_event.wait(self.interval)
+        self.leader_lock.release() # Süren arşivleme bitmeden başka süreç başlamasın
+
+    def stop(self, timeout = 10.0):
+        """Süren arşivleme partisinin bitmesini bekler. Uygulama kapanırken veritabanından önce çağrılır."""
+        if self.thread is None:
+            return
+        self.stop_event.set()
+        self.thread.join(timeout)
+        self.thread = None
+
+
+log_archive = LogArchive()
+retention_worker = RetentionWorker()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Log saklama ve arşiv")
+    parser.add_argument("--run", action = "store_true", help = "Eski logları şimdi arşive taşı")
+    parser.add_argument("--days", type = int, default = LOG_RETENTION_DAYS)
+    parser.add_argument("--vacuum", action = "store_true", help = "Sonra veritabanı dosyasını küçült (VACUUM)")
+    args = parser.parse_args()
+
+    from database import init_db, engine
+
+    init_db()
+    if args.run:
+        archive_old_logs(args.days)
+        if args.vacuum:
+            with engine.connect() as conn:
+                conn.exec_driver_sql("VACUUM")
+    print(log_archive.stats())
@@ -0,0 +1,110 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from sqlalchemy import event
+
+from database import User, Role
+
+PRINCIPAL_CACHE_SIZE = 1024 # En fazla bu kadar token tutulur (en az kullanılan atılır)
+PRINCIPAL_CACHE_TTL = 60.0 # Saniye. Token'ın süresi daha önce doluyorsa o an
+
+# get_current_user'ın döndüğü kullanıcı: handler'lardaki current_user.id / .username / .role.name aynı çalışır
+RoleRef = namedtuple("RoleRef", "id name")
+Principal = namedtuple("Principal", "id username role_id role")
+
+
+class PrincipalCache:
+    """
+    Token -> kullanıcı (id, kullanıcı adı, rol) önbelleği.
+
+    Panel her sayfada aynı token'la birkaç istek atar; doğrulanmış token tekrar geldiğinde kullanıcı ve rolü
+    veritabanına gitmeden döner. Kayıtlar ttl saniye ya da token'ın süresi dolana kadar (hangisi önceyse) geçerlidir,
+    max_size aşılınca en uzun süredir kullanılmayan atılır.
+    Kullanıcı veya rol değişince / silinince ilgili kayıtlar hemen silinir (aşağıdaki ORM olayları).
+    Birden fazla worker varsa her worker'ın önbelleği ayrıdır, başka worker'daki değişiklik en geç ttl sonra görülür.
+    """
+
+    def __init__(self, max_size = PRINCIPAL_CACHE_SIZE, ttl = PRINCIPAL_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict() # token -> (principal, bitiş zamanı)
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, token):
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(token)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self.entries[token]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(token)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, token, principal, token_exp = None):
+        """token_exp: token'ın bitiş zamanı (JWT exp, epoch saniye)."""
+        expires = time.time() + self.ttl
+        if token_exp is not None:
+            expires = min(expires, token_exp)
+        with self.lock:
+            self.entries[token] = (principal, expires)
+            self.entries.move_to_end(token)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last = False)
+
+    def invalidate(self, match):
+        """match(principal) doğru olan kayıtları siler."""
+        with self.lock:
+            stale = [token for token, (principal, _) in self.entries.items() if match(principal)]
+            for token in stale:
+                del self.entries[token]
+            self.invalidations += len(stale)
+
+    def invalidate_user(self, user_id = None, username = None):
+        self.invalidate(lambda p: p.id == user_id or (username is not None and p.username == username))
+
+    def invalidate_role(self, role_id):
+        self.invalidate(lambda p: p.role_id == role_id)
+
+    def clear(self):
+        with self.lock:
+            self.invalidations += len(self.entries)
+            self.entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else None,
+            "invalidations": self.invalidations,
+        }
+
+
+def principal_from_user(user):
+    role = RoleRef(user.role.id, user.role.name) if user.role is not None else None
+    return Principal(user.id, user.username, user.role_id, role)
+
+
+principal_cache = PrincipalCache()
+
+
+# Kullanıcı ya da rol hangi koddan değişirse değişsin (API, yönetim betiği) önbellekteki eski hali silinir
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target):
+    principal_cache.invalidate_user(target.id, target.username)
+
+
+@event.listens_for(Role, "after_update")
+@event.listens_for(Role, "after_delete")
+def _role_changed(mapper, connection, target):
+    principal_cache.invalidate_role(target.id)
@@ -0,0 +1,131 @@
+"""
+/admin/logs sayfalama testi: sentetik log tablosunda sayfa başına gecikme (p50 / p99).
+Geçici bir SQLite dosyası kullanılır, guvenlik.db'ye dokunulmaz.
+
+Senaryolar: ilk sayfa, imleçle derin sayfalar, plaka filtresi, izin durumu + tarih aralığı filtresi.
+--legacy ile eski yöntem (tüm tablo + satır başına kullanıcı sorgusu) küçük bir tabloda ölçülür.
+
+Kullanım:
+    python bench_admin_logs.py --rows 1000000
+    python bench_admin_logs.py --rows 20000 --legacy
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+DB_DIR = tempfile.mkdtemp()
+os.environ["GUVENLIK_DB_URL"] = f"sqlite:///{os.path.join(DB_DIR, 'bench.db')}"
+
+from sqlalchemy import insert
+
+from database import init_db, SessionLocal, AccessLog, User, Role
+from log_queries import log_page
+
+
+def seed(rows, plates, days, chunk = 50000):
+    """rows adet log: son days güne yayılmış, plates farklı plaka, üçte biri kayıtlı kullanıcıya bağlı."""
+    db = SessionLocal()
+    try:
+        role = Role(name = "Resident")
+        db.add(role)
+        db.flush()
+        users = [User(username = f"daire{i}", password_hash = "-", role_id = role.id) for i in range(50)]
+        db.add_all(users)
+        db.commit()
+        user_ids = [u.id for u in users]
+
+        rng = random.Random(42)
+        plate_list = [f"{rng.randint(1, 81):02d}{rng.choice('ABCDEFGHJKLMNPRSTUVYZ')}{rng.choice('ABCDEFGHJKLMNPRSTUVYZ')}{rng.randint(100, 9999)}"
+                      for _ in range(plates)]
+        start = datetime.now() - timedelta(days = days)
+        step = days * 86400 / rows
+
+        start_time = time.perf_counter()
+        for offset in range(0, rows, chunk):
+            batch = []
+            for i in range(offset, min(rows, offset + chunk)):
+                allowed = rng.random() < 0.33
+                batch.append({
+                    "plate_number": rng.choice(plate_list),
+                    "access_status": allowed,
+                    "vlm_description": "Beyaz sedan",
+                    "timestamp": start + timedelta(seconds = i * step),
+                    "related_user_id": rng.choice(user_ids) if allowed else None,
+                })
+            db.execute(insert(AccessLog), batch)
+            db.commit()
+        print(f"{rows} log yazıldı ({time.perf_counter() - start_time:.1f} sn)")
+        return plate_list, start
+    finally:
+        db.close()
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def measure(name, pages, limit, **filters):
+    """İmleçle pages sayfa ilerler, her sayfanın süresini ölçer."""
+    db = SessionLocal()
+    try:
+        latencies, cursor, total = [], None, 0
+        for _ in range(pages):
+            start = time.perf_counter()
+            rows, cursor = log_page(db, limit = limit, cursor = cursor, **filters)
+            latencies.append((time.perf_counter() - start) * 1000)
+            total += len(rows)
+            if cursor is None:
+                break
+    finally:
+        db.close()
+    print(f"{name:<34} | {len(latencies):>6} | {total:>8} | {percentile(latencies, 50):>7.2f} | {percentile(latencies, 99):>7.2f}")
+
+
+def legacy():
+    """Eski get_all_logs: tüm tablo + her satır için kullanıcı sorgusu."""
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        logs = db.query(AccessLog).order_by(AccessLog.timestamp.desc()).all()
+        for log in logs:
+            if log.related_user_id:
+                db.query(User).filter(User.id == log.related_user_id).first()
+        print(f"Eski yöntem (tüm tablo + N+1): {(time.perf_counter() - start) * 1000:.0f} ms, {len(logs)} satır")
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "/admin/logs sayfalama testi")
+    parser.add_argument("--rows", type = int, default = 1000000)
+    parser.add_argument("--plates", type = int, default = 5000)
+    parser.add_argument("--days", type = int, default = 180)
+    parser.add_argument("--limit", type = int, default = 100)
+    parser.add_argument("--pages", type = int, default = 200)
+    parser.add_argument("--legacy", action = "store_true", help = "Eski yöntemi de ölç (büyük tabloda çok yavaş)")
+    args = parser.parse_args()
+
+    init_db()
+    plate_list, start = seed(args.rows, args.plates, args.days)
+
+    print(f"\n{'Senaryo':<34} | {'Sayfa':>6} | {'Satır':>8} | {'p50 ms':>7} | {'p99 ms':>7}")
+    measure("İlk sayfa", 1, args.limit)
+    measure("İmleçle ardışık sayfalar", args.pages, args.limit)
+    measure("Plaka filtresi", args.pages, args.limit, plate = plate_list[0])
+    measure("Reddedilenler, son 7 gün", args.pages, args.limit, status = False,
+            date_from = datetime.now() - timedelta(days = 7))
+    middle = start + timedelta(days = args.days // 2)
+    measure("Tarih aralığı (1 gün, ortada)", args.pages, args.limit,
+            date_from = middle, date_to = middle + timedelta(days = 1))
+
+    if args.legacy:
+        print()
+        legacy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Model formatlarını karşılaştırır: gecikme, verim ve .pt modeline göre tespit uyumu.
+
+Her format için klasördeki görüntüler tek tek (gecikme) ve toplu (verim) işlenir.
+Uyum: aynı sınıftaki kutular IoU >= 0.5 ile .pt sonuçlarına eşleştirilir, kesinlik / duyarlılık / F1 verilir.
+
+Kullanım:
+    python bench_backends.py --images ornek_kareler/ --model weights/yolo26m.pt --classes 2,3,5,7
+    python bench_backends.py --images plaka_ornekleri/ --model weights/best_plate.pt --conf 0.2
+"""
+import argparse
+import glob
+import os
+import time
+
+import cv2
+
+from model_backends import BACKEND_SUFFIXES, backend_path
+from tracker import box_iou
+
+
+def load_images(folder, limit):
+    paths = sorted(p for ext in ("jpg", "jpeg", "png", "bmp") for p in glob.glob(os.path.join(folder, f"*.{ext}")))
+    images = [cv2.imread(p) for p in paths[:limit]]
+    return [img for img in images if img is not None]
+
+
+def detect(model, images, args, device):
+    results = model(images, classes = args.class_list, conf = args.conf, verbose = False, device = device, imgsz = args.imgsz)
+    return [[(tuple(map(float, b.xyxy[0])), int(b.cls[0])) for b in r.boxes] for r in results]
+
+
+def agreement(reference, candidate):
+    """Referans (.pt) kutularına göre (kesinlik, duyarlılık, F1, ortalama IoU)."""
+    matched, total_ref, total_cand, ious = 0, 0, 0, []
+    for ref_boxes, cand_boxes in zip(reference, candidate):
+        total_ref += len(ref_boxes)
+        total_cand += len(cand_boxes)
+        used = set()
+        for ref_box, ref_cls in ref_boxes:
+            best, best_j = 0.0, None
+            for j, (box, cls) in enumerate(cand_boxes):
+                if j in used or cls != ref_cls:
+                    continue
+                iou = box_iou(ref_box, box)
+                if iou > best:
+                    best, best_j = iou, j
+            if best_j is not None and best >= 0.5:
+                used.add(best_j)
+                matched += 1
+                ious.append(best)
+
+    precision = matched / total_cand if total_cand else 1.0
+    recall = matched / total_ref if total_ref else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    mean_iou = sum(ious) / len(ious) if ious else 0.0
+    return precision, recall, f1, mean_iou
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Model formatı karşılaştırması")
+    parser.add_argument("--images", required = True, help = "Örnek görüntü klasörü")
+    parser.add_argument("--model", default = "weights/yolo26m.pt")
+    parser.add_argument("--backends", default = ",".join(BACKEND_SUFFIXES))
+    parser.add_argument("--classes", default = None, help = "Örn: 2,3,5,7 (araç sınıfları)")
+    parser.add_argument("--conf", type = float, default = 0.5)
+    parser.add_argument("--imgsz", type = int, default = 640)
+    parser.add_argument("--batch", type = int, default = 8)
+    parser.add_argument("--limit", type = int, default = 200)
+    parser.add_argument("--device", default = "cpu")
+    args = parser.parse_args()
+    args.class_list = [int(c) for c in args.classes.split(",")] if args.classes else None
+
+    from ultralytics import YOLO
+
+    images = load_images(args.images, args.limit)
+    if not images:
+        print(f"Görüntü bulunamadı: {args.images}")
+        return
+    print(f"{len(images)} görüntü, imgsz={args.imgsz}, cihaz={args.device}\n")
+
+    reference = None
+    rows = []
+    for backend in args.backends.split(","):
+        path = args.model if backend == "pt" else backend_path(args.model, backend)
+        if not os.path.exists(path):
+            print(f"Atlandı ({backend}): {path} yok. Önce: python export_models.py --formats {backend}")
+            continue
+        if backend == "engine" and args.device == "cpu":
+            print("Atlandı (engine): TensorRT için --device 0 gerekir")
+            continue
+
+        model = YOLO(path, task = "detect")
+        detect(model, images[:2], args, args.device) # Isınma
+
+        # Gecikme: tek görüntü
+        latencies, outputs = [], []
+        for img in images:
+            start = time.perf_counter()
+            outputs.extend(detect(model, [img], args, args.device))
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        # Verim: toplu işlem
+        start = time.perf_counter()
+        for i in range(0, len(images), args.batch):
+            detect(model, images[i:i + args.batch], args, args.device)
+        throughput = len(images) / (time.perf_counter() - start)
+
+        if backend == "pt":
+            reference = outputs
+        rows.append((backend, percentile(latencies, 50), percentile(latencies, 95), throughput, outputs))
+
+    if reference is None:
+        print("Uyum hesabı için .pt modeli gerekli (--backends listesinde pt olmalı)")
+
+    print(f"{'Format':<14} | {'p50 ms':>8} | {'p95 ms':>8} | {'Görüntü/sn':>10} | {'Kesinlik':>8} | {'Duyarlılık':>10} | {'F1':>6} | {'IoU':>5}")
+    for backend, p50, p95, throughput, outputs in rows:
+        if reference is not None:
+            precision, recall, f1, mean_iou = agreement(reference, outputs)
+            quality = f"{precision:>8.3f} | {recall:>10.3f} | {f1:>6.3f} | {mean_iou:>5.3f}"
+        else:
+            quality = f"{'-':>8} | {'-':>10} | {'-':>6} | {'-':>5}"
+        print(f"{backend:<14} | {p50:>8.1f} | {p95:>8.1f} | {throughput:>10.1f} | {quality}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Araç tespiti girdi boyutu karşılaştırması: imgsz başına gecikme ve tam çözünürlük referansına göre doğruluk.
+
+Her boyut için kare detect_input.prepare ile küçültülür (--roi verilirse önce kırpılır), model o boyutta çalışır ve
+kutular tam çözünürlüğe çevrilir; yani sistemdeki yolun aynısı. "ham kare" satırı eski yoldur: kare olduğu gibi modele
+verilir, küçültmeyi model yapar.
+Referans: --labels klasöründeki YOLO etiketleri (görüntüyle aynı isimde .txt), yoksa --reference-size boyutunda ham
+kare üzerinde modelin kendi tespitleri. Sistemde işe yarayan kutular (alan > --min-area piksel) sayılır, araç sınıfları
+ayrıştırılmaz (kapıda otomobil / kamyonet ayrımı kararı değiştirmez). ROI satırlarında referans, merkezi ROI içinde kalan
+kutulardır.
+--plate-model verilirse tespit edilen araçların tam çözünürlüklü kırpıntısında plaka bulunma oranı da verilir:
+küçük girdi kutuları kaydırıyorsa plaka kırpıntının dışında kalır ve bu oran düşer.
+
+Kullanım:
+    python bench_detect_size.py --images kapi_kareleri/ --sizes 320,416,480,640,960
+    python bench_detect_size.py --images kapi_kareleri/ --labels etiketler/ --roi 0.1,0.3,0.9,1.0 --plate-model weights/best_plate.pt
+"""
+import argparse
+import glob
+import os
+import time
+
+import cv2
+
+from bench_backends import agreement, percentile
+from detect_input import prepare, roi_pixels, to_frame
+
+
+def load_samples(folder, limit):
+    paths = sorted(p for ext in ("jpg", "jpeg", "png", "bmp") for p in glob.glob(os.path.join(folder, f"*.{ext}")))
+    samples = [(p, cv2.imread(p)) for p in paths[:limit]]
+    return [(p, img) for p, img in samples if img is not None]
+
+
+def load_labels(labels_dir, path, image, args):
+    """YOLO etiketi (sınıf cx cy w h, 0-1 arası) -> [(kutu, 0)]. Dosya yoksa araç yok sayılır."""
+    height, width = image.shape[:2]
+    label_path = os.path.join(labels_dir, os.path.splitext(os.path.basename(path))[0] + ".txt")
+    boxes = []
+    if not os.path.exists(label_path):
+        return boxes
+    with open(label_path) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) < 5 or (args.class_list and int(parts[0]) not in args.class_list):
+                continue
+            cx, cy, w, h = (float(v) for v in parts[1:5])
+            box = (int((cx - w / 2) * width), int((cy - h / 2) * height), int((cx + w / 2) * width), int((cy + h / 2) * height))
+            if area(box) > args.min_area:
+                boxes.append((box, 0))
+    return boxes
+
+
+def area(box):
+    return (box[2] - box[0]) * (box[3] - box[1])
+
+
+def detect(model, frame, args, imgsz, prescale = True, roi = None):
+    """Tam çözünürlük koordinatında [(kutu, 0)]. prescale = False ise kare küçültülmeden verilir (eski yol)."""
+    image, transform = prepare(frame, imgsz if prescale else None, roi)
+    results = model([image], classes = args.class_list, conf = args.conf, verbose = False, device = args.device, imgsz = imgsz)
+    height, width = frame.shape[:2]
+    boxes = [to_frame(b.xyxy[0], transform, width, height) for b in results[0].boxes]
+    return [(box, 0) for box in boxes if area(box) > args.min_area]
+
+
+def in_roi(box, roi, frame):
+    height, width = frame.shape[:2]
+    x1, y1, x2, y2 = roi_pixels(roi, width, height)
+    cx, cy = (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+    return x1 <= cx <= x2 and y1 <= cy <= y2
+
+
+def plate_rate(plate_model, frames, outputs, args):
+    """Tespit edilen araç kırpıntılarından kaçında plaka bulundu."""
+    crops = [frame[y1:y2, x1:x2] for frame, boxes in zip(frames, outputs) for (x1, y1, x2, y2), _ in boxes]
+    if not crops:
+        return None
+    found = 0
+    for i in range(0, len(crops), 16):
+        results = plate_model(crops[i:i + 16], conf = 0.2, verbose = False, device = args.device, imgsz = args.plate_imgsz)
+        found += sum(1 for r in results if len(r.boxes))
+    return found / len(crops)
+
+
+def run(model, frames, args, imgsz, prescale = True, roi = None):
+    detect(model, frames[0], args, imgsz, prescale, roi) # Isınma (yeni girdi boyutu)
+    latencies, outputs = [], []
+    for frame in frames:
+        start = time.perf_counter()
+        outputs.append(detect(model, frame, args, imgsz, prescale, roi))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Araç tespiti girdi boyutu karşılaştırması")
+    parser.add_argument("--images", required = True, help = "Örnek kapı kareleri (tam çözünürlük)")
+    parser.add_argument("--labels", default = None, help = "YOLO etiket klasörü (verilmezse referans modelin kendisi)")
+    parser.add_argument("--model", default = "weights/yolo26m.pt")
+    parser.add_argument("--plate-model", default = None, help = "Örn: weights/best_plate.pt")
+    parser.add_argument("--sizes", default = "320,416,480,640,960")
+    parser.add_argument("--reference-size", type = int, default = 1280)
+    parser.add_argument("--roi", default = None, help = "x1,y1,x2,y2 (0-1 arası oranlar)")
+    parser.add_argument("--classes", default = "2,3,5,7")
+    parser.add_argument("--conf", type = float, default = 0.25)
+    parser.add_argument("--min-area", type = int, default = 5000, help = "Sistemdeki gibi küçük kutular sayılmaz")
+    parser.add_argument("--plate-imgsz", type = int, default = 640)
+    parser.add_argument("--limit", type = int, default = 200)
+    parser.add_argument("--device", default = "cpu")
+    args = parser.parse_args()
+    args.class_list = [int(c) for c in args.classes.split(",")] if args.classes else None
+    roi = tuple(float(v) for v in args.roi.split(",")) if args.roi else None
+
+    from ultralytics import YOLO
+
+    samples = load_samples(args.images, args.limit)
+    if not samples:
+        print(f"Görüntü bulunamadı: {args.images}")
+        return
+    frames = [img for _, img in samples]
+    model = YOLO(args.model, task = "detect")
+    plate_model = YOLO(args.plate_model, task = "detect") if args.plate_model else None
+
+    if args.labels:
+        reference = [load_labels(args.labels, path, img, args) for path, img in samples]
+        source = f"etiketler ({args.labels})"
+    else:
+        _, reference = run(model, frames, args, args.reference_size, prescale = False)
+        source = f"model, ham kare imgsz={args.reference_size}"
+    height, width = frames[0].shape[:2]
+    print(f"{len(frames)} kare ({width}x{height}), referans: {source}, {sum(map(len, reference))} araç, cihaz={args.device}\n")
+
+    rows = [("ham kare (eski)", 640, None) + run(model, frames, args, 640, prescale = False)]
+    for size in (int(s) for s in args.sizes.split(",")):
+        rows.append(("küçültülmüş", size, None) + run(model, frames, args, size))
+        if roi is not None:
+            rows.append(("ROI + küçültülmüş", size, roi) + run(model, frames, args, size, roi = roi))
+
+    roi_reference = None
+    if roi is not None:
+        roi_reference = [[(box, cls) for box, cls in boxes if in_roi(box, roi, frame)] for frame, boxes in zip(frames, reference)]
+
+    print(f"{'Girdi':<18} | {'imgsz':>5} | {'p50 ms':>7} | {'p95 ms':>7} | {'Kare/sn':>7} | {'Kesinlik':>8} | "
+          f"{'Duyarlılık':>10} | {'F1':>5} | {'IoU':>5} | {'Plaka':>6}")
+    for name, size, row_roi, latencies, outputs in rows:
+        expected = roi_reference if row_roi is not None else reference
+        precision, recall, f1, mean_iou = agreement(expected, outputs)
+        p50 = percentile(latencies, 50)
+        plates = plate_rate(plate_model, frames, outputs, args) if plate_model else None
+        plates = f"{plates * 100:>5.1f}%" if plates is not None else f"{'-':>6}"
+        print(f"{name:<18} | {size:>5} | {p50:>7.1f} | {percentile(latencies, 95):>7.1f} | {1000 / p50:>7.1f} | "
+              f"{precision:>8.3f} | {recall:>10.3f} | {f1:>5.3f} | {mean_iou:>5.3f} | {plates}")
+
+
+if __name__ == "__main__":
+    main()
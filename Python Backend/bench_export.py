@@ -0,0 +1,73 @@
+"""
+Log dışa aktarma testi: büyük sentetik tabloda CSV / NDJSON (gzip'li ve gzip'siz) akışının
+verimi ve en yüksek bellek kullanımı. Karşılaştırma için tüm tabloyu listeye yükleyen eski yöntem de ölçülür.
+Geçici bir SQLite dosyası kullanılır, guvenlik.db'ye dokunulmaz.
+
+Kullanım:
+    python bench_export.py --rows 1000000
+"""
+import argparse
+import time
+import tracemalloc
+
+from bench_admin_logs import seed # Geçici veritabanını da o ayarlar
+from database import init_db, SessionLocal
+from log_queries import iter_log_export, log_rows
+
+
+def measure(name, produce):
+    """Önce süre ölçülür, sonra bellek (tracemalloc yavaşlattığı için ayrı geçişte)."""
+    start = time.perf_counter()
+    rows, size = produce()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    produce()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<18} | {rows / elapsed:>10.0f} | {size / elapsed / 1e6:>8.1f} | {size / 1e6:>8.1f} | {peak / 1e6:>8.1f}")
+
+
+def stream(fmt, compress, rows):
+    def produce():
+        size = 0
+        for chunk in iter_log_export(fmt, compress = compress):
+            size += len(chunk)
+        return rows, size
+    return produce
+
+
+def legacy(rows):
+    """Eski /admin/logs gibi: tüm satırlar önce listeye alınır."""
+    def produce():
+        db = SessionLocal()
+        try:
+            records = [dict(row._mapping) for row in log_rows(db).all()]
+            return len(records), sum(len(str(r)) for r in records)
+        finally:
+            db.close()
+    return produce
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Log dışa aktarma bellek / verim testi")
+    parser.add_argument("--rows", type = int, default = 1000000)
+    parser.add_argument("--plates", type = int, default = 5000)
+    parser.add_argument("--days", type = int, default = 180)
+    parser.add_argument("--legacy", action = "store_true", help = "Tüm tabloyu listeye yükleyen yöntemi de ölç")
+    args = parser.parse_args()
+
+    init_db()
+    seed(args.rows, args.plates, args.days)
+
+    print(f"\n{'Yöntem':<18} | {'Satır/sn':>10} | {'MB/sn':>8} | {'Çıktı MB':>8} | {'Bellek MB':>8}")
+    measure("CSV", stream("csv", False, args.rows))
+    measure("CSV + gzip", stream("csv", True, args.rows))
+    measure("NDJSON", stream("ndjson", False, args.rows))
+    measure("NDJSON + gzip", stream("ndjson", True, args.rows))
+    if args.legacy:
+        measure("Liste (eski)", legacy(args.rows))
+
+
+if __name__ == "__main__":
+    main()
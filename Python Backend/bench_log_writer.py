@@ -0,0 +1,67 @@
+"""
+Log yazma hızı testi: her log için ayrı commit ile toplu yazıcı (write-behind) karşılaştırılır.
+Geçici bir SQLite dosyası kullanılır, guvenlik.db'ye dokunulmaz.
+
+Kullanım:
+    python bench_log_writer.py --rows 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+DB_DIR = tempfile.mkdtemp()
+os.environ["GUVENLIK_DB_URL"] = f"sqlite:///{os.path.join(DB_DIR, 'bench.db')}"
+
+from database import init_db, SessionLocal, AccessLog
+from log_writer import AccessLogWriter
+
+
+def per_row_commit(rows):
+    start = time.perf_counter()
+    for i in range(rows):
+        db = SessionLocal()
+        try:
+            db.add(AccessLog(plate_number = f"34ABC{i % 1000:03d}", access_status = i % 2 == 0,
+                             vlm_description = "Test", timestamp = datetime.now()))
+            db.commit()
+        finally:
+            db.close()
+    return time.perf_counter() - start
+
+
+def write_behind(rows, sync):
+    writer = AccessLogWriter(sync = sync)
+    writer.start()
+
+    start = time.perf_counter()
+    for i in range(rows):
+        writer.submit(f"34ABC{i % 1000:03d}", i % 2 == 0, vlm_description = "Test")
+    submit_time = time.perf_counter() - start
+
+    writer.flush()
+    writer.stop()
+    return submit_time, time.perf_counter() - start, writer.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Log yazma hızı testi")
+    parser.add_argument("--rows", type = int, default = 5000)
+    args = parser.parse_args()
+
+    init_db()
+
+    elapsed = per_row_commit(args.rows)
+    print(f"Satır başına commit     : {args.rows / elapsed:>10.0f} log/sn")
+
+    submit_time, elapsed, stats = write_behind(args.rows, sync = True)
+    print(f"Yazıcı (senkron mod)    : {args.rows / elapsed:>10.0f} log/sn")
+
+    submit_time, elapsed, stats = write_behind(args.rows, sync = False)
+    print(f"Yazıcı (toplu)          : {args.rows / elapsed:>10.0f} log/sn "
+          f"(kapı döngüsü başına {submit_time / args.rows * 1e6:.1f} µs, {stats['batches']} transaction)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Çoklu kamera verim testi.
+
+Aynı video (veya rastgele kareler) N kamera gibi beslenir ve 1/2/4/8 kamera için
+toplu (batch) işleme ile kare kare işleme karşılaştırılır. Donanım boyutlandırması için kullanılır.
+
+Kullanım:
+    python bench_multistream.py --video ornek.mp4 --iterations 50
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from ai import AccessControlSystem
+
+
+def load_frames(video_path, count):
+    if video_path is None:
+        return [np.random.randint(0, 255, (720, 1280, 3), dtype = np.uint8) for _ in range(count)]
+
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < count:
+        success, frame = cap.read()
+        if not success:
+            break
+        frames.append(frame)
+    cap.release()
+
+    if not frames:
+        raise RuntimeError(f"Video okunamadı: {video_path}")
+    return frames
+
+
+def run(system, frames, streams, iterations, batched):
+    camera_ids = list(range(streams))
+    start = time.perf_counter()
+
+    for i in range(iterations):
+        batch = [frames[(i + camera_id) % len(frames)].copy() for camera_id in camera_ids]
+        if batched:
+            system.process_batch(batch, camera_ids)
+        else:
+            for frame, camera_id in zip(batch, camera_ids):
+                system.process_frame(frame, camera_id)
+
+    elapsed = time.perf_counter() - start
+    return streams * iterations / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Çoklu kamera verim testi")
+    parser.add_argument("--video", default = None, help = "Kare kaynağı (verilmezse rastgele kareler)")
+    parser.add_argument("--iterations", type = int, default = 30)
+    parser.add_argument("--streams", default = "1,2,4,8")
+    args = parser.parse_args()
+
+    system = AccessControlSystem()
+    system.check_database = lambda *a, **k: (False, "Test", None) # Test sırasında log yazılmasın
+
+    frames = load_frames(args.video, 64)
+    run(system, frames, 1, 3, True) # Isınma
+
+    print(f"{'Kamera':>6} | {'Tek tek (FPS)':>14} | {'Toplu (FPS)':>12} | {'Kamera başı FPS':>16} | {'Hızlanma':>8}")
+    for streams in [int(x) for x in args.streams.split(",")]:
+        sequential = run(system, frames, streams, args.iterations, batched = False)
+        batched = run(system, frames, streams, args.iterations, batched = True)
+        print(f"{streams:>6} | {sequential:>14.1f} | {batched:>12.1f} | {batched / streams:>16.1f} | {batched / sequential:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
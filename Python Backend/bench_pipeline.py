@@ -0,0 +1,327 @@
+"""
+Kare işleme boru hattı testi ve tekrar oynatma: aşama başına gecikme (p50 / p95 / p99), kare/sn,
+plaka başına OCR çağrısı ve aracın görülmesinden karara kadar geçen süre.
+
+Varsayılan senaryo: kapıdan art arda geçen araçlar sentetik karelere çizilir (ortada araçsız bir bölümle), araç / plaka modelleri
+senaryodaki kutuları, OCR senaryodaki plakayı (arada karışık karakter, eksik okuma ve yanlış karakterle)
+döner. Kare zamanı sanaldır, bu yüzden aynı tohumla her makinede aynı kararlar çıkar: kararlar, OCR çağrı
+sayısı ve doğru / yanlış / kaçan plaka sayıları birebir, süreler tolerans içinde karşılaştırılır.
+Ağ ve GPU gerekmez: sahte VLM, bellekte SQLite (guvenlik.db'ye dokunulmaz).
+
+--video ile kayıtlı kareler gerçek modellerle oynatılır (ağırlıklar gerekir); o zaman doğruluk yerine
+sadece süreler ve karar sayısı raporlanır.
+
+Kullanım:
+    python bench_pipeline.py
+    python bench_pipeline.py --save-baseline
+    python bench_pipeline.py --check --tolerance 0.25
+    python bench_pipeline.py --cameras 2 --cars 40 --model-ms 15
+    python bench_pipeline.py --video kapi.mp4 --frames 500
+"""
+import argparse
+import json
+import os
+import random
+import time
+from types import SimpleNamespace
+
+os.environ["GUVENLIK_DB_URL"] = "sqlite:///file:bench_pipeline?mode=memory&cache=shared&uri=true"
+
+import cv2
+import numpy as np
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_pipeline_baseline.json")
+EXACT_KEYS = ["frames", "skipped_frames", "decisions", "correct", "wrong", "missed", "ocr_calls", "events"] # Tekrar oynatmada birebir aynı olmalı
+MIN_REGRESSION_MS = 0.05 # Bundan küçük farklar ölçüm gürültüsü sayılır
+
+FRAME_SIZE = (540, 960) # yükseklik, genişlik
+CAR_SIZE = (150, 240)
+PLATE_BOX = (70, 100, 170, 130) # Araç kutusuna göre (x1, y1, x2, y2)
+QUIET_FRAMES = 250 # Senaryonun ortasında boş yol: takip biter, hareket kontrolü tüm kareleri atlar
+LETTERS = "ABCDEFGHJKLMNPRSTUVYZ"
+CONFUSIONS = {"0": "O", "1": "I", "2": "Z", "5": "S", "8": "B", "B": "8", "S": "5", "O": "0"}
+
+
+def random_plate(rng):
+    return f"{rng.randint(1, 81):02d}{''.join(rng.choice(LETTERS) for _ in range(rng.randint(1, 3)))}{rng.randint(10, 9999)}"
+
+
+class Scenario:
+    """Bir kameranın önünden sırayla geçen araçlar."""
+
+    def __init__(self, camera_id, cars, rng, first_index):
+        self.camera_id = camera_id
+        self.background = np.full(FRAME_SIZE + (3,), 90, dtype = np.uint8)
+        self.cars = []
+        frame = 10
+        for k in range(cars):
+            dwell = rng.randint(40, 90)
+            index = first_index + k
+            patch = np.random.default_rng(index).integers(0, 255, (30, 100, 3), dtype = np.uint8)
+            patch[12:18, 47:53] = (index % 256, index // 256, 77) # OCR taklidi plakayı buradan tanır
+            self.cars.append({"index": index, "plate": random_plate(rng), "enter": frame, "leave": frame + dwell,
+                              "color": (rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255)), "patch": patch})
+            frame += dwell + rng.randint(15, 60)
+            if k == cars // 2:
+                frame += QUIET_FRAMES
+        self.length = frame
+
+    def render(self, frame_no):
+        """(kare, araç kutuları) döner."""
+        frame = self.background.copy()
+        boxes = []
+        for car in self.cars:
+            if not car["enter"] <= frame_no < car["leave"]:
+                continue
+            progress = (frame_no - car["enter"]) / (car["leave"] - car["enter"])
+            x1 = int(20 + progress * (FRAME_SIZE[1] - CAR_SIZE[1] - 40))
+            y1 = 300
+            x2, y2 = x1 + CAR_SIZE[1], y1 + CAR_SIZE[0]
+            frame[y1:y2, x1:x2] = car["color"]
+            px1, py1, px2, py2 = PLATE_BOX
+            frame[y1 + py1:y1 + py2, x1 + px1:x1 + px2] = car["patch"]
+            boxes.append((x1, y1, x2, y2))
+        return frame, boxes
+
+
+def fake_box(x1, y1, x2, y2, conf = 0.9):
+    return SimpleNamespace(xyxy = [(x1, y1, x2, y2)], conf = [conf])
+
+
+class ScriptedVehicleModel:
+    """Senaryodaki araç kutularını döner. Kutular kare nesnesine göre tutulur (hareketsiz kareler modele gelmez)."""
+
+    def __init__(self, cost = 0.0):
+        self.boxes = {}
+        self.cost = cost
+
+    def __call__(self, frames, **kwargs):
+        if self.cost:
+            time.sleep(self.cost * len(frames))
+        return [SimpleNamespace(boxes = [fake_box(*box) for box in self.boxes.get(id(frame), [])]) for frame in frames]
+
+
+class ScriptedPlateModel:
+    def __init__(self, cost = 0.0):
+        self.cost = cost
+
+    def __call__(self, crops, **kwargs):
+        if self.cost:
+            time.sleep(self.cost * len(crops))
+        px1, py1, px2, py2 = PLATE_BOX
+        return [SimpleNamespace(boxes = [fake_box(px1, py1, px2, py2)] if crop.shape[0] >= py2 and crop.shape[1] >= px2 else [])
+                for crop in crops]
+
+
+class ScriptedReader:
+    """EasyOCR yerine: plaka görüntüsündeki işaretten aracı bulur, plakasını ara sıra hatalı okur."""
+
+    def __init__(self, plates, seed, cost = 0.0):
+        self.plates = plates
+        self.random = random.Random(seed)
+        self.cost = cost
+
+    def readtext(self, image, detail = 0):
+        if self.cost:
+            time.sleep(self.cost)
+        b, g, _ = image[image.shape[0] // 2, image.shape[1] // 2]
+        plate = self.plates.get(int(b) + 256 * int(g))
+        roll = self.random.random()
+        if plate is None or roll < 0.10:
+            return [] # Okunamadı
+        if roll < 0.25: # OCR karışıklığı (0/O, 8/B ...)
+            positions = [i for i, ch in enumerate(plate) if ch in CONFUSIONS]
+            if positions:
+                i = self.random.choice(positions)
+                plate = plate[:i] + CONFUSIONS[plate[i]] + plate[i + 1:]
+        elif roll < 0.30: # Yanlış karakter
+            i = self.random.randrange(2, len(plate))
+            plate = plate[:i] + self.random.choice(LETTERS if plate[i].isalpha() else "0123456789") + plate[i + 1:]
+        return [plate]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] if values else None
+
+
+def build_system(args, plates):
+    from ai import AccessControlSystem
+    from vlm_worker import FakeVLMBackend, VLMWorkerPool
+
+    system = AccessControlSystem(camera_sources = [], lazy = True)
+    if args.video:
+        system.use_vlm = False
+        system.load_models(warmup = True)
+    else:
+        system.vehicle_model = ScriptedVehicleModel(args.model_ms / 1000)
+        system.vehicle_imgsz = None # Sahte model kutuları kare nesnesine göre bulur, kare küçültülmeden verilsin
+        system.plate_model = ScriptedPlateModel(args.model_ms / 1000)
+        system.reader = ScriptedReader(plates, args.seed, args.ocr_ms / 1000)
+    system.vlm_backend = FakeVLMBackend(latency = 0.02, jitter = 0.01, seed = args.seed)
+    system.vlm_worker = VLMWorkerPool(system.vlm_backend, system.update_vlm_description, workers = 2)
+    return system
+
+
+def run(args):
+    from database import init_db
+    from log_writer import log_writer
+    from plate_index import allowlist_index
+
+    init_db()
+    log_writer.start()
+    allowlist_index.load()
+
+    rng = random.Random(args.seed)
+    scenarios, plates = [], {}
+    if not args.video:
+        for camera_id in range(args.cameras):
+            scenario = Scenario(camera_id, args.cars, rng, first_index = camera_id * args.cars)
+            scenarios.append(scenario)
+            for car in scenario.cars:
+                plates[car["index"]] = car["plate"]
+                if car["index"] % 2 == 0: # Yarısı kayıtlı araç
+                    allowlist_index.add(car["plate"], 1, "daire1")
+
+    system = build_system(args, plates)
+    events = []
+    system.event_listeners.append(lambda event: events.append(event) if event["type"] == "access" else None)
+
+    fps = 25.0
+    start_time = 1_800_000_000.0 # Sanal saat: kare zamanı makineden bağımsız
+    latencies = []
+
+    if args.video:
+        cap = cv2.VideoCapture(args.video)
+        fps = cap.get(cv2.CAP_PROP_FPS) or fps
+        frame_no = 0
+        while frame_no < args.frames:
+            success, frame = cap.read()
+            if not success:
+                break
+            t = time.perf_counter()
+            system.process_batch([frame], [0], timestamps = [start_time + frame_no / fps])
+            latencies.append(time.perf_counter() - t)
+            frame_no += 1
+        cap.release()
+        total_frames = frame_no
+    else:
+        length = max(scenario.length for scenario in scenarios)
+        for frame_no in range(length):
+            frames, camera_ids = [], []
+            for scenario in scenarios:
+                frame, boxes = scenario.render(frame_no)
+                system.vehicle_model.boxes[id(frame)] = boxes
+                frames.append(frame)
+                camera_ids.append(scenario.camera_id)
+            t = time.perf_counter()
+            system.process_batch(frames, camera_ids, timestamps = [start_time + frame_no / fps] * len(frames))
+            latencies.append(time.perf_counter() - t)
+            system.vehicle_model.boxes.clear()
+        total_frames = length * len(scenarios)
+
+    log_writer.flush()
+    system.vlm_worker.stop()
+
+    stages = system.stage_timer.summary()
+    time_to_plate = stages.pop("time_to_plate", {})
+    ocr_calls = system.ocr_scheduler.ocr_calls
+    result = {
+        "frames": total_frames,
+        "skipped_frames": sum(state.skipped_frames for state in system.camera_states.values()), # Hareket yok, tespit atlandı
+        "fps": round(total_frames / sum(latencies), 1) if latencies else None,
+        "stages": stages,
+        "time_to_plate_ms": {key: value for key, value in time_to_plate.items() if key.startswith("p")},
+        "decisions": len(events),
+        "ocr_calls": ocr_calls,
+        "ocr_per_plate": round(ocr_calls / len(events), 2) if events else None,
+        "events": [[event["camera"], event["plate"], round(datetime_seconds(event) - start_time, 2)] for event in events],
+    }
+
+    if not args.video:
+        truth = {(scenario.camera_id, car["plate"]) for scenario in scenarios for car in scenario.cars}
+        decided = {(event["camera"], event["plate"]) for event in events}
+        result["correct"] = len(decided & truth)
+        result["wrong"] = len(decided - truth)
+        result["missed"] = len(truth - decided)
+    return result
+
+
+def datetime_seconds(event):
+    from datetime import datetime
+    return datetime.fromisoformat(event["timestamp"]).timestamp()
+
+
+def print_result(result):
+    print(f"\n{'Aşama':<16} | {'çağrı':>7} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8}")
+    for stage, values in result["stages"].items():
+        print(f"{stage:<16} | {values['calls']:>7} | {values.get('p50_ms', 0):>8.3f} | {values.get('p95_ms', 0):>8.3f} | {values.get('p99_ms', 0):>8.3f}")
+
+    print(f"\n{result['frames']} kare ({result['skipped_frames']} atlandı), {result['fps']} kare/sn")
+    print(f"Karar: {result['decisions']}, OCR çağrısı: {result['ocr_calls']} (plaka başına {result['ocr_per_plate']})")
+    ttp = result["time_to_plate_ms"]
+    if ttp:
+        print(f"Araç görüldükten karara: p50 {ttp.get('p50_ms')} ms, p95 {ttp.get('p95_ms')} ms (kare zamanı)")
+    if "correct" in result:
+        print(f"Doğru: {result['correct']}, yanlış: {result['wrong']}, kaçan: {result['missed']}")
+
+
+def compare(result, baseline, tolerance):
+    """Gerilemeleri listeler. Boş liste: geçti."""
+    problems = []
+    for key in EXACT_KEYS:
+        if key in baseline and result.get(key) != baseline[key]:
+            shown = "farklı" if key == "events" else f"{baseline[key]} -> {result.get(key)}"
+            problems.append(f"{key} değişti ({shown})")
+
+    if baseline.get("fps") and result["fps"] < baseline["fps"] * (1 - tolerance):
+        problems.append(f"kare/sn düştü: {baseline['fps']} -> {result['fps']}")
+
+    for stage, base in baseline.get("stages", {}).items():
+        current = result["stages"].get(stage)
+        if current is None or "p95_ms" not in base:
+            continue
+        limit = max(base["p95_ms"] * (1 + tolerance), base["p95_ms"] + MIN_REGRESSION_MS)
+        if current["p95_ms"] > limit:
+            problems.append(f"{stage} p95 yükseldi: {base['p95_ms']} -> {current['p95_ms']} ms")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Kare işleme boru hattı testi")
+    parser.add_argument("--cameras", type = int, default = 1)
+    parser.add_argument("--cars", type = int, default = 30, help = "Kamera başına araç")
+    parser.add_argument("--seed", type = int, default = 7)
+    parser.add_argument("--model-ms", type = float, default = 0.0, help = "Sahte modellerin kare başına süresi")
+    parser.add_argument("--ocr-ms", type = float, default = 0.0, help = "Sahte OCR'ın okuma başına süresi")
+    parser.add_argument("--video", default = None, help = "Kayıtlı video ile gerçek modeller")
+    parser.add_argument("--frames", type = int, default = 500, help = "--video ile en fazla kare")
+    parser.add_argument("--baseline", default = BASELINE_PATH)
+    parser.add_argument("--save-baseline", action = "store_true")
+    parser.add_argument("--check", action = "store_true", help = "Baz değerle karşılaştır, gerilemede çıkış kodu 1")
+    parser.add_argument("--tolerance", type = float, default = 0.25, help = "Süre ve kare/sn için izin verilen oran")
+    args = parser.parse_args()
+
+    result = run(args)
+    print_result(result)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding = "utf-8") as f:
+            json.dump(result, f, ensure_ascii = False, indent = 1)
+        print(f"\nBaz değer kaydedildi: {args.baseline}")
+
+    if args.check:
+        with open(args.baseline, encoding = "utf-8") as f:
+            problems = compare(result, json.load(f), args.tolerance)
+        if problems:
+            print("\nGERİLEME:")
+            for problem in problems:
+                print(f"  - {problem}")
+            os._exit(1)
+        print("\nBaz değerle uyumlu")
+
+    os._exit(0) # Arka plan thread'leri beklenmesin
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Yakın plaka eşleştirme testi: onbinlerce izinli plaka üzerinde sorgu süresi ve doğruluk.
+
+Her sorgu izinli bir plakadan OCR hatası eklenerek üretilir (karışık karakter, eksik / fazla / farklı karakter)
+ya da listede olmayan rastgele bir plakadır. Yanlış kabul: listede olmayan plakanın ya da yanlış plakanın eşleşmesi.
+
+Kullanım:
+    python bench_plate_match.py --plates 50000 --queries 20000
+    python bench_plate_match.py --threshold 0.3 --indel-threshold 0.8
+"""
+import argparse
+import random
+import time
+
+from plate_match import DIGIT_TO_LETTER, LETTER_TO_DIGIT, FuzzyPlateIndex, match_threshold
+
+LETTERS = "ABCDEFGHJKLMNOPRSTUVYZ"
+
+
+def random_plate(rng):
+    letters = rng.randint(1, 3)
+    digits = {1: 4, 2: rng.choice([3, 4]), 3: rng.choice([2, 3])}[letters]
+    return (f"{rng.randint(1, 81):02d}" + "".join(rng.choice(LETTERS) for _ in range(letters))
+            + "".join(str(rng.randint(0, 9)) for _ in range(digits)))
+
+
+def corrupt(plate, kind, rng):
+    """Plakaya tek bir OCR hatası ekler."""
+    i = rng.randrange(len(plate))
+    if kind == "confusion":
+        positions = [j for j, ch in enumerate(plate) if ch in LETTER_TO_DIGIT or ch in DIGIT_TO_LETTER]
+        if not positions:
+            return plate
+        i = rng.choice(positions)
+        ch = plate[i]
+        swap = LETTER_TO_DIGIT.get(ch) or DIGIT_TO_LETTER.get(ch)
+        return plate[:i] + swap + plate[i + 1:]
+    if kind == "drop":
+        return plate[:i] + plate[i + 1:]
+    if kind == "extra":
+        return plate[:i] + rng.choice(LETTERS + "0123456789") + plate[i:]
+    return plate[:i] + rng.choice(LETTERS + "0123456789") + plate[i + 1:] # substitute
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Yakın plaka eşleştirme testi")
+    parser.add_argument("--plates", type = int, default = 50000)
+    parser.add_argument("--queries", type = int, default = 20000)
+    parser.add_argument("--threshold", type = float, default = 0.6)
+    parser.add_argument("--indel-threshold", type = float, default = 0.8, help = "Düzene uymayan okumalar için")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    plates = list({random_plate(rng) for _ in range(args.plates)})
+    allowed = set(plates)
+
+    start = time.perf_counter()
+    index = FuzzyPlateIndex(plates)
+    print(f"{len(plates)} plaka, index {time.perf_counter() - start:.2f} sn\n")
+
+    print(f"{'Hata türü':<12} | {'Doğru':>7} | {'Yanlış kabul':>12} | {'Ret':>7} | {'p50 µs':>7} | {'p99 µs':>7}")
+    for kind in ["confusion", "drop", "extra", "substitute", "stranger"]:
+        correct, wrong, rejected, latencies = 0, 0, 0, []
+        for _ in range(args.queries // 5):
+            if kind == "stranger":
+                truth = None
+                query = random_plate(rng)
+                while query in allowed:
+                    query = random_plate(rng)
+            else:
+                truth = rng.choice(plates)
+                query = corrupt(truth, kind, rng)
+
+            t = time.perf_counter()
+            found = index.closest(query, match_threshold(query, args.threshold, args.indel_threshold))
+            latencies.append((time.perf_counter() - t) * 1e6)
+
+            if found is None:
+                rejected += 1
+            elif found[0] == truth:
+                correct += 1
+            else:
+                wrong += 1
+
+        total = args.queries // 5
+        print(f"{kind:<12} | {correct / total:>7.1%} | {wrong / total:>12.2%} | {rejected / total:>7.1%} | "
+              f"{percentile(latencies, 50):>7.0f} | {percentile(latencies, 99):>7.0f}")
+
+
+if __name__ == "__main__":
+    main()
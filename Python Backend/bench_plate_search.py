@@ -0,0 +1,87 @@
+"""
+Kısmi plaka arama testi: büyük sentetik log tablosunda arama + ilk sayfa gecikmesi (p50 / p99).
+Karşılaştırma için aynı aramanın LIKE '%..%' ile tablo taraması da ölçülür.
+Geçici bir SQLite dosyası kullanılır, guvenlik.db'ye dokunulmaz.
+
+Kullanım:
+    python bench_plate_search.py --rows 1000000 --plates 100000
+"""
+import argparse
+import random
+import time
+from datetime import timedelta
+
+from bench_admin_logs import percentile, seed # Geçici veritabanını da o ayarlar
+from database import init_db, SessionLocal, AccessLog
+from log_queries import log_page, log_rows
+from plate_search import matching_plates, rebuild_search_index
+
+
+def search(db, q, mode, **filters):
+    plates = matching_plates(db, q, mode)
+    if not plates:
+        return 0, 0
+    rows, _ = log_page(db, limit = 100, plates = plates, **filters)
+    return len(plates), len(rows)
+
+
+def like_scan(db, q, mode, **filters):
+    """Eski yöntem: plaka sütununda LIKE ile tarama."""
+    like = {"prefix": f"{q}%", "contains": f"%{q}%"}.get(mode, q.replace("*", "%").replace("?", "_"))
+    query = log_rows(db).filter(AccessLog.plate_number.like(like))
+    if "date_from" in filters:
+        query = query.filter(AccessLog.timestamp >= filters["date_from"], AccessLog.timestamp < filters["date_to"])
+    rows = query.order_by(AccessLog.timestamp.desc(), AccessLog.id.desc()).limit(100).all()
+    return None, len(rows)
+
+
+def measure(name, fn, queries, **filters):
+    db = SessionLocal()
+    try:
+        latencies, plates, rows = [], 0, 0
+        for q, mode in queries:
+            start = time.perf_counter()
+            matched, found = fn(db, q, mode, **filters)
+            latencies.append((time.perf_counter() - start) * 1000)
+            plates += matched or 0
+            rows += found
+        print(f"{name:<38} | {percentile(latencies, 50):>7.1f} | {percentile(latencies, 99):>7.1f} | "
+              f"{plates / len(queries):>7.1f} | {rows / len(queries):>6.1f}")
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Kısmi plaka arama testi")
+    parser.add_argument("--rows", type = int, default = 1000000)
+    parser.add_argument("--plates", type = int, default = 100000)
+    parser.add_argument("--days", type = int, default = 90)
+    parser.add_argument("--queries", type = int, default = 50)
+    parser.add_argument("--skip-like", action = "store_true", help = "LIKE karşılaştırmasını atla")
+    args = parser.parse_args()
+
+    init_db()
+    plate_list, start = seed(args.rows, args.plates, args.days)
+    rebuild_search_index()
+
+    rng = random.Random(1)
+    sample = [rng.choice(plate_list) for _ in range(args.queries)]
+    scenarios = {
+        "prefix (il + harf)": [(p[:3], "prefix") for p in sample],
+        "contains (3 karakter)": [(p[3:6], "contains") for p in sample],
+        "wildcard (34*12)": [(f"{p[:2]}*{p[-2:]}", "wildcard") for p in sample],
+        "wildcard (?? + harf + ?)": [(f"??{p[2:4]}*{p[-1]}", "wildcard") for p in sample],
+        "similar (bir karakter eksik)": [(p[:4] + p[5:], "similar") for p in sample],
+    }
+    week = {"date_from": start + timedelta(days = args.days // 2), "date_to": start + timedelta(days = args.days // 2 + 7)}
+
+    print(f"\n{'Senaryo':<38} | {'p50 ms':>7} | {'p99 ms':>7} | {'plaka':>7} | {'satır':>6}")
+    for name, queries in scenarios.items():
+        measure(name, search, queries)
+        measure(name + " + 1 hafta", search, queries, **week)
+        if not args.skip_like and name.split()[0] in ["contains", "wildcard"]:
+            measure(name + " LIKE", like_scan, queries[:5], **week)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Canlı yayın profilleri testi: profil başına kodlama süresi, kare boyutu ve bant genişliği.
+
+Ardından karışık izleyicilerle (ör. 2 tam, 5 orta, 10 düşük) kamera hızında sanal bir yayın oynatılır ve
+profil başına bir kez kodlama (FrameBroadcaster gruplaması) şu iki yöntemle karşılaştırılır:
+herkese tam çözünürlük (eski davranış) ve her izleyiciye ayrı kodlama.
+Son olarak multipart parçasını kurma maliyeti ölçülür (tobytes + birleştirme vs. tek kopya).
+
+Kullanım:
+    python bench_stream_tiers.py --video kapi.mp4
+    python bench_stream_tiers.py --viewers full:2,medium:5,low:10 --seconds 10
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from bench_admin_logs import percentile
+from pipeline import STREAM_TIERS, FrameBroadcaster, encode_tiers, mjpeg_part
+
+
+def synthetic_frames(count, width, height):
+    """Kamera görüntüsüne benzer (düz alanlar, doku, kenarlar) kareler; rastgele gürültü JPEG boyutunu abartır."""
+    rng = np.random.default_rng(1)
+    ys, xs = np.mgrid[0:height, 0:width]
+    background = np.dstack([(xs * 255 // width), (ys * 255 // height), np.full_like(xs, 120)]).astype(np.uint8)
+    texture = cv2.GaussianBlur(rng.integers(0, 60, (height, width, 3), dtype = np.uint8), (0, 0), 3)
+    base = cv2.add(background, texture)
+    for _ in range(12): # Bina, direk, kaldırım
+        x, y = int(rng.integers(0, width - 200)), int(rng.integers(0, height - 200))
+        cv2.rectangle(base, (x, y), (x + int(rng.integers(40, 300)), y + int(rng.integers(40, 300))),
+                      tuple(int(c) for c in rng.integers(0, 255, 3)), -1)
+
+    frames = []
+    for i in range(count):
+        frame = base.copy()
+        x = int((i * 17) % (width - 400))
+        cv2.rectangle(frame, (x, height // 2), (x + 400, height // 2 + 220), (40, 40, 200), -1) # Araç
+        cv2.rectangle(frame, (x + 140, height // 2 + 170), (x + 260, height // 2 + 200), (255, 255, 255), -1)
+        cv2.putText(frame, "34 ABC 123", (x + 145, height // 2 + 193), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 2)
+        noise = rng.integers(0, 8, frame.shape, dtype = np.uint8) # Sensör gürültüsü
+        frames.append(cv2.add(frame, noise))
+    return frames
+
+
+def load_frames(video_path, count, width, height):
+    if video_path is None:
+        return synthetic_frames(count, width, height)
+
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < count:
+        success, frame = cap.read()
+        if not success:
+            break
+        frames.append(frame)
+    cap.release()
+    if not frames:
+        raise RuntimeError(f"Video okunamadı: {video_path}")
+    return frames
+
+
+def profile_fps(profile, camera_fps):
+    return min(profile.max_fps or camera_fps, camera_fps)
+
+
+def bench_tiers(frames, camera_fps, quality):
+    print(f"\n{'Profil':<8} | {'çözünürlük':>10} | {'kalite':>6} | {'fps':>4} | {'kod. p50 ms':>11} | {'KB/kare':>8} | {'Mbit/sn':>8}")
+    height, width = frames[0].shape[:2]
+    for name, profile in STREAM_TIERS.items():
+        target = profile.width if profile.width and profile.width < width else width
+        latencies, sizes = [], []
+        for frame in frames:
+            start = time.perf_counter()
+            chunks = encode_tiers(frame, [profile.encoding], quality)
+            latencies.append((time.perf_counter() - start) * 1000)
+            sizes.append(len(chunks[profile.encoding]))
+        fps = profile_fps(profile, camera_fps)
+        kb = sum(sizes) / len(sizes) / 1000
+        print(f"{name:<8} | {target:>4}x{round(height * target / width):<5} | {profile.quality or quality:>6} | {fps:>4} | "
+              f"{percentile(latencies, 50):>11.2f} | {kb:>8.1f} | {kb * 8 * fps / 1000:>8.2f}")
+
+
+def parse_viewers(text):
+    viewers = []
+    for part in text.split(","):
+        name, count = part.split(":")
+        viewers += [STREAM_TIERS[name]] * int(count)
+    return viewers
+
+
+def simulate(frames, viewers, camera_fps, seconds, quality, mode):
+    """
+    Kamera hızında sanal yayın. mode: "shared" (profil başına bir kez), "per_client" (izleyici başına ayrı kodlama),
+    "full" (herkese tam çözünürlük, her kare). (kodlama sayısı, kodlama CPU saniyesi, gönderilen bayt) döner.
+    """
+    if mode == "full":
+        viewers = [STREAM_TIERS["full"]] * len(viewers)
+    broadcaster = FrameBroadcaster(queue_size = 2)
+    subscribers = [broadcaster.subscribe(profile) for profile in viewers]
+
+    encodes, cpu, sent = 0, 0.0, 0
+    for i in range(int(seconds * camera_fps)):
+        now = i / camera_fps # Sanal saat
+        frame = frames[i % len(frames)]
+        groups = broadcaster.due_groups(now)
+        start = time.perf_counter()
+        if mode == "per_client":
+            chunks = {}
+            for encoding, subscribers_in_group in groups.items():
+                for _ in subscribers_in_group:
+                    chunks.update(encode_tiers(frame, [encoding], quality)) # Paylaşım yok
+                    encodes += 1
+        else:
+            chunks = encode_tiers(frame, groups, quality)
+            encodes += len(chunks)
+        cpu += time.perf_counter() - start
+        broadcaster.publish_groups(groups, chunks, now)
+
+        for subscriber in subscribers:
+            while len(subscriber):
+                sent += len(subscriber.get(timeout = 0))
+    return encodes, cpu, sent
+
+
+def bench_chunk(frames, viewers, quality, repeat = 200):
+    success, buffer = cv2.imencode(".jpg", frames[0], [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+    header = b"--frame\r\nContent-Type: image/jpeg\r\n\r\n"
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for _ in range(viewers):
+            header + buffer.tobytes() + b"\r\n" # Eski: izleyici başına iki kopya
+    old = (time.perf_counter() - start) / repeat * 1e6
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        mjpeg_part(buffer) # Yeni: kare başına tek kopya, izleyiciler aynı bytes nesnesini alır
+    new = (time.perf_counter() - start) / repeat * 1e6
+    print(f"\nMultipart parçası ({len(buffer) / 1000:.0f} KB, {viewers} izleyici): "
+          f"tobytes + birleştirme {old:.0f} us/kare, tek kopya {new:.0f} us/kare")
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Canlı yayın profilleri testi")
+    parser.add_argument("--video", default = None, help = "Kare kaynağı (verilmezse yapay kareler)")
+    parser.add_argument("--width", type = int, default = 1920)
+    parser.add_argument("--height", type = int, default = 1080)
+    parser.add_argument("--frames", type = int, default = 30)
+    parser.add_argument("--camera-fps", type = int, default = 25)
+    parser.add_argument("--quality", type = int, default = 80, help = "full profilinin JPEG kalitesi")
+    parser.add_argument("--viewers", default = "full:2,medium:5,low:10")
+    parser.add_argument("--seconds", type = float, default = 4.0, help = "Sanal yayın süresi")
+    args = parser.parse_args()
+
+    cv2.setNumThreads(1) # Tek çekirdek maliyeti
+    frames = load_frames(args.video, args.frames, args.width, args.height)
+    bench_tiers(frames, args.camera_fps, args.quality)
+
+    viewers = parse_viewers(args.viewers)
+    print(f"\n{len(viewers)} izleyici ({args.viewers}), kamera {args.camera_fps} fps, {args.seconds:.0f} sn")
+    print(f"{'Yöntem':<30} | {'kodlama/sn':>10} | {'CPU %':>6} | {'çıkış Mbit/sn':>13}")
+    for mode, name in [("full", "herkese tam çözünürlük (eski)"), ("per_client", "izleyici başına kodlama"),
+                       ("shared", "profil başına bir kez")]:
+        encodes, cpu, sent = simulate(frames, viewers, args.camera_fps, args.seconds, args.quality, mode)
+        print(f"{name:<30} | {encodes / args.seconds:>10.1f} | {cpu / args.seconds * 100:>6.1f} | "
+              f"{sent * 8 / args.seconds / 1e6:>13.2f}")
+
+    bench_chunk(frames, len(viewers), args.quality)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+VLM worker testi (çevrimdışı, sahte VLM ile).
+
+Kapıya arka arkaya araç gelmesi simüle edilir. Senkron çağrıda görüntü döngüsünün ne kadar
+donduğu ile worker havuzu kullanıldığında döngünün ne kadar beklediği karşılaştırılır.
+
+Kullanım:
+    python bench_vlm.py --events 40 --latency 0.8 --failure-rate 0.1
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from vlm_worker import FakeVLMBackend, VLMWorkerPool
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "VLM worker testi")
+    parser.add_argument("--events", type = int, default = 40)
+    parser.add_argument("--interval", type = float, default = 0.1, help = "Araçlar arası süre (sn)")
+    parser.add_argument("--latency", type = float, default = 0.8)
+    parser.add_argument("--failure-rate", type = float, default = 0.1)
+    parser.add_argument("--workers", type = int, default = 2)
+    parser.add_argument("--timeout", type = float, default = 2.0)
+    args = parser.parse_args()
+
+    crop = np.zeros((240, 320, 3), dtype = np.uint8)
+
+    # 1) Senkron: her araçta döngü VLM cevabını bekler
+    backend = FakeVLMBackend(latency = args.latency, failure_rate = args.failure_rate, seed = 1)
+    stalls = []
+    for _ in range(args.events):
+        start = time.perf_counter()
+        try:
+            backend.describe(crop, timeout = args.timeout)
+        except Exception:
+            pass
+        stalls.append(time.perf_counter() - start)
+        time.sleep(args.interval)
+
+    print("Senkron VLM")
+    print(f"  Döngü bekleme p50/p99: {percentile(stalls, 50) * 1000:.1f} / {percentile(stalls, 99) * 1000:.1f} ms")
+    print(f"  Toplam süre: {sum(stalls) + args.events * args.interval:.1f} sn")
+
+    # 2) Worker havuzu: döngü sadece işi kuyruğa bırakır
+    backend = FakeVLMBackend(latency = args.latency, failure_rate = args.failure_rate, seed = 1)
+    submitted_at = {}
+    completion = []
+    done = threading.Event()
+    lock = threading.Lock()
+
+    def on_result(log_id, description):
+        with lock:
+            completion.append(time.perf_counter() - submitted_at[log_id])
+            if len(completion) == args.events:
+                done.set()
+
+    pool = VLMWorkerPool(backend, on_result, workers = args.workers, timeout = args.timeout, backoff = 0.2)
+    stalls = []
+    start_all = time.perf_counter()
+    for log_id in range(args.events):
+        submitted_at[log_id] = time.perf_counter()
+        start = time.perf_counter()
+        pool.submit(log_id, crop)
+        stalls.append(time.perf_counter() - start)
+        time.sleep(args.interval)
+
+    done.wait(timeout = args.events * (args.latency + args.timeout) * 3)
+    pool.stop()
+
+    print(f"Worker havuzu ({args.workers} worker)")
+    print(f"  Döngü bekleme p50/p99: {percentile(stalls, 50) * 1000:.3f} / {percentile(stalls, 99) * 1000:.3f} ms")
+    print(f"  Log güncellenme gecikmesi p50/p99: {percentile(completion, 50):.2f} / {percentile(completion, 99):.2f} sn")
+    print(f"  Toplam süre: {time.perf_counter() - start_all:.1f} sn")
+    print(f"  İstatistik: {pool.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Çoklu uvicorn worker testi: worker sayısı arttıkça API isteği verimi ve çıkarım döngüsünün FPS'i.
+
+Çıkarım süreci yerine sentetik bir süreç paylaşılan belleğe hedef FPS'te kare yazar ve kare başına
+--infer-ms kadar CPU harcar. API worker'ları external modda çalışır, yük altında çıkarım döngüsünün
+FPS'i düşmemelidir. Gerçek inference_service.py çalışıyorsa --service ile o kullanılır.
+Geçici bir SQLite dosyası kullanılır, guvenlik.db'ye dokunulmaz.
+
+Kullanım:
+    python bench_workers.py --workers 1,2,4 --duration 10
+    python bench_workers.py --workers 4 --viewers 3 --service
+"""
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+DB_DIR = tempfile.mkdtemp()
+os.environ["GUVENLIK_DB_URL"] = f"sqlite:///{os.path.join(DB_DIR, 'bench.db')}"
+os.environ["GUVENLIK_INFERENCE_MODE"] = "external"
+
+from inference_service import CTRL_CAMERAS, CTRL_HEARTBEAT_US, ControlBlock, SharedFrameRing
+
+
+def fake_inference(stop_event, fps, infer_ms, cameras):
+    """Sentetik çıkarım döngüsü: kare başına infer_ms CPU harcar, kareyi halka tampona yazar."""
+    ring = SharedFrameRing.create(slots = 3 * cameras, max_height = 720, max_width = 1280)
+    control = ControlBlock.create()
+    control.values[CTRL_CAMERAS] = cameras
+    frame = np.random.randint(0, 255, (720, 1280, 3), dtype = np.uint8)
+    interval = 1.0 / fps
+
+    try:
+        while not stop_event.is_set():
+            start = time.perf_counter()
+            control.values[CTRL_HEARTBEAT_US] = int(time.time() * 1e6)
+            while (time.perf_counter() - start) * 1000 < infer_ms:
+                pass # Model çalışıyormuş gibi
+            for camera_id in range(cameras):
+                ring.write(camera_id, frame)
+            time.sleep(max(0.0, interval - (time.perf_counter() - start)))
+    finally:
+        ring.close()
+        control.close()
+
+
+def request_load(url, token, duration, threads, results):
+    """İstemci süreci: threads adet bağlantı ile duration saniye /plates/ ister."""
+    import httpx
+
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.time() + duration
+
+    def run():
+        local = []
+        with httpx.Client(base_url = url, headers = {"Authorization": f"Bearer {token}"}, timeout = 10) as client:
+            while time.time() < deadline:
+                start = time.perf_counter()
+                response = client.get("/plates/")
+                if response.status_code == 200:
+                    local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target = run) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    results.put(latencies)
+
+
+def watch_stream(url, camera, stop_event, counter):
+    """MJPEG izleyicisi: gelen kareleri sayar."""
+    import httpx
+
+    try:
+        with httpx.stream("GET", f"{url}/video_feed?camera={camera}", timeout = 10) as response:
+            for chunk in response.iter_bytes():
+                counter[0] += chunk.count(b"--frame")
+                if stop_event.is_set():
+                    return
+    except Exception as e:
+        print(f"İzleyici hatası: {e}")
+
+
+def wait_ready(url, timeout = 60):
+    import httpx
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{url}/health/ready", timeout = 2).status_code == 200:
+                return True
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] if values else 0.0
+
+
+def run_round(args, workers, port):
+    import httpx
+
+    url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "app:app", "--port", str(port),
+                               "--workers", str(workers), "--log-level", "warning"],
+                              stdout = subprocess.DEVNULL)
+    try:
+        if not wait_ready(url):
+            print(f"{workers} worker: sunucu hazır olmadı")
+            return None
+
+        token = httpx.post(f"{url}/login", data = {"username": "admin", "password": "1234"}).json()["access_token"]
+        ring = SharedFrameRing.attach()
+
+        stop_viewers = threading.Event()
+        counters = [[0] for _ in range(args.viewers)]
+        viewers = [threading.Thread(target = watch_stream, args = (url, 0, stop_viewers, counter), daemon = True)
+                   for counter in counters]
+        for t in viewers:
+            t.start()
+
+        results = multiprocessing.Queue()
+        clients = [multiprocessing.Process(target = request_load, args = (url, token, args.duration, args.threads, results))
+                   for _ in range(args.clients)]
+
+        frames_before = ring.total_frames()
+        start = time.perf_counter()
+        for p in clients:
+            p.start()
+        latencies = []
+        for _ in clients:
+            latencies.extend(results.get())
+        for p in clients:
+            p.join()
+        elapsed = time.perf_counter() - start
+        frames_after = ring.total_frames()
+
+        stop_viewers.set()
+        ring.close()
+
+        cameras = args.cameras if not args.service else 1
+        return {
+            "rps": len(latencies) / elapsed,
+            "p50": percentile(latencies, 50) * 1000,
+            "p99": percentile(latencies, 99) * 1000,
+            "infer_fps": (frames_after - frames_before) / elapsed / cameras,
+            "viewer_fps": sum(c[0] for c in counters) / elapsed / max(1, args.viewers),
+        }
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Çoklu worker API verimi ve çıkarım FPS testi")
+    parser.add_argument("--workers", default = "1,2,4")
+    parser.add_argument("--duration", type = float, default = 10.0)
+    parser.add_argument("--clients", type = int, default = 4, help = "Yük üreten süreç sayısı")
+    parser.add_argument("--threads", type = int, default = 8, help = "Süreç başına bağlantı")
+    parser.add_argument("--viewers", type = int, default = 2, help = "Eşzamanlı MJPEG izleyicisi")
+    parser.add_argument("--fps", type = float, default = 25.0, help = "Sentetik çıkarım hedef FPS")
+    parser.add_argument("--infer-ms", type = float, default = 15.0, help = "Sentetik kare başına model süresi")
+    parser.add_argument("--cameras", type = int, default = 1)
+    parser.add_argument("--service", action = "store_true", help = "Çalışan inference_service.py'yi kullan")
+    parser.add_argument("--port", type = int, default = 8765)
+    args = parser.parse_args()
+
+    stop_event = multiprocessing.Event()
+    inference = None
+    if not args.service:
+        inference = multiprocessing.Process(target = fake_inference, args = (stop_event, args.fps, args.infer_ms, args.cameras))
+        inference.start()
+        time.sleep(1.0)
+
+    rows = []
+    try:
+        for workers in [int(w) for w in args.workers.split(",")]:
+            result = run_round(args, workers, args.port)
+            if result:
+                rows.append((workers, result))
+    finally:
+        stop_event.set()
+        if inference is not None:
+            inference.join()
+
+    if not args.service:
+        print(f"\nSentetik çıkarım hedefi: {args.fps:.0f} FPS, kare başına {args.infer_ms:.0f} ms")
+    print(f"\n{'Worker':>6} | {'İstek/sn':>9} | {'p50 ms':>7} | {'p99 ms':>7} | {'Çıkarım FPS':>11} | {'İzleyici FPS':>12}")
+    for workers, r in rows:
+        print(f"{workers:>6} | {r['rps']:>9.0f} | {r['p50']:>7.1f} | {r['p99']:>7.1f} | {r['infer_fps']:>11.1f} | {r['viewer_fps']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
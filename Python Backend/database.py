@@ -1,10 +1,25 @@
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import create_engine, event, inspect, make_url, Column, Integer, String, Boolean, DateTime, Float, ForeignKey, Index
 from sqlalchemy.orm import sessionmaker, relationship, declarative_base
 import datetime
+import os
 
-DATABASE_URL = "sqlite:///./guvenlik.db"
+DATABASE_URL = os.environ.get("GUVENLIK_DB_URL", "sqlite:///./guvenlik.db") # Test ve benchmark için değiştirilebilir
+
+IS_SQLITE = make_url(DATABASE_URL).get_backend_name() == "sqlite"
+
+# Veritabanı motorunu oluştur. check_same_thread sadece SQLite sürücüsünde var
+engine = create_engine(DATABASE_URL, connect_args = {"check_same_thread": False} if IS_SQLITE else {})
+
+def set_sqlite_pragma(dbapi_connection, connection_record):
+    """WAL modu: log yazılırken API okumaları kilitlenmesin."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+if engine.dialect.name == "sqlite":
+    event.listen(engine, "connect", set_sqlite_pragma)
 
-engine = create_engine(DATABASE_URL, connect_args = {"check_same_thread": False}) # Veritabanı motorunu oluştur
 SessionLocal = sessionmaker(autocommit = False, autoflush = False, bind = engine) # Oturum oluşturucu
 Base = declarative_base() # Tablo modelleri için temel sınıf
 
@@ -44,10 +59,67 @@ class AccessLog(Base):
     vlm_description = Column(String, nullable = True)
     timestamp = Column(DateTime, default = datetime.datetime.now)
     related_user_id = Column(Integer, ForeignKey("users.id"), nullable = True)
+    matched_plate = Column(String, nullable = True) # Eşleşen izinli plaka (okunandan farklı olabilir)
+    match_distance = Column(Float, nullable = True) # 0: tam eşleşme, > 0: OCR karışıklığı toleransıyla
+
+    # Log listesi yeniden eskiye (timestamp, id) sırasıyla sayfalanır, filtreler de aynı sırayı kullanır
+    __table_args__ = (
+        Index("ix_access_logs_timestamp_id", "timestamp", "id"),
+        Index("ix_access_logs_plate_timestamp", "plate_number", "timestamp", "id"),
+        Index("ix_access_logs_status_timestamp", "access_status", "timestamp", "id"),
+    )
+
+# Trafik istatistikleri: zaman dilimi başına sayaçlar (log yazılırken güncellenir, rollups.py)
+class TrafficRollup(Base):
+    __tablename__ = "traffic_rollups"
+    bucket = Column(String, primary_key = True) # minute / hour / day
+    bucket_start = Column(DateTime, primary_key = True)
+    allowed = Column(Integer, default = 0)
+    denied = Column(Integer, default = 0)
+
+# Plaka başına sayaçlar
+class PlateStat(Base):
+    __tablename__ = "plate_stats"
+    plate_number = Column(String, primary_key = True)
+    visits = Column(Integer, default = 0, index = True)
+    allowed = Column(Integer, default = 0)
+    denied = Column(Integer, default = 0, index = True)
+    first_seen = Column(DateTime)
+    last_seen = Column(DateTime)
+
+# Kısmi plaka araması için görülen her plakanın 2-3 karakterlik parçaları (plate_search.py)
+class PlateNgram(Base):
+    __tablename__ = "plate_ngrams"
+    gram = Column(String, primary_key = True)
+    plate_number = Column(String, primary_key = True)
+
+def ensure_columns():
+    """
+    create_all var olan tablolara sonradan eklenen sütunları eklemez, eski veritabanları için ALTER TABLE ile eklenir.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect = engine.dialect)
+                    conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}")
+                    print(f"Sütun eklendi: {table.name}.{column.name}")
+
+def ensure_indexes():
+    """
+    create_all var olan tablolara sonradan eklenen indeksleri oluşturmaz, eski veritabanları için burada oluşturulur.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind = engine, checkfirst = True)
 
 def init_db():
     """Tabloları oluşturur."""
     Base.metadata.create_all(bind = engine)
+    ensure_columns()
+    ensure_indexes()
     print("Veritabanı ve tablolar başarıyla oluşturuldu.")
 
 def get_db():
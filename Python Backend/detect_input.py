@@ -0,0 +1,52 @@
+"""
+Araç tespiti girdisi: isteğe bağlı sabit ROI kırpması ve küçültme.
+
+Kapı kamerasında araç karenin büyük kısmını kapladığı için araç modeli küçük bir girdiyle (imgsz, uzun kenar) yeterince
+iyi çalışır. Kare modele verilmeden önce burada küçültülür (pipeline.downscale: yarıya indirme + doğrusal), böylece
+1080p / 4K karenin model içindeki pahalı yeniden boyutlandırması olmaz. Tespit kutuları tam çözünürlüklü kareye geri
+çevrilir; plaka tespiti ve OCR tam çözünürlüklü kareden kesilen araç görüntüsüyle çalışır.
+
+ROI verilirse sadece o dikdörtgen modele gider: şerit dışındaki park etmiş araçlar tespit edilmez ve aynı imgsz ile
+şerit daha yüksek çözünürlükte görülür. ROI, MOTION_ROI gibi kare boyutundan bağımsız 0-1 arası oranlarla verilir.
+"""
+from pipeline import downscale
+
+
+def roi_pixels(roi, width, height):
+    """(x1, y1, x2, y2) oranlarını piksele çevirir."""
+    x1, y1, x2, y2 = roi
+    return int(x1 * width), int(y1 * height), int(round(x2 * width)), int(round(y2 * height))
+
+
+def prepare(frame, imgsz = None, roi = None):
+    """
+    Araç modeline verilecek görüntüyü hazırlar. (görüntü, dönüşüm) döner, dönüşüm to_frame'e verilir.
+    imgsz None ise küçültme yapılmaz. ROI kırpması kopya yapmaz (numpy görünümü).
+    """
+    offset_x, offset_y = 0, 0
+    image = frame
+    if roi is not None:
+        height, width = frame.shape[:2]
+        x1, y1, x2, y2 = roi_pixels(roi, width, height)
+        image = frame[y1:y2, x1:x2]
+        offset_x, offset_y = x1, y1
+
+    scale = 1.0
+    height, width = image.shape[:2]
+    if imgsz and max(height, width) > imgsz:
+        image = downscale(image, max(1, round(width * imgsz / max(height, width))), {})
+        scale = image.shape[1] / width
+
+    return image, (scale, offset_x, offset_y)
+
+
+def to_frame(box, transform, width, height):
+    """Model çıktısındaki (x1, y1, x2, y2) kutusunu tam çözünürlüklü karenin piksel koordinatına çevirir."""
+    scale, offset_x, offset_y = transform
+    x1, y1, x2, y2 = (float(v) for v in box)
+    return (
+        min(width, max(0, int(x1 / scale) + offset_x)),
+        min(height, max(0, int(y1 / scale) + offset_y)),
+        min(width, max(0, int(x2 / scale) + offset_x)),
+        min(height, max(0, int(y2 / scale) + offset_y)),
+    )
@@ -0,0 +1,118 @@
+import json
+import threading
+import time
+from collections import deque
+
+from pipeline import DropOldestQueue
+
+
+class EventBus:
+    """
+    Kapı olaylarını (geçiş kararı, araç tanımı) bağlı tarayıcılara anında iletir.
+
+    Her olayın artan bir numarası vardır. Son history kadar olay bellekte tutulur; bağlantısı kopan
+    istemci son gördüğü numarayı (Last-Event-ID) göndererek kaçırdıklarını alır.
+    Her istemcinin kendi sınırlı kuyruğu vardır, yavaş bir tarayıcı dolarsa en eski olayları kaybeder.
+    Son geçiş olayı ayrıca saklanır, /latest-log veritabanına gitmeden buradan döner.
+    """
+
+    def __init__(self, history = 256, client_queue = 64):
+        self.client_queue = client_queue
+        self.history = deque(maxlen = history)
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self.next_id = 1
+        self.last_access = None
+
+        self.published = 0
+
+    def publish(self, event, event_id = None):
+        """
+        Olayı numaralandırıp abonelere dağıtır. event_id verilirse (ayrı çıkarım süreci) o numara kullanılır.
+        """
+        with self.lock:
+            if event_id is None:
+                event_id = self.next_id
+            self.next_id = max(self.next_id, event_id + 1)
+
+            event = dict(event, id = event_id)
+            self.history.append(event)
+            if event.get("type", "access") == "access":
+                self.last_access = event
+            elif self.last_access and self.last_access.get("log_id") == event.get("log_id"):
+                self.last_access = dict(self.last_access, vlm_description = event.get("vlm_description"))
+
+            subscribers = list(self.subscribers)
+            self.published += 1
+
+        for subscriber in subscribers:
+            subscriber.put(event)
+        return event_id
+
+    def subscribe(self, last_id = None):
+        """
+        Yeni istemci ekler. (kuyruk, kaçırılan olaylar) döner.
+        last_id yoksa sadece son geçiş olayı gönderilir, ekran boş başlamasın.
+        """
+        subscriber = DropOldestQueue(self.client_queue)
+        with self.lock:
+            self.subscribers.add(subscriber)
+            if last_id is None:
+                backlog = [self.last_access] if self.last_access else []
+            else:
+                backlog = [event for event in self.history if event["id"] > last_id]
+        return subscriber, backlog
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+        subscriber.close()
+
+    def latest(self):
+        return self.last_access
+
+    def stats(self):
+        with self.lock:
+            return {
+                "published": self.published,
+                "clients": len(self.subscribers),
+                "dropped": sum(subscriber.dropped for subscriber in self.subscribers),
+                "last_id": self.next_id - 1,
+            }
+
+
+def format_sse(event):
+    """Olayı Server-Sent Events satırlarına çevirir."""
+    data = json.dumps(event, ensure_ascii = False, default = str)
+    return f"id: {event['id']}\nevent: {event.get('type', 'access')}\ndata: {data}\n\n"
+
+
+async def sse_stream(bus, last_id = None, keepalive = 15.0):
+    """
+    Bir istemcinin olay akışı. Bağlantı açık kaldığı sürece olayları üretir,
+    olay yoksa keepalive saniyede bir yorum satırı gönderir (proxy bağlantıyı kesmesin).
+    Olay döngüsünde bekler, bağlı istemci başına thread tutmaz.
+    """
+    subscriber, backlog = bus.subscribe(last_id)
+    try:
+        yield "retry: 2000\n\n"
+        for event in backlog:
+            yield format_sse(event)
+
+        last_sent = time.monotonic()
+        while True:
+            event = await subscriber.get_async(timeout = 1.0)
+            if event is None:
+                if subscriber.closed:
+                    return
+                if time.monotonic() - last_sent >= keepalive:
+                    last_sent = time.monotonic()
+                    yield ": ping\n\n"
+                continue
+            last_sent = time.monotonic()
+            yield format_sse(event)
+    finally:
+        bus.unsubscribe(subscriber)
+
+
+event_bus = EventBus()
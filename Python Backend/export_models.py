@@ -1,9 +1,29 @@
+"""
+Model dışa aktarma aracı.
+
+GPU'lu makinede TensorRT (.engine), sadece CPU olan kapı bilgisayarlarında ONNX ve OpenVINO
+(FP32 ve INT8) formatları üretilir. INT8 için kalibrasyon görüntüleri gerekir.
+
+Kullanım:
+    python export_models.py                                  # GPU varsa engine, yoksa CPU formatları
+    python export_models.py --formats onnx,openvino,openvino-int8 --calib-dir ornek_kareler/
+"""
+import argparse
+import os
+import tempfile
+
 from ultralytics import YOLO
 import torch
 
 # GPU Kontrolü
 print(f"GPU Durumu: {torch.cuda.is_available()}")
 
+MODELS = [
+    "weights/yolo26m.pt", # Araç Modeli 
+    "weights/best_plate.pt", # 1. Plaka modeli
+    "weights/final_plaka_modeli.pt", # 2. Plaka modeli (fine tune ettiğim model)
+]
+
 def convert_to_engine(model_path):
     print(f"{model_path} dönüştürülüyor")
     try:
@@ -13,8 +33,66 @@ def convert_to_engine(model_path):
     except Exception as e:
         print(f"HATA: {e}")
 
+def convert_to_onnx(model_path, imgsz = 640):
+    print(f"{model_path} ONNX'e dönüştürülüyor")
+    try:
+        model = YOLO(model_path)
+        path = model.export(format = "onnx", device = "cpu", imgsz = imgsz, dynamic = True, simplify = True)
+        print(f"BAŞARILI: {model_path} -> {path}")
+    except Exception as e:
+        print(f"HATA: {e}")
+
+def calibration_yaml(model, calib_dir, folder):
+    """Görüntü klasöründen Ultralytics'in INT8 kalibrasyonu için beklediği veri dosyasını folder içine yazar."""
+    names = "\n".join(f"  {i}: {name}" for i, name in model.names.items())
+    content = f"path: {os.path.abspath(calib_dir)}\ntrain: .\nval: .\nnames:\n{names}\n"
+
+    path = os.path.join(folder, "calibration.yaml")
+    with open(path, "w", encoding = "utf-8") as f:
+        f.write(content)
+    return path
+
+def convert_to_openvino(model_path, int8 = False, calib_dir = None, imgsz = 640):
+    kind = "OpenVINO INT8" if int8 else "OpenVINO FP32"
+    print(f"{model_path} {kind} formatına dönüştürülüyor")
+    if int8 and calib_dir is None:
+        print("HATA: INT8 için --calib-dir ile kalibrasyon görüntüleri verilmeli.")
+        return
+    try:
+        model = YOLO(model_path)
+        with tempfile.TemporaryDirectory() as folder: # Kalibrasyon dosyası dışa aktarma bitince (hata olsa da) silinir
+            options = {"int8": True, "data": calibration_yaml(model, calib_dir, folder)} if int8 else {}
+            path = model.export(format = "openvino", device = "cpu", imgsz = imgsz, dynamic = True, **options)
+        print(f"BAŞARILI: {model_path} -> {path}")
+    except Exception as e:
+        print(f"HATA: {e}")
+
 if __name__ == "__main__":
-    convert_to_engine("weights/yolo26m.pt") # Araç Modeli 
-    convert_to_engine("weights/best_plate.pt") # 1. Plaka modeli
-    convert_to_engine("weights/final_plaka_modeli.pt") # 2. Plaka modeli (fine tune ettiğim model)
-     
\ No newline at end of file
+    parser = argparse.ArgumentParser(description = "YOLO modellerini dışa aktarır")
+    parser.add_argument("--formats", default = None, help = "engine, onnx, openvino, openvino-int8 (virgülle)")
+    parser.add_argument("--calib-dir", default = None, help = "INT8 kalibrasyonu için örnek kare klasörü")
+    parser.add_argument("--imgsz", type = int, default = 640)
+    parser.add_argument("--models", default = ",".join(MODELS))
+    args = parser.parse_args()
+
+    if args.formats is None:
+        formats = ["engine"] if torch.cuda.is_available() else ["onnx", "openvino"]
+    else:
+        formats = args.formats.split(",")
+
+    for model_path in args.models.split(","):
+        if not os.path.exists(model_path):
+            print(f"Atlandı, dosya yok: {model_path}")
+            continue
+
+        for fmt in formats:
+            if fmt == "engine":
+                convert_to_engine(model_path)
+            elif fmt == "onnx":
+                convert_to_onnx(model_path, args.imgsz)
+            elif fmt == "openvino":
+                convert_to_openvino(model_path, imgsz = args.imgsz)
+            elif fmt == "openvino-int8":
+                convert_to_openvino(model_path, int8 = True, calib_dir = args.calib_dir, imgsz = args.imgsz)
+            else:
+                print(f"Bilinmeyen format: {fmt}")
@@ -0,0 +1,67 @@
+"""
+Süreçler arası dosya kilidi (uvicorn worker'ları ve çıkarım servisi aynı makinede).
+
+Unix'te fcntl.flock, Windows'ta msvcrt.locking kullanılır. Kilit açık dosyaya bağlıdır: süreç ölürse işletim sistemi
+kilidi bırakır, kalıntı kilit dosyası sorun çıkarmaz. Aynı süreçteki iki FileLock da birbirini bekler.
+"""
+import os
+import time
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def acquire(self, blocking = True):
+        """Kilidi alır. blocking = False ise kilit başkasındaysa beklemeden False döner."""
+        if self.file is not None:
+            return True
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok = True)
+        f = open(self.path, "a+b")
+        try:
+            while True:
+                try:
+                    if fcntl is not None:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+                    else:
+                        f.seek(0)
+                        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    if not blocking:
+                        f.close()
+                        return False
+                    time.sleep(0.01) # Windows'ta bekleyen kilit yok, tekrar dene
+        except BaseException:
+            f.close()
+            raise
+        self.file = f
+        return True
+
+    def release(self):
+        if self.file is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+            else:
+                self.file.seek(0)
+                msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
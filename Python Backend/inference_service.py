@@ -0,0 +1,523 @@
+"""
+Ayrı süreçte çalışan kamera + yapay zeka servisi.
+
+uvicorn birden fazla worker ile çalıştırıldığında her worker'ın modelleri ayrı ayrı yüklemesi ve
+kamerayı açmaya çalışması yerine kamera ve tespit döngüsü bu süreçte bir kez çalışır.
+İşlenmiş kareler ve kapı olayları paylaşılan bellekteki halka tamponlar (ring buffer) üzerinden
+yayınlanır, API worker'ları bu tamponları okur. Kareler numpy görünümü olarak kopyalanmadan okunur.
+
+Kullanım:
+    python inference_service.py                           # Kamera + modeller (metrikler :9101/metrics)
+    GUVENLIK_INFERENCE_MODE=external uvicorn app:app --workers 4
+"""
+import json
+import os
+import signal
+import tempfile
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import cv2
+import numpy as np
+
+from file_lock import FileLock
+from pipeline import FrameBroadcaster, STREAM_TIERS, encode_tiers
+
+INFERENCE_MODE = os.environ.get("GUVENLIK_INFERENCE_MODE", "inprocess") # "inprocess" ya da "external"
+
+FRAME_RING_NAME = "guvenlik_frames"
+EVENT_RING_NAME = "guvenlik_events"
+CONTROL_NAME = "guvenlik_control"
+# Kontrol bloğundaki oku-değiştir-yaz işlemleri için (worker'lar aynı anda plaka ekleyebilir)
+CONTROL_LOCK_PATH = os.path.join(tempfile.gettempdir(), f"{CONTROL_NAME}.lock")
+
+MAX_FRAME_HEIGHT = 1080
+MAX_FRAME_WIDTH = 1920
+SLOTS_PER_CAMERA = 3
+EVENT_SLOTS = 256
+EVENT_SLOT_BYTES = 1024
+
+RING_MAGIC = 0x47554B31 # Tampon düzeni değişirse eski süreçler yanlış okumasın
+
+# Kare halka tamponu meta sütunları
+SEQ, FRAME_NO, CAMERA, HEIGHT, WIDTH, TIMESTAMP_US = range(6)
+# Kontrol bloğu alanları. CTRL_GENERATION her servis açılışında değişir (yeniden başlayan servisin yeni tamponları)
+CTRL_ALLOWLIST_VERSION, CTRL_HEARTBEAT_US, CTRL_CAMERAS, CTRL_GENERATION = range(4)
+
+HEARTBEAT_TIMEOUT = 5.0 # Bu kadar saniye kalp atışı gelmezse servis hazır sayılmaz
+RECONNECT_INTERVAL = 1.0 # Kalp atışı eskiyken paylaşılan belleğe en fazla bu sıklıkla yeniden bağlanılır
+
+
+def _attach(name):
+    """Var olan paylaşılan belleğe bağlanır. Bağlanan süreç kapanınca belleği silmesin diye takipten çıkarılır."""
+    shm = shared_memory.SharedMemory(name = name)
+    try:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    return shm
+
+
+def _create(name, size):
+    """Yeni paylaşılan bellek oluşturur, önceki çalışmadan kalan varsa siler."""
+    try:
+        old = shared_memory.SharedMemory(name = name)
+        old.close()
+        old.unlink()
+    except FileNotFoundError:
+        pass
+    return shared_memory.SharedMemory(name = name, create = True, size = size)
+
+
+class SharedFrameRing:
+    """
+    İşlenmiş kareler için paylaşılan bellek halka tamponu.
+
+    Her slotun bir sıra numarası (seqlock) vardır: yazarken tek, yazma bitince çift olur.
+    Okuyan taraf kareyi numpy görünümü olarak alır, işini bitirince sıra numarasının
+    değişmediğini kontrol eder. Değiştiyse kare yazılırken okunmuştur ve tekrar denenir.
+    """
+
+    HEADER_FIELDS = 4 # magic, slot sayısı, yükseklik, genişlik
+    META_FIELDS = 6
+
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner
+
+        header = np.ndarray((self.HEADER_FIELDS,), dtype = np.int64, buffer = shm.buf)
+        if header[0] != RING_MAGIC:
+            raise RuntimeError("Kare tamponu uyumsuz")
+        self.slots, self.max_height, self.max_width = int(header[1]), int(header[2]), int(header[3])
+
+        offset = header.nbytes
+        self.meta = np.ndarray((self.slots, self.META_FIELDS), dtype = np.int64, buffer = shm.buf, offset = offset)
+        offset += self.meta.nbytes
+        self.data = np.ndarray((self.slots, self.max_height, self.max_width, 3), dtype = np.uint8, buffer = shm.buf, offset = offset)
+        self.frame_no = int(self.meta[:, FRAME_NO].max()) if owner else 0
+
+    @classmethod
+    def create(cls, slots, max_height = MAX_FRAME_HEIGHT, max_width = MAX_FRAME_WIDTH, name = FRAME_RING_NAME):
+        size = 8 * cls.HEADER_FIELDS + 8 * cls.META_FIELDS * slots + slots * max_height * max_width * 3
+        shm = _create(name, size)
+        header = np.ndarray((cls.HEADER_FIELDS,), dtype = np.int64, buffer = shm.buf)
+        header[:] = (RING_MAGIC, slots, max_height, max_width)
+        np.ndarray((slots, cls.META_FIELDS), dtype = np.int64, buffer = shm.buf, offset = header.nbytes)[:] = 0
+        return cls(shm, owner = True)
+
+    @classmethod
+    def attach(cls, name = FRAME_RING_NAME):
+        return cls(_attach(name), owner = False)
+
+    def write(self, camera_id, frame):
+        """Kareyi sıradaki slota yazar. Çok büyükse önce küçültür."""
+        height, width = frame.shape[:2]
+        if height > self.max_height or width > self.max_width:
+            scale = min(self.max_height / height, self.max_width / width)
+            frame = cv2.resize(frame, (int(width * scale), int(height * scale)), interpolation = cv2.INTER_AREA)
+            height, width = frame.shape[:2]
+
+        self.frame_no += 1
+        slot = self.frame_no % self.slots
+        meta = self.meta[slot]
+
+        meta[SEQ] += 1 # Tek: yazılıyor
+        self.data[slot, :height, :width] = frame
+        meta[FRAME_NO] = self.frame_no
+        meta[CAMERA] = camera_id
+        meta[HEIGHT] = height
+        meta[WIDTH] = width
+        meta[TIMESTAMP_US] = int(time.time() * 1e6)
+        meta[SEQ] += 1 # Çift: hazır
+
+    def latest_slot(self, camera_id):
+        """Kameranın en yeni karesinin bulunduğu slot ve kare numarası."""
+        best_slot, best_no = None, 0
+        for slot in range(self.slots):
+            meta = self.meta[slot]
+            if meta[CAMERA] == camera_id and meta[FRAME_NO] > best_no and meta[SEQ] % 2 == 0:
+                best_slot, best_no = slot, int(meta[FRAME_NO])
+        return best_slot, best_no
+
+    def read_latest(self, camera_id, consume, after_frame_no = 0, retries = 3):
+        """
+        Kameranın en yeni karesini kopyalamadan consume(görünüm) ile işler.
+        (kare numarası, consume sonucu) döner. Yeni kare yoksa (after_frame_no, None).
+        """
+        for _ in range(retries):
+            slot, frame_no = self.latest_slot(camera_id)
+            if slot is None or frame_no <= after_frame_no:
+                return after_frame_no, None
+
+            meta = self.meta[slot]
+            seq = int(meta[SEQ])
+            view = self.data[slot, :int(meta[HEIGHT]), :int(meta[WIDTH])]
+            result = consume(view)
+            if int(meta[SEQ]) == seq and int(meta[FRAME_NO]) == frame_no:
+                return frame_no, result
+
+        return after_frame_no, None
+
+    def total_frames(self):
+        return int(self.meta[:, FRAME_NO].max())
+
+    def close(self):
+        self.meta = None
+        self.data = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class SharedEventRing:
+    """
+    Kapı olayları için paylaşılan bellek halka tamponu. Olaylar JSON olarak sabit boyutlu slotlara yazılır,
+    her olayın artan bir numarası vardır. Okuyan taraf son gördüğü numaradan sonrasını ister.
+    """
+
+    META_FIELDS = 3 # seq, olay numarası, uzunluk
+
+    def __init__(self, shm, owner, slots = EVENT_SLOTS, slot_bytes = EVENT_SLOT_BYTES):
+        self.shm = shm
+        self.owner = owner
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.meta = np.ndarray((slots, self.META_FIELDS), dtype = np.int64, buffer = shm.buf)
+        self.data = np.ndarray((slots, slot_bytes), dtype = np.uint8, buffer = shm.buf, offset = self.meta.nbytes)
+        self.event_no = int(self.meta[:, 1].max()) if owner else 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def create(cls, name = EVENT_RING_NAME, slots = EVENT_SLOTS, slot_bytes = EVENT_SLOT_BYTES):
+        shm = _create(name, 8 * cls.META_FIELDS * slots + slots * slot_bytes)
+        np.ndarray((slots, cls.META_FIELDS), dtype = np.int64, buffer = shm.buf)[:] = 0
+        return cls(shm, owner = True, slots = slots, slot_bytes = slot_bytes)
+
+    @classmethod
+    def attach(cls, name = EVENT_RING_NAME):
+        return cls(_attach(name), owner = False)
+
+    def publish(self, event):
+        payload = json.dumps(event, ensure_ascii = False, default = str).encode("utf-8")[:self.slot_bytes]
+        with self.lock:
+            self.event_no += 1
+            slot = self.event_no % self.slots
+            meta = self.meta[slot]
+            meta[0] += 1
+            self.data[slot, :len(payload)] = np.frombuffer(payload, dtype = np.uint8)
+            meta[1] = self.event_no
+            meta[2] = len(payload)
+            meta[0] += 1
+            return self.event_no
+
+    def read_since(self, last_no):
+        """last_no'dan sonraki olayları sırayla döner: [(olay numarası, olay), ...]"""
+        events = []
+        for slot in range(self.slots):
+            meta = self.meta[slot]
+            seq = int(meta[0])
+            event_no = int(meta[1])
+            if seq % 2 or event_no <= last_no:
+                continue
+            payload = self.data[slot, :int(meta[2])].tobytes()
+            if int(meta[0]) != seq:
+                continue
+            try:
+                events.append((event_no, json.loads(payload)))
+            except ValueError:
+                continue
+        events.sort(key = lambda item: item[0])
+        return events
+
+    def close(self):
+        self.meta = None
+        self.data = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class ControlBlock:
+    """
+    Süreçler arası küçük sayaçlar: izinli plaka listesi sürümü, servis kalp atışı, kamera sayısı.
+    """
+
+    FIELDS = 8
+
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner
+        self.values = np.ndarray((self.FIELDS,), dtype = np.int64, buffer = shm.buf)
+
+    @classmethod
+    def create(cls, name = CONTROL_NAME):
+        block = cls(_create(name, 8 * cls.FIELDS), owner = True)
+        block.values[:] = 0
+        return block
+
+    @classmethod
+    def attach(cls, name = CONTROL_NAME):
+        return cls(_attach(name), owner = False)
+
+    def close(self):
+        self.values = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def notify_allowlist_changed():
+    """API worker'ında plaka eklenip silindiğinde çıkarım sürecine haber verir."""
+    if INFERENCE_MODE != "external":
+        return
+    try:
+        control = ControlBlock.attach()
+    except FileNotFoundError:
+        return
+    try:
+        with FileLock(CONTROL_LOCK_PATH): # += süreçler arasında atomik değil, artışlar kaybolmasın
+            control.values[CTRL_ALLOWLIST_VERSION] += 1
+    finally:
+        control.close()
+
+
+class RemoteAccessControl:
+    """
+    API worker'ı tarafında AccessControlSystem yerine kullanılır (external mod).
+    Modeller yüklenmez, kareler çıkarım sürecinin paylaşılan belleğinden okunup kodlanır.
+    Her worker kendi izleyicileri için kareyi bir kez kodlar.
+    """
+
+    def __init__(self, jpeg_quality = 80, max_fps = 30.0):
+        self.jpeg_quality = jpeg_quality
+        self.frame_interval = 1.0 / max_fps
+        self.frame_ring = None
+        self.control = None
+        self.generation = None
+        self.connect_lock = threading.Lock()
+        self.checked_at = 0.0
+        self.camera_sources = []
+        self.broadcasters = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.encoder_thread = None
+        self.encoded = 0
+        self.encoded_bytes = 0
+        self.relay_thread = None
+
+    def _heartbeat_fresh(self):
+        heartbeat = int(self.control.values[CTRL_HEARTBEAT_US]) / 1e6
+        return time.time() - heartbeat < HEARTBEAT_TIMEOUT
+
+    def _connect(self):
+        """
+        Çıkarım servisinin paylaşılan belleğine bağlanır. Kalp atışı eskiyse (servis kapandı ya da yeniden başladı)
+        kontrol bloğu yeniden açılır; nesil değiştiyse eski tamponlar bırakılıp yenilerine bağlanılır.
+        """
+        with self.connect_lock:
+            if self.frame_ring is not None and self._heartbeat_fresh():
+                return True
+            now = time.monotonic()
+            if now - self.checked_at < RECONNECT_INTERVAL:
+                return self.frame_ring is not None
+            self.checked_at = now
+
+            try:
+                control = ControlBlock.attach()
+            except FileNotFoundError:
+                return self.frame_ring is not None
+            generation = int(control.values[CTRL_GENERATION])
+            if self.frame_ring is not None and generation == self.generation:
+                control.close() # Aynı servis, sadece kalp atışı gecikmiş
+                return True
+            try:
+                frame_ring = SharedFrameRing.attach()
+            except (FileNotFoundError, RuntimeError): # Servis tamponları henüz oluşturmadı
+                control.close()
+                return self.frame_ring is not None
+
+            # Eski tamponlar kapatılmaz: kodlayıcı thread'i o an okuyor olabilir, referans kalmayınca bırakılır
+            old_control = self.control
+            self.control, self.frame_ring, self.generation = control, frame_ring, generation
+            self.camera_sources = list(range(int(control.values[CTRL_CAMERAS])))
+            if old_control is not None:
+                old_control.close()
+            return True
+
+    def start_background_load(self, then = None):
+        self._connect()
+
+    def is_ready(self):
+        return self._connect() and self._heartbeat_fresh()
+
+    def readiness(self):
+        return {"ready": self.is_ready(), "mode": "external", "cameras": len(self.camera_sources)}
+
+    def stats(self):
+        return {
+            "mode": "external",
+            "ring_frames": self.frame_ring.total_frames() if self.frame_ring else None,
+            "encoded": self.encoded,
+            "encoded_mb": round(self.encoded_bytes / 1e6, 1),
+            "viewers": {camera_id: len(b) for camera_id, b in self.broadcasters.items()},
+        }
+
+    def _encode_loop(self):
+        last_frame_no = {}
+        generation = self.generation
+
+        while not self.stop_event.is_set():
+            start = time.monotonic()
+            self._connect()
+            if self.generation != generation: # Servis yeniden başladı, kare numaraları sıfırdan
+                generation = self.generation
+                last_frame_no.clear()
+            frame_ring = self.frame_ring
+            with self.lock:
+                active = [(camera_id, b) for camera_id, b in self.broadcasters.items() if len(b)]
+            if not active:
+                if self.stop_event.wait(0.2):
+                    break
+                continue
+
+            for camera_id, broadcaster in active:
+                now = time.monotonic()
+                groups = broadcaster.due_groups(now)
+                if not groups:
+                    continue # İzleyicilerin hepsi FPS sınırında
+
+                # Paylaşılan bellekten doğrudan, profil başına bir kez
+                frame_no, chunks = frame_ring.read_latest(
+                    camera_id, lambda view: encode_tiers(view, groups, self.jpeg_quality), last_frame_no.get(camera_id, 0))
+                if not chunks:
+                    continue
+                last_frame_no[camera_id] = frame_no
+                broadcaster.publish_groups(groups, chunks, now)
+                self.encoded += len(chunks)
+                self.encoded_bytes += sum(len(chunk) for chunk in chunks.values())
+
+            self.stop_event.wait(max(0.0, self.frame_interval - (time.monotonic() - start)))
+
+    def start_event_relay(self, publish, interval = 0.1):
+        """
+        Çıkarım sürecinin olay tamponunu izler, yeni olayları publish(olay, numara) ile iletir.
+        Numaralar tampondan geldiği için tüm worker'larda aynıdır, istemci hangi worker'a bağlanırsa bağlansın kaldığı yerden devam eder.
+        """
+        def run():
+            ring = None
+            ring_generation = None
+            last_no = None
+            while not self.stop_event.is_set():
+                self._connect()
+                if ring is not None and ring_generation != self.generation: # Servis yeniden başladı
+                    ring.close()
+                    ring = None
+                if ring is None:
+                    try:
+                        ring_generation = self.generation
+                        ring = SharedEventRing.attach()
+                    except FileNotFoundError:
+                        self.stop_event.wait(1.0)
+                        continue
+                    events = ring.read_since(0)
+                    last_no = events[-1][0] if events else 0 # Açılıştan önceki olaylar tekrar yayınlanmasın
+                    if events:
+                        publish(events[-1][1], events[-1][0])
+
+                for event_no, event in ring.read_since(last_no):
+                    publish(event, event_no)
+                    last_no = event_no
+                self.stop_event.wait(interval)
+            if ring is not None:
+                ring.close()
+
+        self.relay_thread = threading.Thread(target = run, name = "event-relay", daemon = True)
+        self.relay_thread.start()
+
+    async def generate_frames(self, camera_id = 0, profile = STREAM_TIERS["full"]):
+        if not self._connect() or camera_id >= len(self.camera_sources):
+            return
+
+        with self.lock:
+            broadcaster = self.broadcasters.setdefault(camera_id, FrameBroadcaster())
+            subscriber = broadcaster.subscribe(profile)
+            if self.encoder_thread is None:
+                self.encoder_thread = threading.Thread(target = self._encode_loop, name = "ring-encoder", daemon = True)
+                self.encoder_thread.start()
+
+        try:
+            while True:
+                chunk = await subscriber.get_async(timeout = 0.5)
+                if chunk is None:
+                    if subscriber.closed:
+                        return
+                    continue
+                yield chunk
+        finally:
+            broadcaster.unsubscribe(subscriber)
+
+    def shutdown(self):
+        self.stop_event.set()
+        for broadcaster in self.broadcasters.values():
+            broadcaster.close()
+        if self.frame_ring is not None:
+            self.frame_ring.close()
+        if self.control is not None:
+            self.control.close()
+
+
+def run_service():
+    """Kamera ve modelleri çalıştırır, kareleri ve olayları paylaşılan belleğe yazar."""
+    from ai import AccessControlSystem
+    from archive import retention_worker
+    from database import init_db
+    from log_writer import log_writer
+    from metrics import METRICS_PORT, start_metrics_server, watch_log_writer, watch_system
+    from plate_index import allowlist_index
+
+    init_db()
+    system = AccessControlSystem()
+    cameras = len(system.camera_sources)
+
+    frame_ring = SharedFrameRing.create(slots = SLOTS_PER_CAMERA * cameras)
+    event_ring = SharedEventRing.create()
+    control = ControlBlock.create()
+    control.values[CTRL_CAMERAS] = cameras
+    control.values[CTRL_GENERATION] = time.time_ns()
+
+    # API worker'larında plaka eklenince izinli liste yeniden yüklensin
+    allowlist_index.version_source = lambda: int(control.values[CTRL_ALLOWLIST_VERSION])
+    allowlist_index.load()
+    log_writer.start()
+    retention_worker.start() # Loglar bu süreçte yazıldığı için arşivleme de burada
+
+    system.event_listeners.append(event_ring.publish)
+    watch_system(system)
+    watch_log_writer(log_writer)
+    metrics_server = start_metrics_server() if METRICS_PORT else None # API worker'larında aşama ve kare metrikleri yok
+    pipeline = system.start_stream(keep_alive = True, frame_sink = lambda camera_id, frame: frame_ring.write(camera_id, frame))
+    print(f"Çıkarım servisi çalışıyor ({cameras} kamera). Çıkış için Ctrl+C")
+
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stop_event.set())
+    try:
+        while not stop_event.is_set() and pipeline.is_running():
+            control.values[CTRL_HEARTBEAT_US] = int(time.time() * 1e6)
+            stop_event.wait(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        system.shutdown()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        retention_worker.stop()
+        log_writer.stop()
+        frame_ring.close()
+        event_ring.close()
+        control.close()
+        print("Çıkarım servisi durdu")
+
+
+if __name__ == "__main__":
+    run_service()
@@ -0,0 +1,169 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from itertools import islice
+
+from sqlalchemy import tuple_
+
+from archive import log_archive
+from database import SessionLocal, AccessLog, User
+from plate_index import normalize_plate
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(timestamp, log_id):
+    """Sayfanın son satırından bir sonraki sayfanın imlecini üretir: 2026-01-01T08:00:00_1234"""
+    return f"{timestamp.isoformat()}_{log_id}"
+
+
+def decode_cursor(cursor):
+    """İmleci (timestamp, id) olarak çözer. Geçersizse ValueError."""
+    timestamp, log_id = cursor.rsplit("_", 1)
+    return datetime.fromisoformat(timestamp), int(log_id)
+
+
+def filter_logs(query, plate = None, plates = None, status = None, date_from = None, date_to = None):
+    """
+    Plaka, izin durumu ve tarih aralığı filtrelerini uygular. date_to dahil değildir.
+    plates: plaka listesi (kısmi plaka aramasının bulduğu plakalar).
+    """
+    if plate:
+        query = query.filter(AccessLog.plate_number == normalize_plate(plate))
+    if plates is not None:
+        query = query.filter(AccessLog.plate_number.in_(plates))
+    if status is not None:
+        query = query.filter(AccessLog.access_status == status)
+    if date_from is not None:
+        query = query.filter(AccessLog.timestamp >= date_from)
+    if date_to is not None:
+        query = query.filter(AccessLog.timestamp < date_to)
+    return query
+
+
+def log_rows(db):
+    """Log satırları ve ilişkili kullanıcı adı, tek sorguda (LEFT JOIN)."""
+    return db.query(
+        AccessLog.id,
+        AccessLog.plate_number,
+        AccessLog.access_status,
+        AccessLog.vlm_description,
+        AccessLog.timestamp,
+        User.username,
+        AccessLog.match_distance,
+    ).outerjoin(User, User.id == AccessLog.related_user_id)
+
+
+def uses_archive(date_from = None, **filters):
+    """
+    Sorgu arşive taşınmış günlere de bakmalı mı? Sadece date_from arşivdeki bir günü kapsıyorsa;
+    tarih verilmeyen sorgular (ör. sadece plaka filtresi) tüm arşivi taramasın diye tabloyla sınırlı kalır.
+    """
+    return date_from is not None and log_archive.covers(date_from)
+
+
+def log_page(db, limit = DEFAULT_PAGE_SIZE, cursor = None, **filters):
+    """
+    Logları yeniden eskiye sayfa sayfa getirir (keyset pagination).
+    OFFSET yerine son satırın (timestamp, id) değerinden devam edilir, sayfa ne kadar derinde olursa olsun
+    sorgu indeksten sadece limit kadar satır okur. (satırlar, sonraki imleç) döner, son sayfada imleç None.
+    Tarih aralığı arşive düşüyorsa tablo bitince sayfa arşivdeki satırlarla tamamlanır.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = filter_logs(log_rows(db), **filters)
+
+    archive = uses_archive(**filters)
+    if archive:
+        # Arşivlenip henüz silinmemiş satırlar iki kez gelmesin
+        query = query.filter(AccessLog.timestamp >= log_archive.boundary())
+
+    before = decode_cursor(cursor) if cursor else None
+    if before:
+        query = query.filter(tuple_(AccessLog.timestamp, AccessLog.id) < tuple_(*before))
+
+    rows = query.order_by(AccessLog.timestamp.desc(), AccessLog.id.desc()).limit(limit + 1).all()
+    if archive and len(rows) <= limit:
+        rows += list(islice(log_archive.iter_logs(newest_first = True, before = before, **filters), limit + 1 - len(rows)))
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].timestamp, rows[-1].id)
+    return rows, next_cursor
+
+
+EXPORT_COLUMNS = ["id", "plate_number", "access_status", "vlm_description", "timestamp", "related_user", "match_distance"]
+
+
+def _export_record(row):
+    return {
+        "id": row.id,
+        "plate_number": row.plate_number,
+        "access_status": row.access_status,
+        "vlm_description": row.vlm_description,
+        "timestamp": row.timestamp.isoformat() if row.timestamp else None,
+        "related_user": row.username,
+        "match_distance": row.match_distance,
+    }
+
+
+def _encode_rows(fmt, rows):
+    if fmt == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows) # Sütun sırası EXPORT_COLUMNS ile aynı
+        return buffer.getvalue()
+    return "".join(json.dumps(_export_record(row), ensure_ascii = False) + "\n" for row in rows)
+
+
+def iter_log_export(fmt = "csv", compress = False, chunk_rows = 2000, **filters):
+    """
+    Logları eskiden yeniye CSV veya NDJSON olarak parça parça üretir (bytes).
+
+    Satırlar sunucu tarafı imleçle chunk_rows'luk gruplar halinde okunur, bellekte hiçbir zaman
+    tüm tablo tutulmaz. compress açıksa çıktı akış halinde gzip ile sıkıştırılır.
+    Tarih aralığı arşive düşüyorsa önce arşivdeki günler gönderilir.
+    Oturum üretecin kendisine aittir, yanıt bitene kadar açık kalır.
+    """
+    db = SessionLocal()
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None # wbits 31: gzip başlığı
+
+    def encode(text):
+        data = text.encode("utf-8")
+        return compressor.compress(data) if compressor else data
+
+    def partitions():
+        if archive:
+            rows = log_archive.iter_logs(**filters)
+            while True:
+                chunk = list(islice(rows, chunk_rows))
+                if not chunk:
+                    break
+                yield chunk
+        yield from result.partitions()
+
+    try:
+        query = filter_logs(log_rows(db), **filters).order_by(AccessLog.timestamp, AccessLog.id)
+        archive = uses_archive(**filters)
+        if archive:
+            query = query.filter(AccessLog.timestamp >= log_archive.boundary())
+        result = db.execute(query.statement.execution_options(stream_results = True, yield_per = chunk_rows))
+
+        if fmt == "csv":
+            buffer = io.StringIO()
+            csv.writer(buffer).writerow(EXPORT_COLUMNS)
+            data = encode(buffer.getvalue())
+            if data:
+                yield data
+
+        for rows in partitions():
+            data = encode(_encode_rows(fmt, rows))
+            if data:
+                yield data
+
+        if compressor:
+            yield compressor.flush()
+    finally:
+        db.close()
@@ -0,0 +1,227 @@
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import bindparam, func, insert, update
+
+from archive import log_archive
+from database import SessionLocal, AccessLog
+from plate_search import index_plates
+from rollups import apply_log_rows
+
+logger = logging.getLogger(__name__)
+
+LOG_SYNC_COMMIT = False # True: her log anında ayrı commit ile yazılır (yavaş ama kayıp riski yok)
+
+
+class AccessLogWriter:
+    """
+    Geçiş loglarını arka planda toplu olarak yazar (write-behind).
+
+    Kapı kararı logu kuyruğa bırakır ve hemen döner. Yazıcı thread'i kuyruktakileri
+    batch_size dolunca veya flush_interval geçince tek transaction ile yazar, trafik istatistikleri ve plaka arama indeksi de aynı transaction'da güncellenir.
+    Log id'leri kuyruğa alınırken verilir, böylece VLM sonucu kayıt diske yazılmadan da
+    doğru satıra bağlanabilir. Kuyruk dolarsa log beklemeden doğrudan yazılır (geri basınç).
+    """
+
+    def __init__(self, batch_size = 200, flush_interval = 0.5, max_queue = 10000, sync = LOG_SYNC_COMMIT, put_timeout = 0.5):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.sync = sync
+        self.put_timeout = put_timeout
+
+        self.queue = queue.Queue(maxsize = max_queue)
+        self.id_lock = threading.Lock()
+        self.next_id = None
+        self.thread = None
+        self.stop_event = threading.Event()
+
+        self.submitted = 0
+        self.written = 0
+        self.updated = 0
+        self.batches = 0
+        self.sync_writes = 0
+        self.errors = 0
+        self.dropped = 0
+        self.last_flush_ms = 0.0
+
+    def start(self):
+        """
+        Son log id'sini okur ve yazıcı thread'ini başlatır. Arşive taşınan loglar tablodan silindiği için
+        arşivdeki en büyük id de hesaba katılır, aynı id ikinci kez verilmez.
+        """
+        with self.id_lock:
+            if self.next_id is None:
+                db = SessionLocal()
+                try:
+                    table_max = db.query(func.max(AccessLog.id)).scalar() or 0
+                finally:
+                    db.close()
+                self.next_id = max(table_max, log_archive.max_id()) + 1
+
+            if not self.sync and self.thread is None:
+                self.stop_event.clear()
+                self.thread = threading.Thread(target = self._writer_loop, name = "log-writer", daemon = True)
+                self.thread.start()
+
+    def submit(self, plate_number, access_status, related_user_id = None, vlm_description = None, timestamp = None,
+               matched_plate = None, match_distance = None):
+        """Logu yazılmak üzere sıraya alır ve log id'sini döner."""
+        if self.next_id is None:
+            self.start()
+
+        with self.id_lock:
+            log_id = self.next_id
+            self.next_id += 1
+
+        row = {
+            "id": log_id,
+            "plate_number": plate_number,
+            "access_status": access_status,
+            "vlm_description": vlm_description,
+            "related_user_id": related_user_id,
+            "timestamp": timestamp or datetime.now(),
+            "matched_plate": matched_plate,
+            "match_distance": match_distance,
+        }
+        self.submitted += 1
+        self._enqueue(("insert", row))
+        return log_id
+
+    def update_description(self, log_id, vlm_description):
+        """VLM açıklamasını sıraya alır. Ekleme işleminden sonra yazılması sıra ile garanti edilir."""
+        self._enqueue(("update", {"log_id": log_id, "vlm_description": vlm_description}))
+
+    def _enqueue(self, item):
+        if self.sync or self.thread is None:
+            self._write([item])
+            self.sync_writes += 1
+            return
+
+        try:
+            self.queue.put(item, timeout = self.put_timeout)
+        except queue.Full:
+            # Yazıcı yetişemiyor: üreten taraf bekleyip kendisi yazar
+            self.queue.join()
+            self._write([item])
+            self.sync_writes += 1
+
+    def _write(self, items):
+        """
+        Kuyruktaki işlemleri tek transaction ile yazar. Parti yazılamazsa işlemler tek tek yeniden denenir,
+        böylece sadece hatalı satır kaybolur; o satır içeriğiyle birlikte loglanır.
+        """
+        start = time.perf_counter()
+        try:
+            self._commit(items)
+            return
+        except Exception as e:
+            self.errors += 1
+            if len(items) == 1:
+                self._drop(items[0], e)
+                return
+            logger.warning("Log partisi yazılamadı (%d işlem), tek tek deneniyor: %s", len(items), e)
+        finally:
+            self.last_flush_ms = (time.perf_counter() - start) * 1000
+
+        for item in items: # Sıra korunur: VLM güncellemesi kendi eklemesinden sonra gelir
+            try:
+                self._commit([item])
+            except Exception as e:
+                self._drop(item, e)
+        self.last_flush_ms = (time.perf_counter() - start) * 1000
+
+    def _commit(self, items):
+        inserts = [row for kind, row in items if kind == "insert"]
+        updates = [row for kind, row in items if kind == "update"]
+
+        db = SessionLocal()
+        try:
+            if inserts:
+                db.execute(insert(AccessLog), inserts)
+                apply_log_rows(db, inserts) # İstatistik sayaçları aynı transaction içinde
+                index_plates(db, {row["plate_number"] for row in inserts}) # Yeni plakalar arama indeksine
+            if updates:
+                # Aynı partideki eklemelerden sonra çalışır
+                db.connection().execute(
+                    update(AccessLog.__table__)
+                    .where(AccessLog.__table__.c.id == bindparam("log_id"))
+                    .values(vlm_description = bindparam("vlm_description")),
+                    updates,
+                )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        self.written += len(inserts)
+        self.updated += len(updates)
+        self.batches += 1
+
+    def _drop(self, item, error):
+        kind, row = item
+        self.dropped += 1
+        logger.error("Log yazılamadı, atlandı (%s): %r", kind, row, exc_info = error)
+
+    def _writer_loop(self):
+        while not (self.stop_event.is_set() and self.queue.empty()):
+            try:
+                items = [self.queue.get(timeout = self.flush_interval)]
+            except queue.Empty:
+                continue
+
+            # Süre dolana veya parti dolana kadar topla
+            deadline = time.monotonic() + self.flush_interval
+            while len(items) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self.stop_event.is_set():
+                    break
+                try:
+                    items.append(self.queue.get(timeout = remaining))
+                except queue.Empty:
+                    break
+
+            # Kalanları da al, beklemeden
+            while len(items) < self.batch_size:
+                try:
+                    items.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._write(items)
+            for _ in items:
+                self.queue.task_done()
+
+    def flush(self):
+        """Kuyruktaki tüm logların yazılmasını bekler."""
+        if self.thread is not None:
+            self.queue.join()
+
+    def stop(self, timeout = 10.0):
+        """Kalan logları yazıp thread'i durdurur. Uygulama kapanırken çağrılır."""
+        if self.thread is None:
+            return
+        self.stop_event.set()
+        self.thread.join(timeout)
+        self.thread = None
+        print(f"Log yazıcı durdu ({self.written} log yazıldı)")
+
+    def stats(self):
+        return {
+            "queued": self.queue.qsize(),
+            "submitted": self.submitted,
+            "written": self.written,
+            "updated": self.updated,
+            "batches": self.batches,
+            "sync_writes": self.sync_writes,
+            "errors": self.errors,
+            "dropped": self.dropped,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+        }
+
+
+log_writer = AccessLogWriter()
@@ -0,0 +1,323 @@
+"""
+Prometheus metin formatında (0.0.4) izleme verileri. prometheus_client gerekmez.
+
+Sıcak yolda sadece histogramlar güncellenir: aşama süreleri (StageTimer dinleyicisi) ve API istek süreleri.
+Gözlem başına bir ikili arama ve kilit altında iki toplama yapılır, kare başına maliyet mikro saniyeler mertebesindedir.
+Sayaçlar ve anlık değerler (işlenen / atlanan / düşen kareler, OCR, VLM, kuyruk derinlikleri, FPS) zaten tutulan
+istatistiklerden sadece /metrics istendiğinde okunur, kare başına ek maliyeti yoktur.
+
+external modda kamera ve modeller inference_service.py sürecindedir. O süreç kendi metriklerini
+GUVENLIK_METRICS_PORT portunda yayınlar, API'nin /metrics ucu API tarafını (istek süreleri, olay akışı, yayın) gösterir.
+uvicorn birden fazla worker ile çalışıyorsa her worker kendi istek sürelerini tutar.
+
+Kullanım (prometheus.yml):
+    - job_name: guvenlik
+      static_configs: [{targets: ["sunucu:8000"]}]
+    - job_name: guvenlik-inference
+      static_configs: [{targets: ["sunucu:9101"]}]
+"""
+import bisect
+import hmac
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+METRICS_PORT = int(os.environ.get("GUVENLIK_METRICS_PORT", "9101")) # inference_service.py metrik portu (0: kapalı)
+METRICS_TOKEN = os.environ.get("GUVENLIK_METRICS_TOKEN") # Verilirse "Authorization: Bearer <token>" istenir
+
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0) # VLM çağrısı, araç görülmesinden karara kadar
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Sabit kovalı histogram. Etiket değerleri observe'a sırayla verilir."""
+
+    def __init__(self, name, documentation, labels = (), buckets = STAGE_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        self.series = {} # Etiket değerleri -> [kova sayıları (son kova +Inf), toplam]
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value) # Sınıra eşit değer o kovaya girer (le)
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        with self.lock:
+            snapshot = [(values, list(counts), total) for values, (counts, total) in self.series.items()]
+
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for values, counts, total in sorted(snapshot, key = lambda item: item[0]):
+            labels = list(zip(self.labels, values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(labels + [('le', _format_value(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Histogramlar ve istek anında okunan toplayıcılar.
+    Toplayıcı (isim, tip, açıklama, [(etiketler, değer), ...]) üreten bir fonksiyondur, isimle kaydedilir
+    (aynı isimle tekrar kaydetmek öncekinin yerine geçer).
+    """
+
+    def __init__(self):
+        self.histograms = []
+        self.collectors = {}
+
+    def histogram(self, name, documentation, labels = (), buckets = STAGE_BUCKETS):
+        histogram = Histogram(name, documentation, labels, buckets)
+        self.histograms.append(histogram)
+        return histogram
+
+    def register(self, name, collector):
+        self.collectors[name] = collector
+
+    def render(self):
+        # Aynı isimli aile (ör. guvenlik_queue_depth) birden fazla toplayıcıdan gelebilir, örnekleri tek başlık altında toplanır
+        families = {}
+        for name, collector in list(self.collectors.items()):
+            try:
+                for metric, kind, documentation, samples in collector():
+                    families.setdefault(metric, (kind, documentation, []))[2].extend(samples)
+            except Exception as e:
+                print(f"Metrik toplanamadı ({name}): {e}")
+
+        lines = []
+        for metric, (kind, documentation, samples) in families.items():
+            lines.append(f"# HELP {metric} {documentation}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for labels, value in samples:
+                lines.append(f"{metric}{_format_labels(sorted(labels.items()))} {_format_value(value)}")
+        for histogram in self.histograms:
+            lines.extend(histogram.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+stage_seconds = registry.histogram(
+    "guvenlik_stage_seconds", "process_frame aşama süreleri (decision: check_database, batch: toplu çağrının tamamı)", ["stage"])
+vlm_describe_seconds = registry.histogram(
+    "guvenlik_vlm_describe_seconds", "get_vehicle_description / VLM çağrısı süresi (deneme başına)", buckets = SLOW_BUCKETS)
+time_to_plate_seconds = registry.histogram(
+    "guvenlik_time_to_plate_seconds", "Aracın ilk görülmesinden kapı kararına kadar geçen süre", buckets = SLOW_BUCKETS)
+http_request_seconds = registry.histogram(
+    "guvenlik_http_request_seconds", "API istek süresi (yanıt başlığı gönderilene kadar)", ["method", "route", "status"],
+    buckets = HTTP_BUCKETS)
+
+_stage_histograms = {"vlm_describe": vlm_describe_seconds, "time_to_plate": time_to_plate_seconds}
+
+
+def observe_stage(stage, seconds):
+    """StageTimer dinleyicisi."""
+    histogram = _stage_histograms.get(stage)
+    if histogram is None:
+        stage_seconds.observe(seconds, stage)
+    else:
+        histogram.observe(seconds)
+
+
+def _system_families(system):
+    if not hasattr(system, "camera_states"):
+        # external mod: API worker'ı sadece paylaşılan bellekten okunan kareleri kodlar
+        stats = system.stats()
+        yield "guvenlik_frames_encoded_total", "counter", "Kodlanan kare sayısı", [({}, stats["encoded"])]
+        yield "guvenlik_stream_bytes_total", "counter", "Kodlanan yayın verisi (bayt)", [({}, system.encoded_bytes)]
+        yield "guvenlik_stream_viewers", "gauge", "Canlı yayın izleyici sayısı", [({}, sum(stats["viewers"].values()))]
+        return
+
+    states = list(system.camera_states.values())
+    yield "guvenlik_models_ready", "gauge", "Modeller yüklendi mi", [({}, system.ready_event.is_set())]
+    yield "guvenlik_frames_processed_total", "counter", "İşlenen kare sayısı (hareket yüzünden atlananlar dahil)", \
+        [({"camera": state.camera_id}, state.frame_count) for state in states]
+    yield "guvenlik_frames_skipped_total", "counter", "Hareket olmadığı için tespit yapılmayan kareler", \
+        [({"camera": state.camera_id}, state.skipped_frames) for state in states]
+
+    ocr = system.ocr_scheduler.stats()
+    yield "guvenlik_ocr_attempts_total", "counter", "OCR çağrısı sayısı", [({}, ocr["ocr_calls"])]
+    yield "guvenlik_ocr_valid_reads_total", "counter", "Geçerli plaka formatında OCR okuması", [({}, system.ocr_reads)]
+    yield "guvenlik_ocr_skipped_total", "counter", "OCR yapılmayan plaka görüntüleri", [
+        ({"reason": "small"}, ocr["rejected_small"]),
+        ({"reason": "blur"}, ocr["rejected_blur"]),
+        ({"reason": "budget"}, ocr["skipped_budget"]),
+    ]
+    yield "guvenlik_cooldown_suppressed_total", "counter", "Bekleme süresi yüzünden kaydedilmeyen kesinleşmiş plakalar", \
+        [({}, system.cooldown_suppressed)]
+
+    pipeline = system.pipeline
+    if pipeline is not None:
+        stats = pipeline.stats()
+        running = pipeline.is_running()
+        yield "guvenlik_frames_captured_total", "counter", "Kameradan okunan kare sayısı", [({}, stats["captured"])]
+        yield "guvenlik_frames_dropped_total", "counter", "Yetişilemediği için atılan kareler", [
+            ({"stage": "capture"}, stats["dropped_capture"]),
+            ({"stage": "encode"}, stats["dropped_encode"]),
+            ({"stage": "viewer"}, stats["dropped_viewers"]),
+        ]
+        yield "guvenlik_frames_encoded_total", "counter", "Kodlanan kare sayısı", [({}, stats["encoded"])]
+        yield "guvenlik_stream_bytes_total", "counter", "Kodlanan yayın verisi (bayt)", [({}, pipeline.encoded_bytes)]
+        yield "guvenlik_fps", "gauge", "İşlenen kare hızı (tüm kameralar)", [({}, stats["fps"] if running else 0.0)]
+        yield "guvenlik_stream_viewers", "gauge", "Canlı yayın izleyici sayısı", [({}, stats["viewers"])]
+        yield "guvenlik_stream_latency_seconds", "gauge", "Kameradan yayına gecikme (üstel ortalama)", \
+            [({}, stats["latency_ms"] / 1000)]
+        yield "guvenlik_queue_depth", "gauge", "Kuyruktaki iş sayısı", [
+            ({"queue": "capture"}, sum(len(q) for q in pipeline.capture_queues)),
+            ({"queue": "encode"}, len(pipeline.encode_queue)),
+        ]
+
+    if system.vlm_worker is not None:
+        vlm = system.vlm_worker.stats()
+        yield "guvenlik_vlm_requests_total", "counter", "VLM'e bırakılan araç tanımlama işleri", [({}, vlm["submitted"])]
+        yield "guvenlik_vlm_completed_total", "counter", "Başarılı araç tanımları", [({}, vlm["completed"])]
+        yield "guvenlik_vlm_errors_total", "counter", "VLM hataları", [
+            ({"kind": "failed"}, vlm["failed"]), # Tüm denemeler başarısız
+            ({"kind": "timeout"}, vlm["timeouts"]), # Deneme başına
+            ({"kind": "dropped"}, vlm["dropped"]), # Kuyruk dolu
+            ({"kind": "cancelled"}, vlm["cancelled"]), # Kapanışta kuyrukta kaldı
+        ]
+        yield "guvenlik_queue_depth", "gauge", "Kuyruktaki iş sayısı", [({"queue": "vlm"}, vlm["pending"])]
+
+
+def _log_writer_families(writer):
+    stats = writer.stats()
+    yield "guvenlik_queue_depth", "gauge", "Kuyruktaki iş sayısı", [({"queue": "log_writer"}, stats["queued"])]
+    yield "guvenlik_log_writes_total", "counter", "Veritabanına yazılan geçiş logları", [({}, stats["written"])]
+    yield "guvenlik_log_write_errors_total", "counter", "Log yazma hataları", [({}, stats["errors"])]
+    yield "guvenlik_log_dropped_total", "counter", "Yazılamayıp atılan log işlemleri", [({}, stats["dropped"])]
+
+
+def _api_families(event_bus, principal_cache):
+    events = event_bus.stats()
+    auth = principal_cache.stats()
+    yield "guvenlik_event_clients", "gauge", "/events akışına bağlı istemciler", [({}, events["clients"])]
+    yield "guvenlik_events_published_total", "counter", "Yayınlanan kapı olayları", [({}, events["published"])]
+    yield "guvenlik_auth_cache_total", "counter", "Token önbelleği sorguları", [
+        ({"result": "hit"}, auth["hits"]),
+        ({"result": "miss"}, auth["misses"]),
+    ]
+
+
+def watch_system(system):
+    """Kapı sisteminin aşama sürelerini histogramlara bağlar, sayaçlarını ve kuyruklarını /metrics'e ekler."""
+    timer = getattr(system, "stage_timer", None)
+    if timer is not None and observe_stage not in timer.listeners:
+        timer.listeners.append(observe_stage)
+    registry.register("system", lambda: _system_families(system))
+
+
+def watch_log_writer(writer):
+    registry.register("log_writer", lambda: _log_writer_families(writer))
+
+
+def watch_api(event_bus, principal_cache):
+    registry.register("api", lambda: _api_families(event_bus, principal_cache))
+
+
+def render():
+    """Tüm metrikler, Prometheus metin formatında."""
+    return registry.render()
+
+
+def authorized(authorization):
+    """GUVENLIK_METRICS_TOKEN ayarlıysa Authorization başlığını kontrol eder."""
+    if not METRICS_TOKEN:
+        return True
+    return hmac.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}")
+
+
+class MetricsMiddleware:
+    """
+    API istek sürelerini route şablonuna göre ölçer (/admin/logs/{log_id} gibi, eşleşmeyenler "unmatched").
+    Süre yanıt başlığı gönderilene kadar ölçülür; akış uçlarında (/video_feed, /events, dışa aktarma) ilk bayta kadardır.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        started = False
+
+        def observe(status):
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            http_request_seconds.observe(time.perf_counter() - start, scope["method"], path, str(status))
+
+        async def send_with_timing(message):
+            nonlocal started
+            if message["type"] == "http.response.start" and not started:
+                started = True
+                observe(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        except Exception:
+            if not started:
+                observe(500)
+            raise
+
+
+def start_metrics_server(port = METRICS_PORT, host = "0.0.0.0"):
+    """/metrics'i ayrı bir HTTP sunucusunda yayınlar (uvicorn çalışmayan inference_service.py süreci için)."""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            if not authorized(self.headers.get("Authorization")):
+                self.send_error(401)
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass # Her kazımada konsola satır yazılmasın
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target = server.serve_forever, name = "metrics-http", daemon = True).start()
+    return server
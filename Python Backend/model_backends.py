@@ -0,0 +1,52 @@
+import os
+
+# Dışa aktarılan model dosyalarının .pt dosyasına göre isimleri (Ultralytics isimlendirmesi)
+BACKEND_SUFFIXES = {
+    "pt": ".pt",
+    "engine": ".engine",
+    "onnx": ".onnx",
+    "openvino": "_openvino_model",
+    "openvino-int8": "_int8_openvino_model",
+}
+
+# auto seçiminde denenme sırası
+GPU_PREFERENCE = ["engine", "pt"]
+CPU_PREFERENCE = ["openvino", "openvino-int8", "onnx", "pt"]
+
+
+def backend_path(pt_path, backend):
+    """weights/yolo26m.pt + openvino -> weights/yolo26m_openvino_model"""
+    stem, _ = os.path.splitext(pt_path)
+    return stem + BACKEND_SUFFIXES[backend]
+
+
+def select_backend(pt_path, backend = "auto", device = "cpu"):
+    """
+    Kullanılacak model dosyasını seçer. (backend, dosya yolu) döner.
+    auto: GPU varsa TensorRT, yoksa OpenVINO / ONNX, hiçbiri yoksa PyTorch.
+    İstenen format dışa aktarılmamışsa .pt dosyasına düşülür.
+    """
+    if backend != "auto":
+        if backend not in BACKEND_SUFFIXES:
+            raise ValueError(f"Bilinmeyen model formatı: {backend}")
+        path = backend_path(pt_path, backend)
+        if os.path.exists(path):
+            return backend, path
+        print(f"UYARI: {path} bulunamadı, PyTorch modeli kullanılacak. (python export_models.py)")
+        return "pt", pt_path
+
+    preference = GPU_PREFERENCE if device == "cuda" else CPU_PREFERENCE
+    for candidate in preference:
+        path = backend_path(pt_path, candidate)
+        if os.path.exists(path):
+            return candidate, path
+    return "pt", pt_path
+
+
+def load_model(pt_path, backend = "auto", device = "cpu"):
+    """Seçilen formattaki YOLO modelini yükler. (model, backend) döner."""
+    from ultralytics import YOLO
+
+    backend, path = select_backend(pt_path, backend, device)
+    print(f"{os.path.basename(pt_path)} -> {backend} ({path})")
+    return YOLO(path, task = "detect"), backend
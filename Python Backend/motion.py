@@ -0,0 +1,87 @@
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Araç tespitinden önce çalışan ucuz hareket kontrolü.
+
+    Kare küçültülüp gri tonlamaya çevrilir ve yavaşça güncellenen arka plan ile karşılaştırılır.
+    Değişen piksel oranı min_area_ratio'yu geçerse hareket var sayılır ve hold_seconds boyunca
+    tespit açık kalır. roi verilirse sadece şerit poligonunun içindeki hareket dikkate alınır.
+    roi noktaları kare boyutundan bağımsız olsun diye 0-1 arası oran olarak verilir.
+    """
+
+    def __init__(self, roi = None, scale_width = 160, threshold = 25, min_area_ratio = 0.003,
+                 learning_rate = 0.05, hold_seconds = 1.0):
+        self.roi = roi
+        self.scale_width = scale_width
+        self.threshold = threshold
+        self.min_area_ratio = min_area_ratio
+        self.learning_rate = learning_rate
+        self.hold_seconds = hold_seconds
+
+        self.background = None
+        self.mask = None
+        self.mask_pixels = 0
+        self.last_motion = None
+
+        self.frames = 0
+        self.active_frames = 0
+        self.last_ratio = 0.0
+
+    def _prepare(self, frame):
+        height, width = frame.shape[:2]
+        scaled_height = max(1, int(height * self.scale_width / width))
+        small = cv2.resize(frame, (self.scale_width, scaled_height), interpolation = cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def _build_mask(self, shape):
+        if not self.roi:
+            self.mask = None
+            self.mask_pixels = shape[0] * shape[1]
+            return
+
+        height, width = shape
+        points = np.array([(int(x * width), int(y * height)) for x, y in self.roi], dtype = np.int32)
+        self.mask = np.zeros(shape, dtype = np.uint8)
+        cv2.fillPoly(self.mask, [points], 255)
+        self.mask_pixels = max(1, cv2.countNonZero(self.mask))
+
+    def check(self, frame, now):
+        """Tespit çalışmalı mı? Hareket varsa veya hareket yeni bittiyse True döner."""
+        self.frames += 1
+        gray = self._prepare(frame)
+
+        if self.background is None or self.background.shape != gray.shape:
+            self.background = gray.astype(np.float32)
+            self._build_mask(gray.shape)
+            self.last_motion = now # İlk karede tespit çalışsın
+            self.active_frames += 1
+            return True
+
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self.background))
+        _, changed = cv2.threshold(diff, self.threshold, 255, cv2.THRESH_BINARY)
+        if self.mask is not None:
+            changed = cv2.bitwise_and(changed, self.mask)
+
+        self.last_ratio = cv2.countNonZero(changed) / self.mask_pixels
+        cv2.accumulateWeighted(gray, self.background, self.learning_rate)
+
+        if self.last_ratio >= self.min_area_ratio:
+            self.last_motion = now
+
+        active = now - self.last_motion <= self.hold_seconds
+        if active:
+            self.active_frames += 1
+        return active
+
+    def stats(self):
+        skipped = self.frames - self.active_frames
+        return {
+            "frames": self.frames,
+            "skipped": skipped,
+            "skip_ratio": round(skipped / self.frames, 3) if self.frames else 0.0,
+            "last_motion_ratio": round(self.last_ratio, 4),
+        }
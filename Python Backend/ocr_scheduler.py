@@ -0,0 +1,105 @@
+import cv2
+
+
+def plate_sharpness(plate_img):
+    """Laplacian varyansı: bulanık plakada düşük, net plakada yüksek çıkar."""
+    gray = cv2.cvtColor(plate_img, cv2.COLOR_BGR2GRAY) if plate_img.ndim == 3 else plate_img
+    return cv2.Laplacian(gray, cv2.CV_64F).var()
+
+
+class OCRScheduler:
+    """
+    OCR'ın ne zaman ve hangi plaka görüntüsüyle çalışacağına karar verir.
+
+    - Çok küçük veya bulanık plaka görüntüleri OCR'a hiç gönderilmez.
+    - İki okuma arasında gelen kareler içinden en net ve en büyük plaka görüntüsü seçilir.
+    - Plakası kesinleşmek üzere olan araç (tek oy eksik) daha sık okunur.
+    - Plakası kesinleşen araç sadece ara sıra doğrulama için okunur, uyuşmazlık olursa okuma yeniden başlar.
+    - Tüm kameralar için saniyede en fazla max_per_second OCR yapılır. Süreler karelerin zamanıyla (now) ölçülür,
+      kayıttan hızlı taramada da video saniyesi başına canlıdaki kadar OCR yapılır.
+    """
+
+    def __init__(self, max_per_second = 8.0, min_width = 40, min_height = 12, min_sharpness = 30.0,
+                 target_width = 160, min_interval = 0.2, verify_interval = 2.0):
+        self.max_per_second = max_per_second
+        self.min_width = min_width
+        self.min_height = min_height
+        self.min_sharpness = min_sharpness
+        self.target_width = target_width
+        self.min_interval = min_interval
+        self.verify_interval = verify_interval
+
+        self.tokens = max_per_second
+        self.last_refill = None
+
+        self.offered = 0
+        self.ocr_calls = 0
+        self.rejected_small = 0
+        self.rejected_blur = 0
+        self.skipped_budget = 0
+
+    def wants_verification(self, track, now):
+        """Plakası kesinleşen araçta doğrulama okuması zamanı geldi mi?"""
+        return track.last_ocr_at is None or now - track.last_ocr_at >= self.verify_interval
+
+    def _interval(self, track):
+        if track.has_confident_plate():
+            return self.verify_interval
+        _, votes = track.leading_votes()
+        if votes == track.min_votes - 1:
+            return self.min_interval / 2 # Tek oy eksik, hızlıca kesinleştir
+        return self.min_interval
+
+    def _take_token(self, reserve, now):
+        """Bütçeden bir OCR hakkı düşer. reserve kadar hak diğer araçlar için bırakılır."""
+        if self.last_refill is not None:
+            elapsed = max(0.0, now - self.last_refill)
+            self.tokens = min(self.max_per_second, self.tokens + elapsed * self.max_per_second)
+        self.last_refill = now
+        if self.tokens < 1 + reserve:
+            return False
+        self.tokens -= 1
+        return True
+
+    def offer(self, track, plate_img, now):
+        """
+        Bu karedeki plaka görüntüsünü aday olarak değerlendirir.
+        OCR çalışması gerekiyorsa seçilen en iyi görüntüyü, gerekmiyorsa None döner.
+        """
+        self.offered += 1
+        height, width = plate_img.shape[:2]
+        if width < self.min_width or height < self.min_height:
+            self.rejected_small += 1
+            return None
+
+        sharpness = plate_sharpness(plate_img)
+        if sharpness < self.min_sharpness:
+            self.rejected_blur += 1
+            return None
+
+        score = sharpness * min(1.0, width / self.target_width)
+        if track.ocr_candidate is None or score > track.ocr_candidate[0]:
+            track.ocr_candidate = (score, plate_img.copy()) # Kare üzerine çizim yapılacağı için kopya
+
+        since = track.last_ocr_at if track.last_ocr_at is not None else track.first_seen
+        if now - since < self._interval(track):
+            return None
+
+        if not self._take_token(1 if track.has_confident_plate() else 0, now):
+            self.skipped_budget += 1
+            return None
+
+        _, best_img = track.ocr_candidate
+        track.ocr_candidate = None
+        track.last_ocr_at = now
+        self.ocr_calls += 1
+        return best_img
+
+    def stats(self):
+        return {
+            "offered": self.offered,
+            "ocr_calls": self.ocr_calls,
+            "rejected_small": self.rejected_small,
+            "rejected_blur": self.rejected_blur,
+            "skipped_budget": self.skipped_budget,
+        }
@@ -0,0 +1,309 @@
+"""
+Kayıtlı kapı videolarını (veya kare klasörlerini) gerçek zamandan hızlı tarar.
+
+Kareler ayrı bir thread'de çözülür ve sınırlı bir kuyrukla çıkarıma verilir; çıkarım tarafı --batch kadar kare
+toplayıp araç / plaka modellerine tek çağrıda gönderir. --every N ile her N. kare işlenir, aradaki kareler
+renk dönüşümü yapılmadan geçilir. Takip, OCR bütçesi ve aynı plakanın bekleme süresi video zamanıyla işler,
+yani kararlar canlı sistemdekiyle aynıdır; sadece beklemeden, makinenin yetiştiği hızda çalışır.
+
+Bulunan geçişler NDJSON rapora (--report) ve / veya veritabanına (--db) yazılır. Veritabanına yazma
+log yazıcısının toplu yazma yolunu kullanır (istatistikler ve plaka araması da güncellenir). Log id'lerini
+her yazıcı kendi açılışında belirlediği için --db, canlı sistem aynı veritabanına yazarken kullanılmamalı;
+bu durumda sadece rapor alınır.
+
+Verilen kaynaklar aynı kapının (--camera) kayıtları sayılır. Karelerin zamanı: --start verilirse ilk kaydın
+başlangıcı odur, sonraki kayıtlar art arda gelir. Verilmezse video dosyasının değiştirilme zamanı kaydın bittiği an,
+kare klasöründe ilk karenin değiştirilme zamanı başlangıç sayılır.
+
+Kullanım:
+    python offline_scan.py kayit1.mp4 kayit2.mp4 --report olaylar.ndjson
+    python offline_scan.py kareler/ --fps 10 --every 2 --batch 16 --db
+    python offline_scan.py kayit.mp4 --start 2026-10-01T08:00:00 --camera 1 --report -
+"""
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+
+import cv2
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+DEFAULT_FPS = 25.0 # Videoda FPS bilgisi yoksa ve kare klasörlerinde
+
+
+class ScanSource:
+    """Taranacak tek bir video dosyası ya da kare klasörü."""
+
+    def __init__(self, path, camera_id = 0, fps = None, start = None):
+        self.path = path
+        self.camera_id = camera_id
+        self.files = None
+
+        if os.path.isdir(path):
+            self.files = sorted(os.path.join(path, name) for name in os.listdir(path)
+                                if name.lower().endswith(IMAGE_EXTENSIONS))
+            if not self.files:
+                raise ValueError(f"Klasörde kare yok: {path}")
+            self.fps = fps or DEFAULT_FPS
+            self.total_frames = len(self.files)
+            default_start = os.path.getmtime(self.files[0])
+        else:
+            cap = cv2.VideoCapture(path)
+            if not cap.isOpened():
+                raise ValueError(f"Video açılamadı: {path}")
+            self.fps = fps or cap.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+            self.total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            cap.release()
+            default_start = os.path.getmtime(path) - self.total_frames / self.fps
+
+        self.start = start.timestamp() if start is not None else default_start
+
+    @property
+    def duration(self):
+        return self.total_frames / self.fps
+
+    def frames(self, every = 1):
+        """(kare numarası, çekildiği zaman, kare) üretir. Sadece her every. kare çözülür."""
+        if self.files is not None:
+            for frame_no in range(0, len(self.files), every):
+                frame = cv2.imread(self.files[frame_no])
+                if frame is not None:
+                    yield frame_no, self.start + frame_no / self.fps, frame
+            return
+
+        cap = cv2.VideoCapture(self.path)
+        try:
+            frame_no = 0
+            while True:
+                if frame_no % every:
+                    if not cap.grab(): # Kare geçilir, renk dönüşümü ve kopya yapılmaz
+                        break
+                else:
+                    success, frame = cap.read()
+                    if not success:
+                        break
+                    yield frame_no, self.start + frame_no / self.fps, frame
+                frame_no += 1
+        finally:
+            cap.release()
+
+
+class FrameReader:
+    """
+    Kaynakları sırayla çözüp sınırlı bir kuyruğa koyar. Kuyruk dolarsa bekler (kayıttan taramada kare atılmaz).
+    Bitince kuyruğa None koyar.
+    """
+
+    def __init__(self, sources, every = 1, queue_size = 64):
+        self.sources = sources
+        self.every = every
+        self.queue = queue.Queue(maxsize = queue_size)
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target = self._run, name = "offline-decode", daemon = True)
+        self.decoded = 0
+        self.decode_seconds = 0.0
+        self.error = None
+
+    def start(self):
+        self.thread.start()
+
+    def _put(self, item):
+        while not self.stop_event.is_set():
+            try:
+                self.queue.put(item, timeout = 0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        try:
+            for source in self.sources:
+                frames = source.frames(self.every)
+                while True:
+                    decode_start = time.perf_counter()
+                    item = next(frames, None)
+                    self.decode_seconds += time.perf_counter() - decode_start
+                    if item is None:
+                        break
+                    frame_no, timestamp, frame = item
+                    if not self._put((source, frame_no, timestamp, frame)):
+                        return
+                    self.decoded += 1
+        except Exception as e:
+            self.error = e
+        finally:
+            self._put(None)
+
+    def stop(self):
+        self.stop_event.set()
+
+
+class ScanReport:
+    """Taramada bulunan geçişleri sayar ve isteğe bağlı olarak NDJSON dosyasına yazar."""
+
+    def __init__(self, sources, output = None):
+        self.sources = sources
+        self.output = output
+        self.events = 0
+        self.allowed = 0
+
+    def source_of(self, camera_id, timestamp):
+        for source in self.sources:
+            if source.camera_id == camera_id and source.start <= timestamp <= source.start + source.duration + 1:
+                return source
+        return None
+
+    def __call__(self, event):
+        """AccessControlSystem olay dinleyicisi."""
+        if event.get("type") != "access":
+            return
+        self.events += 1
+        self.allowed += 1 if event["status"] else 0
+
+        if self.output is None:
+            return
+        timestamp = datetime.fromisoformat(event["timestamp"])
+        source = self.source_of(event.get("camera"), timestamp.timestamp())
+        record = {
+            "source": source.path if source else None,
+            "camera": event.get("camera"),
+            "offset": round(timestamp.timestamp() - source.start, 2) if source else None, # Videonun kaçıncı saniyesi
+            "timestamp": event["timestamp"],
+            "plate": event["plate"],
+            "status": event["status"],
+            "owner": event["owner"],
+            "matched_plate": event["matched_plate"],
+            "match_distance": event["match_distance"],
+            "log_id": event["log_id"],
+        }
+        self.output.write(json.dumps(record, ensure_ascii = False) + "\n")
+        self.output.flush()
+
+
+def scan(system, sources, every = 1, batch_size = 8, report = None, progress_interval = 5.0):
+    """
+    Kaynakları tarar ve özet döner. system modelleri yüklenmiş bir AccessControlSystem olmalı.
+    report: NDJSON yazılacak dosya nesnesi (None ise sadece sayılır).
+    """
+    scan_report = ScanReport(sources, report)
+    system.event_listeners.append(scan_report)
+
+    expected = sum((source.total_frames + every - 1) // every for source in sources)
+    reader = FrameReader(sources, every, queue_size = batch_size * 4)
+    reader.start()
+
+    processed, infer_seconds = 0, 0.0
+    start = last_progress = time.perf_counter()
+    finished = False
+    try:
+        while not finished:
+            batch = []
+            while len(batch) < batch_size:
+                item = reader.queue.get()
+                if item is None:
+                    finished = True
+                    break
+                batch.append(item)
+            if not batch:
+                break
+
+            infer_start = time.perf_counter()
+            system.process_batch([frame for _, _, _, frame in batch], [source.camera_id for source, _, _, _ in batch],
+                                 timestamps = [timestamp for _, _, timestamp, _ in batch], draw = False)
+            infer_seconds += time.perf_counter() - infer_start
+            processed += len(batch)
+
+            now = time.perf_counter()
+            if now - last_progress >= progress_interval:
+                last_progress = now
+                percent = f" (%{100 * processed / expected:.0f})" if expected else ""
+                print(f"{processed}/{expected} kare{percent}, {processed / (now - start):.1f} kare/sn, "
+                      f"{scan_report.events} geçiş", file = sys.stderr)
+    finally:
+        reader.stop()
+        system.event_listeners.remove(scan_report)
+
+    if reader.error is not None:
+        raise reader.error
+
+    elapsed = time.perf_counter() - start
+    video_seconds = sum(source.duration for source in sources)
+    return {
+        "sources": len(sources),
+        "frames": processed,
+        "every": every,
+        "seconds": round(elapsed, 1),
+        "fps": round(processed / elapsed, 1) if elapsed else None,
+        "video_seconds": round(video_seconds, 1),
+        "speedup": round(video_seconds / elapsed, 1) if elapsed else None, # Gerçek zamanın kaç katı
+        "decode_seconds": round(reader.decode_seconds, 1),
+        "inference_seconds": round(infer_seconds, 1),
+        "events": scan_report.events,
+        "allowed": scan_report.allowed,
+        "denied": scan_report.events - scan_report.allowed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Kayıtlı kapı videolarını hızlı tarama")
+    parser.add_argument("paths", nargs = "+", help = "Video dosyaları veya kare klasörleri")
+    parser.add_argument("--every", type = int, default = 1, help = "Her N. kareyi işle")
+    parser.add_argument("--batch", type = int, default = 8, help = "Modellere tek çağrıda verilen kare sayısı")
+    parser.add_argument("--fps", type = float, default = None, help = "Kare klasörleri için (videoda dosyadan okunur)")
+    parser.add_argument("--start", type = datetime.fromisoformat, default = None, help = "Kaydın başlangıç zamanı")
+    parser.add_argument("--camera", type = int, default = 0, help = "Kaydın alındığı kapı kamerası (hareket bölgesi için)")
+    parser.add_argument("--report", default = None, help = "NDJSON rapor dosyası ('-' ekrana)")
+    parser.add_argument("--db", action = "store_true", help = "Geçişleri veritabanına da yaz")
+    parser.add_argument("--vlm", action = "store_true", help = "Araç tanımı da yapılsın (sadece --db ile)")
+    args = parser.parse_args()
+
+    if not args.db and args.report is None:
+        parser.error("--report veya --db verilmeli")
+    if args.every < 1 or args.batch < 1:
+        parser.error("--every ve --batch en az 1 olmalı")
+
+    from ai import AccessControlSystem
+    from database import init_db
+    from log_writer import log_writer
+    from plate_index import allowlist_index
+
+    sources, start = [], args.start
+    for path in args.paths:
+        source = ScanSource(path, args.camera, args.fps, start)
+        if start is not None:
+            start = datetime.fromtimestamp(source.start + source.duration) # Sonraki kayıt bunun bittiği yerden
+        sources.append(source)
+
+    init_db()
+    allowlist_index.load()
+    system = AccessControlSystem(camera_sources = [], lazy = True, use_vlm = args.vlm and args.db)
+    system.load_models()
+    system.write_logs = args.db
+    if args.db:
+        log_writer.start()
+
+    report = None
+    if args.report == "-":
+        report = sys.stdout
+    elif args.report:
+        report = open(args.report, "w", encoding = "utf-8")
+
+    try:
+        summary = scan(system, sources, args.every, args.batch, report)
+    finally:
+        if report not in (None, sys.stdout):
+            report.close()
+        if args.db:
+            system.shutdown() # VLM kuyruğu bitsin
+            log_writer.stop()
+
+    print(json.dumps(summary, ensure_ascii = False), file = sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,498 @@
+import asyncio
+import threading
+import time
+from collections import deque, namedtuple
+
+import cv2
+
+STREAM_WIDTHS = (320, 480, 640, 854, 960, 1280, 1920) # İstenen genişlik en yakınına yuvarlanır
+STREAM_QUALITY_STEP = 5
+STREAM_MAX_FPS = 30
+
+
+class StreamProfile(namedtuple("StreamProfile", "width quality max_fps")):
+    """
+    Bir izleyicinin yayın ayarları. width None: kamera çözünürlüğü, quality None: boru hattının varsayılanı,
+    max_fps None: her kare. Aynı (genişlik, kalite) isteyen izleyiciler aynı kodlamayı paylaşır.
+    """
+    __slots__ = ()
+
+    @property
+    def encoding(self):
+        return (self.width, self.quality)
+
+
+STREAM_TIERS = {
+    "full": StreamProfile(None, None, None), # Eski davranış
+    "high": StreamProfile(1280, 80, 25),
+    "medium": StreamProfile(854, 70, 15),
+    "low": StreamProfile(480, 60, 8), # Mobil / zayıf bağlantı
+}
+
+
+def stream_profile(tier = "full", width = None, quality = None, max_fps = None):
+    """
+    İstemcinin istediği yayın ayarları. tier ön ayarının üzerine verilen değerler yazılır.
+    Değerler sabit adımlara yuvarlanır; böylece farklı kodlama sayısı sınırlı kalır ve benzer istemciler aynı kodlamayı paylaşır.
+    Bilinmeyen ön ayar veya geçersiz değerde ValueError.
+    """
+    if tier not in STREAM_TIERS:
+        raise ValueError(f"Bilinmeyen yayın profili: {tier} ({', '.join(STREAM_TIERS)})")
+    profile = STREAM_TIERS[tier]
+
+    if width is not None:
+        if width <= 0:
+            raise ValueError("Genişlik pozitif olmalı")
+        profile = profile._replace(width = min(STREAM_WIDTHS, key = lambda w: abs(w - width)))
+    if quality is not None:
+        if not 1 <= quality <= 100:
+            raise ValueError("Kalite 1-100 arasında olmalı")
+        profile = profile._replace(quality = max(30, min(95, round(quality / STREAM_QUALITY_STEP) * STREAM_QUALITY_STEP)))
+    if max_fps is not None:
+        if max_fps <= 0:
+            raise ValueError("FPS pozitif olmalı")
+        profile = profile._replace(max_fps = min(STREAM_MAX_FPS, max(1, round(max_fps))))
+    return profile
+
+
+def mjpeg_part(buffer):
+    """Kodlanmış JPEG'i multipart parçasına çevirir. JPEG baytları tek seferde, numpy tamponundan doğrudan kopyalanır."""
+    header = b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n" % len(buffer)
+    return b"".join((header, buffer.data, b"\r\n"))
+
+
+def downscale(frame, target_width, scaled):
+    """
+    Kareyi target_width genişliğine küçültür. Oran 2 ve üstündeyse önce yarıya indirilir (INTER_AREA, tam sayı oranda hızlı),
+    kalanı INTER_LINEAR ile yapılır: tam sayı olmayan oranlarda doğrudan INTER_AREA'dan ~5 kat hızlı ve örtüşme (aliasing) yok.
+    scaled: genişlik -> küçültülmüş kare, aynı karenin profilleri ara boyutları paylaşır.
+    """
+    height, width = frame.shape[:2]
+    image = scaled.get(target_width)
+    if image is not None:
+        return image
+
+    image = frame
+    while image.shape[1] >= 2 * target_width:
+        half_width = image.shape[1] // 2
+        half = scaled.get(half_width)
+        if half is None:
+            half = scaled[half_width] = cv2.resize(image, (half_width, image.shape[0] // 2), interpolation = cv2.INTER_AREA)
+        image = half
+
+    if image.shape[1] != target_width:
+        image = cv2.resize(image, (target_width, round(height * target_width / width)), interpolation = cv2.INTER_LINEAR)
+    scaled[target_width] = image
+    return image
+
+
+def encode_tiers(frame, encodings, default_quality = 80):
+    """
+    Kareyi istenen her (genişlik, kalite) için bir kez kodlar, {(genişlik, kalite): multipart parçası} döner.
+    Aynı genişlik birden fazla kalitede istenirse küçültme bir kez yapılır. Kare büyütülmez.
+    """
+    width = frame.shape[1]
+    scaled = {}
+    chunks = {}
+    for target_width, quality in encodings:
+        image = frame
+        if target_width is not None and target_width < width:
+            image = downscale(frame, target_width, scaled)
+
+        success, buffer = cv2.imencode(".jpg", image, [int(cv2.IMWRITE_JPEG_QUALITY), quality or default_quality])
+        if success:
+            chunks[(target_width, quality)] = mjpeg_part(buffer)
+    return chunks
+
+
+def open_capture(source = 0):
+    """
+    Kamera indeksi, video dosyası veya RTSP adresinden VideoCapture açar.
+    """
+    if isinstance(source, int):
+        cap = cv2.VideoCapture(source, cv2.CAP_DSHOW)
+    else:
+        cap = cv2.VideoCapture(source)
+
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1) # Sürücü tarafında kare biriktirme
+    return cap
+
+
+class DropOldestQueue:
+    """
+    Sınırlı kapasiteli kuyruk. Dolduğunda en eski öğe atılır ve sayaç artırılır.
+    Böylece yavaş bir aşama önceki aşamayı bekletmez, sadece eski kareleri kaybederiz.
+    Okuyan taraf thread ise get, asyncio görevi ise (SSE, MJPEG yanıtları) get_async kullanır.
+    """
+
+    def __init__(self, maxsize = 1):
+        self.maxsize = maxsize
+        self.items = deque()
+        self.cond = threading.Condition()
+        self.waiters = [] # get_async'te bekleyen (olay döngüsü, future)
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, item):
+        with self.cond:
+            if len(self.items) >= self.maxsize:
+                self.items.popleft()
+                self.dropped += 1
+            self.items.append(item)
+            self.cond.notify()
+            self._wake_async()
+
+    def get(self, timeout = None):
+        """Öğe yoksa en fazla timeout kadar bekler, yine yoksa None döner."""
+        with self.cond:
+            self.cond.wait_for(lambda: self.items or self.closed, timeout)
+            if not self.items:
+                return None
+            return self.items.popleft()
+
+    async def get_async(self, timeout = None):
+        """get'in asyncio karşılığı: beklerken thread tutmaz. Öğe yoksa en fazla timeout kadar bekler."""
+        loop = asyncio.get_running_loop()
+        with self.cond:
+            if self.items or self.closed:
+                return self.items.popleft() if self.items else None
+            waiter = (loop, loop.create_future())
+            self.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter[1], timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self.cond:
+                if waiter in self.waiters:
+                    self.waiters.remove(waiter)
+        with self.cond:
+            return self.items.popleft() if self.items else None
+
+    def _wake_async(self):
+        """cond tutulurken çağrılır. put başka bir thread'den gelir, future kendi döngüsünde tamamlanır."""
+        for loop, future in self.waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, future)
+            except RuntimeError: # Döngü kapanmış
+                pass
+        self.waiters.clear()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+            self._wake_async()
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class StreamSubscriber(DropOldestQueue):
+    """Bir izleyicinin kare kuyruğu, yayın profili ve FPS sınırı."""
+
+    def __init__(self, maxsize = 2, profile = STREAM_TIERS["full"]):
+        super().__init__(maxsize)
+        self.profile = profile
+        self.interval = 1.0 / profile.max_fps if profile.max_fps else 0.0
+        self.next_due = 0.0
+
+    def is_due(self, now):
+        return now >= self.next_due
+
+    def mark_sent(self, now):
+        if not self.interval:
+            return
+        # Sabit aralıklarla ilerler (ortalama FPS tutar); uzun bir boşluktan sonra şimdiden yeniden başlar
+        if now - self.next_due < self.interval:
+            self.next_due += self.interval
+        else:
+            self.next_due = now + self.interval
+
+
+class FrameBroadcaster:
+    """
+    Kodlanmış kareleri bir kameranın tüm izleyicilerine dağıtır.
+    Her izleyicinin kendi sınırlı kuyruğu vardır, yavaş bir tarayıcı diğerlerini bekletmez.
+    İzleyiciler profillerine göre gruplanır, her grup için kare bir kez kodlanır (due_groups / publish_groups).
+    """
+
+    def __init__(self, queue_size = 2):
+        self.queue_size = queue_size
+        self.subscribers = set()
+        self.lock = threading.Lock()
+
+    def subscribe(self, profile = STREAM_TIERS["full"]):
+        subscriber = StreamSubscriber(self.queue_size, profile)
+        with self.lock:
+            self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+        subscriber.close()
+
+    def publish(self, chunk):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            subscriber.put(chunk)
+
+    def due_groups(self, now):
+        """
+        Bu kareyi bekleyen izleyicileri kodlama ayarına göre gruplar: {(genişlik, kalite): [izleyiciler]}.
+        FPS sınırına takılanlar katılmaz; boş dönerse kare hiç kodlanmaz.
+        """
+        with self.lock:
+            subscribers = list(self.subscribers)
+        groups = {}
+        for subscriber in subscribers:
+            if subscriber.is_due(now):
+                groups.setdefault(subscriber.profile.encoding, []).append(subscriber)
+        return groups
+
+    def publish_groups(self, groups, chunks, now):
+        """encode_tiers sonucunu gruplara dağıtır. Aynı parça (bytes) tüm gruba kopyalanmadan verilir."""
+        for encoding, subscribers in groups.items():
+            chunk = chunks.get(encoding)
+            if chunk is None:
+                continue
+            for subscriber in subscribers:
+                subscriber.put(chunk)
+                subscriber.mark_sent(now)
+
+    def close(self):
+        with self.lock:
+            subscribers = list(self.subscribers)
+            self.subscribers.clear()
+        for subscriber in subscribers:
+            subscriber.close()
+
+    def dropped(self):
+        with self.lock:
+            return sum(subscriber.dropped for subscriber in self.subscribers)
+
+    def __len__(self):
+        return len(self.subscribers)
+
+
+class FramePipeline:
+    """
+    Kamera okuma, yapay zeka işleme ve JPEG kodlama aşamalarını ayrı thread'lerde çalıştırır.
+
+    capture (kamera başına) -> [son kare] -> inference (toplu) -> [kodlama kuyruğu] -> encode -> [izleyici kuyrukları]
+
+    Her kamera thread'i sadece en yeni kareyi tutar. İşleme yavaşladığında eski kareler atılır,
+    yayın her zaman kapıdaki güncel görüntüyü gösterir. Inference thread'i tüm kameraların
+    en yeni karelerini toplayıp modelleri tek bir toplu çağrı ile çalıştırır.
+    Kare başına tespit bir kez, kodlama istenen her profil (çözünürlük + kalite) için bir kez yapılır;
+    izleyici sayısı maliyeti değiştirmez. İzleyicisi olmayan ya da FPS sınırına takılan kareler hiç kodlanmaz.
+
+    keep_alive kapalıysa izleyici kalmadığında idle_seconds sonra boru hattı kendini durdurur.
+    Açıksa tespit ve loglama devam eder, sadece kodlama atlanır.
+    frame_sink(camera_id, kare) verilirse işlenen her kare ona da iletilir.
+    """
+
+    def __init__(self, system, sources = (0,), encode_queue_size = 4, viewer_queue_size = 2, jpeg_quality = 80,
+                 keep_alive = False, idle_seconds = 5.0, batch_wait = 0.01, frame_sink = None):
+        self.system = system
+        self.sources = list(sources)
+        self.jpeg_quality = jpeg_quality
+        self.keep_alive = keep_alive
+        self.idle_seconds = idle_seconds
+        self.batch_wait = batch_wait # İlk kareden sonra diğer kameraları bekleme süresi
+        self.frame_sink = frame_sink
+
+        self.capture_queues = [DropOldestQueue(1) for _ in self.sources] # Kamera başına sadece en yeni kare
+        self.frame_ready = threading.Event()
+        self.encode_queue = DropOldestQueue(encode_queue_size)
+        self.broadcasters = [FrameBroadcaster(viewer_queue_size) for _ in self.sources]
+
+        self.viewer_lock = threading.Lock()
+        self.last_unsubscribe = time.time()
+        self.closed = False
+
+        self.stop_event = threading.Event()
+        self.threads = []
+
+        self.captured = 0
+        self.processed = 0
+        self.batches = 0
+        self.encoded = 0 # Kodlama sayısı (profil başına)
+        self.encoded_bytes = 0
+        self.encode_skipped = 0
+        self.latency_ms = 0.0 # Kameradan çıkışa kadar geçen süre (üstel ortalama)
+        self.fps = 0.0 # İşlenen kare hızı, tüm kameralar (üstel ortalama)
+        self.last_batch_at = None
+
+    def start(self):
+        stages = [(f"capture-{camera_id}", self._capture_loop, (camera_id,)) for camera_id in range(len(self.sources))]
+        stages.append(("inference", self._inference_loop, ()))
+        stages.append(("encode", self._encode_loop, ()))
+
+        for name, target, args in stages:
+            thread = threading.Thread(target = target, args = args, name = f"pipeline-{name}", daemon = True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self, timeout = 2.0):
+        self.stop_event.set()
+        with self.viewer_lock:
+            self.closed = True
+        for q in self.capture_queues:
+            q.close()
+        self.frame_ready.set()
+        self.encode_queue.close()
+        for broadcaster in self.broadcasters:
+            broadcaster.close()
+        for thread in self.threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+
+    def is_running(self):
+        return not self.stop_event.is_set()
+
+    def subscribe(self, camera_id, profile = STREAM_TIERS["full"]):
+        """Kameraya yeni izleyici ekler. Boru hattı kapandıysa None döner."""
+        with self.viewer_lock:
+            if self.closed:
+                return None
+            return self.broadcasters[camera_id].subscribe(profile)
+
+    def unsubscribe(self, camera_id, subscriber):
+        with self.viewer_lock:
+            self.broadcasters[camera_id].unsubscribe(subscriber)
+            self.last_unsubscribe = time.time()
+
+    def viewer_count(self):
+        return sum(len(broadcaster) for broadcaster in self.broadcasters)
+
+    def _close_if_idle(self):
+        """İzleyici yoksa ve bekleme süresi dolduysa yeni abonelikleri kapatır."""
+        with self.viewer_lock:
+            if self.closed:
+                return True
+            if self.viewer_count() or time.time() - self.last_unsubscribe < self.idle_seconds:
+                return False
+            self.closed = True
+            return True
+
+    def _capture_loop(self, camera_id):
+        cap = open_capture(self.sources[camera_id])
+        try:
+            while not self.stop_event.is_set():
+                success, frame = cap.read()
+                if not success:
+                    break
+                self.captured += 1
+                self.capture_queues[camera_id].put((time.time(), frame))
+                self.frame_ready.set()
+        finally:
+            cap.release()
+            self.capture_queues[camera_id].close()
+            self.frame_ready.set()
+
+    def _collect_batch(self):
+        """Her kameranın bekleyen en yeni karesini alır."""
+        batch = []
+        for camera_id, q in enumerate(self.capture_queues):
+            item = q.get(timeout = 0)
+            if item is not None:
+                batch.append((camera_id, item[0], item[1]))
+        return batch
+
+    def _inference_loop(self):
+        try:
+            while not self.stop_event.is_set():
+                if all(q.closed and not len(q) for q in self.capture_queues):
+                    break
+
+                if not self.frame_ready.wait(timeout = 0.5):
+                    continue
+                self.frame_ready.clear()
+
+                # Diğer kameraların karesi de gelsin diye kısa süre bekle
+                if len(self.sources) > 1 and self.batch_wait:
+                    time.sleep(self.batch_wait)
+
+                batch = self._collect_batch()
+                if not batch:
+                    continue
+
+                frames = [frame for _, _, frame in batch]
+                camera_ids = [camera_id for camera_id, _, _ in batch]
+                processed_frames = self.system.process_batch(frames, camera_ids)
+                self.processed += len(batch)
+                self.batches += 1
+
+                now = time.time()
+                if self.last_batch_at is not None and now > self.last_batch_at:
+                    self.fps = 0.9 * self.fps + 0.1 * len(batch) / (now - self.last_batch_at)
+                self.last_batch_at = now
+
+                for (camera_id, captured_at, _), processed_frame in zip(batch, processed_frames):
+                    if self.frame_sink is not None:
+                        self.frame_sink(camera_id, processed_frame)
+                    self.encode_queue.put((camera_id, captured_at, processed_frame))
+        finally:
+            self.encode_queue.close()
+
+    def _encode_loop(self):
+        try:
+            while not self.stop_event.is_set():
+                if not self.keep_alive and self._close_if_idle():
+                    break # Kimse izlemiyor, boru hattını kapat
+
+                item = self.encode_queue.get(timeout = 0.5)
+                if item is None:
+                    if self.encode_queue.closed:
+                        break
+                    continue
+
+                camera_id, captured_at, frame = item
+                broadcaster = self.broadcasters[camera_id]
+                now = time.monotonic()
+                groups = broadcaster.due_groups(now)
+                if not groups:
+                    self.encode_skipped += 1 # İzleyici yok ya da hepsi FPS sınırında, kodlamaya gerek yok
+                    continue
+
+                chunks = encode_tiers(frame, groups, self.jpeg_quality)
+                if not chunks:
+                    continue
+
+                self.encoded += len(chunks)
+                self.encoded_bytes += sum(len(chunk) for chunk in chunks.values())
+                self.latency_ms = 0.9 * self.latency_ms + 0.1 * (time.time() - captured_at) * 1000
+                broadcaster.publish_groups(groups, chunks, now)
+        finally:
+            self.stop_event.set()
+            with self.viewer_lock:
+                self.closed = True
+            for q in self.capture_queues:
+                q.close()
+            for broadcaster in self.broadcasters:
+                broadcaster.close()
+
+    def stats(self):
+        return {
+            "cameras": len(self.sources),
+            "captured": self.captured,
+            "processed": self.processed,
+            "batches": self.batches,
+            "encoded": self.encoded,
+            "encoded_mb": round(self.encoded_bytes / 1e6, 1),
+            "encode_skipped": self.encode_skipped,
+            "viewers": self.viewer_count(),
+            "dropped_capture": sum(q.dropped for q in self.capture_queues),
+            "dropped_encode": self.encode_queue.dropped,
+            "dropped_viewers": sum(broadcaster.dropped() for broadcaster in self.broadcasters),
+            "latency_ms": round(self.latency_ms, 1),
+            "fps": round(self.fps, 1),
+        }
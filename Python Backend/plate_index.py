@@ -0,0 +1,151 @@
+import re
+import threading
+import time
+
+from database import SessionLocal, AllowedPlate, User
+from plate_match import FuzzyPlateIndex, match_threshold
+
+
+def normalize_plate(text):
+    """Plakayı büyük harfe çevirir, harf ve rakam dışındaki karakterleri siler."""
+    if not text:
+        return ""
+    return re.sub(r"[^A-Z0-9]", "", text.upper())
+
+
+class AllowlistIndex:
+    """
+    İzinli plakaların bellekteki kopyası: plaka -> (user_id, kullanıcı adı).
+
+    Açılışta veritabanından yüklenir, API üzerinden plaka eklenip silindikçe güncellenir.
+    Güncellemeler sözlüğün kopyası üzerinde yapılıp tek atamada değiştirilir, okuyan taraf kilit beklemez.
+    Index max_age süresinden eskiyse veya yüklenemediyse karar veritabanından verilir.
+
+    version_source verilirse (ayrı çıkarım süreci) her sorguda sürüm numarası kontrol edilir,
+    başka süreçte plaka eklenip silindiyse liste yeniden yüklenir.
+
+    Tam eşleşme yoksa match() OCR karışıklıklarını (0/O, 8/B, eksik karakter) hesaba katarak en yakın izinli plakayı arar.
+    """
+
+    def __init__(self, max_age = 600.0):
+        self.max_age = max_age
+        self.plates = {}
+        self.fuzzy = FuzzyPlateIndex()
+        self.loaded_at = None
+        self.lock = threading.Lock() # Sadece yazanlar arasında
+        self.version_source = None
+        self.loaded_version = None
+
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.db_fallbacks = 0
+        self.fuzzy_matches = 0
+
+    def load(self):
+        """Tüm izinli plakaları tek sorguda yükler."""
+        version = self.version_source() if self.version_source else None
+        db = SessionLocal()
+        try:
+            rows = db.query(AllowedPlate.plate_number, AllowedPlate.user_id, User.username) \
+                .outerjoin(User, User.id == AllowedPlate.user_id).all()
+        finally:
+            db.close()
+
+        plates = {normalize_plate(plate_number): (user_id, username or "Misafir") for plate_number, user_id, username in rows}
+        fuzzy = FuzzyPlateIndex(plates)
+        with self.lock:
+            self.plates = plates
+            self.fuzzy = fuzzy
+            self.loaded_at = time.time()
+            self.loaded_version = version
+            self.reloads += 1
+        print(f"İzinli plaka listesi yüklendi ({len(plates)} plaka)")
+
+    def is_stale(self):
+        if self.version_source is not None and self.version_source() != self.loaded_version:
+            return True
+        return self.loaded_at is None or time.time() - self.loaded_at > self.max_age
+
+    def invalidate(self):
+        """Bir sonraki sorguda listenin yeniden yüklenmesini sağlar."""
+        self.loaded_at = None
+
+    def lookup(self, plate_text):
+        """İzinliyse (user_id, kullanıcı adı), değilse None döner."""
+        if self.is_stale():
+            try:
+                self.load()
+            except Exception as e:
+                print(f"İzinli plaka listesi yüklenemedi: {e}")
+                return self._lookup_db(plate_text)
+
+        entry = self.plates.get(plate_text)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def match(self, plate_text, threshold, indel_threshold = None):
+        """
+        Önce tam eşleşme, yoksa eşik uzaklığına kadar en yakın izinli plaka (eşik: plate_match.match_threshold).
+        (user_id, kullanıcı adı, eşleşen plaka, uzaklık) ya da None döner. Tam eşleşmede uzaklık 0.
+        """
+        entry = self.lookup(plate_text)
+        if entry is not None:
+            return entry[0], entry[1], plate_text, 0.0
+
+        if threshold <= 0 or self.loaded_at is None:
+            return None
+
+        found = self.fuzzy.closest(plate_text, match_threshold(plate_text, threshold, indel_threshold))
+        if found is None:
+            return None
+        plate, distance = found
+        entry = self.plates.get(plate)
+        if entry is None:
+            return None
+        self.fuzzy_matches += 1
+        return entry[0], entry[1], plate, distance
+
+    def _lookup_db(self, plate_text):
+        self.db_fallbacks += 1
+        db = SessionLocal()
+        try:
+            row = db.query(AllowedPlate.user_id, User.username) \
+                .outerjoin(User, User.id == AllowedPlate.user_id) \
+                .filter(AllowedPlate.plate_number == plate_text).first()
+            if row is None:
+                return None
+            return row.user_id, row.username or "Misafir"
+        finally:
+            db.close()
+
+    def add(self, plate_text, user_id, username):
+        with self.lock:
+            plates = dict(self.plates)
+            plates[plate_text] = (user_id, username)
+            self.plates = plates
+            self.fuzzy = FuzzyPlateIndex(plates)
+
+    def remove(self, plate_text):
+        with self.lock:
+            plates = dict(self.plates)
+            plates.pop(plate_text, None)
+            self.plates = plates
+            self.fuzzy = FuzzyPlateIndex(plates)
+
+    def stats(self):
+        return {
+            "plates": len(self.plates),
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads,
+            "db_fallbacks": self.db_fallbacks,
+            "fuzzy_matches": self.fuzzy_matches,
+            "age_seconds": round(time.time() - self.loaded_at, 1) if self.loaded_at else None,
+        }
+
+
+allowlist_index = AllowlistIndex()
@@ -0,0 +1,135 @@
+"""
+OCR karışıklıklarını hesaba katan plaka eşleştirme.
+
+OCR'ın sık karıştırdığı karakterler (0/O, 1/I, 8/B, 5/S, 2/Z ...) aynı sınıfta sayılır.
+- constrain_plate: Türk plaka düzenine göre (2 rakam il kodu, 1-3 harf, 2-5 rakam) harf olması gereken yerdeki
+  rakamı harfe, rakam olması gereken yerdeki harfi rakama çevirir.
+- plate_distance: karışık karakter değişimi ucuz, diğer değişim ve eksik / fazla karakter pahalı olan uzaklık.
+- FuzzyPlateIndex: izinli plakalar üzerinde en yakın plakayı onbinlerce plakada da milisaniyenin altında bulur.
+- match_threshold: düzene uyan okumada eksik / fazla karakteri affetmez (34ABC12, 34ABC123'ten farklı geçerli bir plakadır).
+"""
+
+# Rakam olması gereken yerde okunan harf -> rakam, harf olması gereken yerde okunan rakam -> harf
+LETTER_TO_DIGIT = {"O": "0", "D": "0", "Q": "0", "I": "1", "L": "1", "Z": "2", "A": "4", "S": "5", "G": "6", "T": "7", "B": "8"}
+DIGIT_TO_LETTER = {"0": "O", "1": "I", "2": "Z", "4": "A", "5": "S", "6": "G", "7": "T", "8": "B"}
+
+CONFUSION_COST = 0.3 # Karışık karakter değişimi (0 <-> O)
+SUBSTITUTION_COST = 1.0 # Başka bir karakter
+INDEL_COST = 0.8 # Eksik veya fazla okunan karakter
+
+MAX_POSITION_FIXES = 2 # Düzen için en fazla bu kadar karakter çevrilir
+
+
+def constrain_plate(text):
+    """
+    Temizlenmiş OCR metnini Türk plaka düzenine oturtur. Düzene uymuyorsa None.
+    Harf / rakam bloklarının her olası bölünmesi denenir, en az karakter çeviren seçilir.
+    """
+    n = len(text)
+    best, best_fixes = None, MAX_POSITION_FIXES + 1
+    for letters in range(1, 4):
+        digits = n - 2 - letters
+        if digits < 2 or digits > 5:
+            continue
+
+        fixed, fixes = [], 0
+        for i, ch in enumerate(text):
+            want_letter = 2 <= i < 2 + letters
+            if want_letter and not ch.isdigit():
+                fixed.append(ch)
+            elif not want_letter and ch.isdigit():
+                fixed.append(ch)
+            else:
+                table = DIGIT_TO_LETTER if want_letter else LETTER_TO_DIGIT
+                if ch not in table:
+                    break
+                fixed.append(table[ch])
+                fixes += 1
+        else:
+            if fixes < best_fixes and 1 <= int(fixed[0] + fixed[1]) <= 81: # İl kodu 01-81
+                best, best_fixes = "".join(fixed), fixes
+    return best
+
+
+def match_threshold(plate, threshold, indel_threshold = None):
+    """
+    Okumaya uygulanacak uzaklık eşiği. Düzene uyan okuma başka bir geçerli plaka olabileceği için eşik INDEL_COST'un
+    altında tutulur, sadece karışık karakterler affedilir. Eksik / fazla karakter (indel_threshold) sadece düzene
+    uymayan okumada kabul edilir.
+    """
+    if constrain_plate(plate) is None and indel_threshold is not None:
+        return max(threshold, indel_threshold)
+    return min(threshold, INDEL_COST - CONFUSION_COST / 2)
+
+
+def canonical(plate):
+    """Karışık karakterleri tek sınıfa indirger: 34OB012 ve 340B0I2 aynı anahtarı verir."""
+    return "".join(LETTER_TO_DIGIT.get(ch, ch) for ch in plate)
+
+
+def _deletions(key):
+    return {key[:i] + key[i + 1:] for i in range(len(key))}
+
+
+def plate_distance(a, b):
+    """Karışıklık ağırlıklı düzenleme uzaklığı."""
+    previous = [j * INDEL_COST for j in range(len(b) + 1)]
+    for i, ca in enumerate(a, 1):
+        current = [i * INDEL_COST]
+        canon_a = LETTER_TO_DIGIT.get(ca, ca)
+        for j, cb in enumerate(b, 1):
+            if ca == cb:
+                cost = 0.0
+            elif canon_a == LETTER_TO_DIGIT.get(cb, cb):
+                cost = CONFUSION_COST
+            else:
+                cost = SUBSTITUTION_COST
+            current.append(min(previous[j] + INDEL_COST, current[j - 1] + INDEL_COST, previous[j - 1] + cost))
+        previous = current
+    return previous[-1]
+
+
+class FuzzyPlateIndex:
+    """
+    Plakaların karışıklık sınıfına indirgenmiş hali ve bu halin tek karakter silinmiş varyantları
+    üzerinde sözlük (SymSpell yöntemi). Sorguda sadece aynı anahtarı paylaşan birkaç aday için
+    uzaklık hesaplanır, plaka sayısı arttıkça sorgu süresi değişmez.
+    Kapsadığı hatalar: istenen sayıda karışık karakter + bir eksik, fazla veya farklı karakter.
+    """
+
+    def __init__(self, plates = ()):
+        self.exact = {} # anahtar -> plakalar
+        self.deleted = {} # tek karakteri silinmiş anahtar -> plakalar
+        for plate in plates:
+            self.add(plate)
+
+    def add(self, plate):
+        key = canonical(plate)
+        self.exact.setdefault(key, set()).add(plate)
+        for variant in _deletions(key):
+            self.deleted.setdefault(variant, set()).add(plate)
+
+    def candidates(self, plate):
+        key = canonical(plate)
+        found = set(self.exact.get(key, ())) | set(self.deleted.get(key, ())) # Aynı / bir karakter eksik okunmuş
+        for variant in _deletions(key):
+            found.update(self.exact.get(variant, ())) # Bir karakter fazla okunmuş
+            found.update(self.deleted.get(variant, ())) # Bir karakter farklı okunmuş
+        return found
+
+    def closest(self, plate, threshold):
+        """
+        (en yakın plaka, uzaklık) döner. Eşik içinde aday yoksa ya da en yakın iki aday eşit uzaklıktaysa
+        (hangi araç olduğu belirsiz) None döner.
+        """
+        scored = sorted((plate_distance(plate, candidate), candidate) for candidate in self.candidates(plate))
+        scored = [(distance, candidate) for distance, candidate in scored if distance <= threshold]
+        if not scored:
+            return None
+        if len(scored) > 1 and scored[1][0] - scored[0][0] < 1e-9:
+            return None
+        distance, candidate = scored[0]
+        return candidate, round(distance, 2)
+
+    def __len__(self):
+        return sum(len(plates) for plates in self.exact.values())
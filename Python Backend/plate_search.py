@@ -0,0 +1,179 @@
+"""
+Kısmi plaka arama: "34*12", "34 ... 12", "ABC", "34AB?12" gibi desenlerle geçiş geçmişinde arama.
+
+Görülen her farklı plakanın karışıklık sınıfına indirgenmiş hali (plate_match.canonical: 0/O, 8/B ... aynı)
+başına ^ sonuna $ eklenip 2 ve 3 karakterlik parçalara (n-gram) bölünür ve plate_ngrams tablosunda tutulur.
+Log yazıcısı yeni plakaların parçalarını logla aynı transaction'da ekler. Arama üç adımdır:
+  1. Desendeki sabit parçaların n-gramlarının hepsini içeren plakalar indeksten bulunur (LIKE '%..%' taraması yok),
+  2. adaylar desene göre doğrulanır,
+  3. eşleşen plakaların logları plaka indeksiyle (ix_access_logs_plate_timestamp) sayfa sayfa getirilir.
+
+Var olan loglardan (ve arşivden) indeksi oluşturmak için (uygulama kapalıyken):
+    python plate_search.py --rebuild
+"""
+import argparse
+import re
+import time
+
+from sqlalchemy import func, insert, tuple_
+
+from archive import log_archive
+from database import SessionLocal, AccessLog, PlateNgram
+from plate_index import normalize_plate
+from plate_match import canonical, plate_distance
+
+SEARCH_MODES = ["auto", "prefix", "contains", "wildcard", "similar"]
+MIN_SEARCH_CHARS = 2 # Desende en az bu kadar harf / rakam olmalı
+MAX_MATCHED_PLATES = 2000 # Daha fazla plaka eşleşirse arama daraltılmalı
+SIMILAR_THRESHOLD = 1.0 # similar modunda kabul edilen en büyük plate_distance
+
+
+def _padded(plate):
+    return f"^{canonical(plate)}$"
+
+
+def plate_ngrams(plate):
+    """Plakanın indekslenen 2 ve 3 karakterlik parçaları."""
+    key = _padded(plate)
+    return {key[i:i + n] for n in (2, 3) for i in range(len(key) - n + 1)}
+
+
+def index_plates(db, plates):
+    """
+    Daha önce indekslenmemiş plakaların n-gramlarını ekler, eklenen plaka sayısını döner. Commit çağıran tarafa aittir.
+    Plakanın indekste olup olmadığı ilk n-gramına (^ + ilk iki karakter) birincil anahtarla bakılarak anlaşılır.
+    """
+    plates = {plate for plate in plates if plate}
+    if not plates:
+        return 0
+
+    known = {row.plate_number for row in db.query(PlateNgram.plate_number)
+             .filter(tuple_(PlateNgram.gram, PlateNgram.plate_number).in_([(_padded(p)[:3], p) for p in plates]))}
+    new = plates - known
+    if new:
+        db.execute(insert(PlateNgram).prefix_with("OR IGNORE"),
+                   [{"gram": gram, "plate_number": plate} for plate in new for gram in plate_ngrams(plate)])
+    return len(new)
+
+
+def parse_pattern(text, mode = "auto"):
+    """
+    Arama metnini desene çevirir: "*" herhangi sayıda karakter, "?" (veya "_") tek karakter.
+    "34 ... 12" gibi noktalı yazım "*" sayılır, boşluk ve tireler silinir.
+    auto: desende * veya ? varsa wildcard, yoksa contains. prefix ve contains desene * ekler.
+    """
+    text = re.sub(r"[.…]+", "*", (text or "").upper()).replace("_", "?")
+    text = re.sub(r"\*+", "*", re.sub(r"[^A-Z0-9*?]", "", text))
+
+    if mode == "auto":
+        mode = "wildcard" if "*" in text or "?" in text else "contains"
+    if mode == "prefix":
+        text = text.rstrip("*") + "*"
+    elif mode == "contains":
+        text = "*" + text.strip("*") + "*"
+    return text
+
+
+def _pattern_grams(pattern):
+    """Desendeki sabit parçaların n-gramları. Desen başta / sonda sabitse ^ / $ da parçaya dahildir."""
+    padded = ("" if pattern.startswith("*") else "^") + pattern + ("" if pattern.endswith("*") else "$")
+    grams = set()
+    for part in re.split(r"[*?]", padded):
+        part = canonical(part)
+        if len(part) >= 3:
+            grams.update(part[i:i + 3] for i in range(len(part) - 2))
+        elif len(part) == 2:
+            grams.add(part)
+    return grams
+
+
+def _pattern_regex(pattern, fuzzy):
+    body = "".join(".*" if ch == "*" else "." if ch == "?" else re.escape(canonical(ch) if fuzzy else ch) for ch in pattern)
+    return re.compile(body)
+
+
+def _plates_with_grams(db, grams, need):
+    """En az need tanesini içeren plakalar."""
+    return [row.plate_number for row in db.query(PlateNgram.plate_number)
+            .filter(PlateNgram.gram.in_(grams))
+            .group_by(PlateNgram.plate_number)
+            .having(func.count() >= need)]
+
+
+def matching_plates(db, text, mode = "auto", fuzzy = True, threshold = SIMILAR_THRESHOLD):
+    """
+    Desene uyan, daha önce görülmüş plakalar (sıralı).
+    fuzzy: OCR karışıklıkları (0/O, 8/B ...) eşleşme sayılır, ör. "34*B12" deseni 34AC812 logunu da bulur.
+    similar: tam plaka verilir, plate_distance'ı threshold'u geçmeyen plakalar bulunur (bir eksik / farklı karakter).
+    Desen çok kısaysa ya da çok fazla plaka eşleşiyorsa ValueError.
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"mode {', '.join(SEARCH_MODES)} olmalı")
+
+    if mode == "similar":
+        plate = normalize_plate(text)
+        if len(plate) < MIN_SEARCH_CHARS + 1:
+            raise ValueError("Benzer plaka araması için plakanın tamamı yazılmalı")
+        key = _padded(plate)
+        grams = {key[i:i + 3] for i in range(len(key) - 2)}
+        # Bir karakter hatası en fazla 3 parçayı bozar
+        candidates = _plates_with_grams(db, grams, max(1, len(grams) - 3))
+        plates = [candidate for candidate in candidates if plate_distance(plate, candidate) <= threshold]
+    else:
+        pattern = parse_pattern(text, mode)
+        if sum(ch.isalnum() for ch in pattern) < MIN_SEARCH_CHARS:
+            raise ValueError(f"Aramada en az {MIN_SEARCH_CHARS} harf veya rakam olmalı")
+        grams = _pattern_grams(pattern)
+        if not grams:
+            raise ValueError("Aramada en az iki yan yana harf veya rakam olmalı")
+
+        regex = _pattern_regex(pattern, fuzzy)
+        candidates = _plates_with_grams(db, grams, len(grams))
+        plates = [candidate for candidate in candidates if regex.fullmatch(canonical(candidate) if fuzzy else candidate)]
+
+    if len(plates) > MAX_MATCHED_PLATES:
+        raise ValueError(f"{len(plates)} farklı plaka eşleşti, aramayı daraltın")
+    return sorted(plates)
+
+
+def rebuild_search_index(chunk_plates = 5000):
+    """İndeksi access_logs ve arşivdeki plakalardan baştan oluşturur."""
+    start = time.perf_counter()
+    db = SessionLocal()
+    try:
+        plates = {row.plate_number for row in db.query(AccessLog.plate_number).distinct()}
+        plates.update(row.plate_number for row in log_archive.iter_logs())
+
+        db.query(PlateNgram).delete()
+        plates = sorted(plate for plate in plates if plate)
+        for i in range(0, len(plates), chunk_plates):
+            index_plates(db, plates[i:i + chunk_plates])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    print(f"Plaka arama indeksi oluşturuldu: {len(plates)} plaka ({time.perf_counter() - start:.1f} sn)")
+    return len(plates)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Kısmi plaka arama")
+    parser.add_argument("--rebuild", action = "store_true", help = "İndeksi var olan loglardan yeniden oluştur")
+    parser.add_argument("--search", help = "Desene uyan plakaları listele, ör. '34*12'")
+    parser.add_argument("--mode", default = "auto", choices = SEARCH_MODES)
+    args = parser.parse_args()
+
+    from database import init_db
+
+    init_db()
+    if args.rebuild:
+        rebuild_search_index()
+    if args.search:
+        db = SessionLocal()
+        try:
+            print(matching_plates(db, args.search, args.mode))
+        finally:
+            db.close()
@@ -0,0 +1,203 @@
+"""
+Trafik istatistikleri: dakika / saat / gün dilimlerinde izinli ve izinsiz geçiş sayıları ve plaka başına sayaçlar.
+
+Sayaçlar log yazıcısı logları yazarken aynı transaction içinde artırılır, istatistik ekranı
+access_logs tablosunu taramadan sadece dilim sayısı kadar satır okur.
+
+Plaka sayaçları (en sık gelenler, tekrar gelen misafirler) tarih aralığına bölünmez, tüm zamanları kapsar.
+
+Var olan loglardan (arşiv dahil) sayaçları yeniden oluşturmak için (uygulama kapalıyken):
+    python rollups.py --backfill
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+
+from archive import log_archive
+from database import SessionLocal, AccessLog, TrafficRollup, PlateStat
+
+BUCKETS = ["minute", "hour", "day"]
+DEFAULT_WINDOWS = {"minute": timedelta(hours = 1), "hour": timedelta(days = 1), "day": timedelta(days = 30)}
+
+
+def bucket_start(timestamp, bucket):
+    """Zamanın içinde bulunduğu dilimin başlangıcı."""
+    if bucket == "minute":
+        return timestamp.replace(second = 0, microsecond = 0)
+    if bucket == "hour":
+        return timestamp.replace(minute = 0, second = 0, microsecond = 0)
+    return timestamp.replace(hour = 0, minute = 0, second = 0, microsecond = 0)
+
+
+class RollupBatch:
+    """Bir grup logun sayaçlara katkısı. Veritabanına tek seferde eklenir."""
+
+    def __init__(self):
+        self.traffic = {} # (dilim, başlangıç) -> [izinli, izinsiz]
+        self.plates = {} # plaka -> [ziyaret, izinli, izinsiz, ilk, son]
+
+    def add(self, plate_number, access_status, timestamp):
+        allowed = 1 if access_status else 0
+        for bucket in BUCKETS:
+            counts = self.traffic.setdefault((bucket, bucket_start(timestamp, bucket)), [0, 0])
+            counts[0] += allowed
+            counts[1] += 1 - allowed
+
+        stat = self.plates.get(plate_number)
+        if stat is None:
+            self.plates[plate_number] = [1, allowed, 1 - allowed, timestamp, timestamp]
+        else:
+            stat[0] += 1
+            stat[1] += allowed
+            stat[2] += 1 - allowed
+            stat[3] = min(stat[3], timestamp)
+            stat[4] = max(stat[4], timestamp)
+
+    def __len__(self):
+        return len(self.traffic) + len(self.plates)
+
+    def apply(self, db):
+        """Sayaçları upsert ile artırır. Commit çağıran tarafa aittir."""
+        if self.traffic:
+            stmt = insert(TrafficRollup)
+            stmt = stmt.on_conflict_do_update(
+                index_elements = ["bucket", "bucket_start"],
+                set_ = {
+                    "allowed": TrafficRollup.allowed + stmt.excluded.allowed,
+                    "denied": TrafficRollup.denied + stmt.excluded.denied,
+                },
+            )
+            db.execute(stmt, [{"bucket": bucket, "bucket_start": start, "allowed": a, "denied": d}
+                              for (bucket, start), (a, d) in self.traffic.items()])
+
+        if self.plates:
+            stmt = insert(PlateStat)
+            stmt = stmt.on_conflict_do_update(
+                index_elements = ["plate_number"],
+                set_ = {
+                    "visits": PlateStat.visits + stmt.excluded.visits,
+                    "allowed": PlateStat.allowed + stmt.excluded.allowed,
+                    "denied": PlateStat.denied + stmt.excluded.denied,
+                    "first_seen": func.min(PlateStat.first_seen, stmt.excluded.first_seen),
+                    "last_seen": func.max(PlateStat.last_seen, stmt.excluded.last_seen),
+                },
+            )
+            db.execute(stmt, [{"plate_number": plate, "visits": v, "allowed": a, "denied": d, "first_seen": first, "last_seen": last}
+                              for plate, (v, a, d, first, last) in self.plates.items()])
+
+
+def apply_log_rows(db, rows):
+    """Log yazıcısının eklediği satırları ({plate_number, access_status, timestamp}) sayaçlara işler."""
+    batch = RollupBatch()
+    for row in rows:
+        batch.add(row["plate_number"], row["access_status"], row["timestamp"])
+    batch.apply(db)
+
+
+def rebuild_rollups(chunk_rows = 50000):
+    """
+    Sayaç tablolarını arşivdeki ve access_logs'taki loglardan baştan oluşturur. Loglar parça parça okunur,
+    bellekte sadece dilim ve plaka sayısı kadar sayaç tutulur. Tablodan sadece arşiv sınırından yeni loglar okunur;
+    arşivlenip henüz silinmemiş satırlar iki kez sayılmaz.
+    """
+    start = time.perf_counter()
+    batch = RollupBatch()
+    rows = 0
+
+    for row in log_archive.iter_logs():
+        batch.add(row.plate_number, row.access_status, row.timestamp)
+        rows += 1
+    boundary = log_archive.boundary()
+
+    db = SessionLocal()
+    try:
+        query = db.query(AccessLog.plate_number, AccessLog.access_status, AccessLog.timestamp) \
+            .filter(AccessLog.timestamp.isnot(None))
+        if boundary is not None:
+            query = query.filter(AccessLog.timestamp >= boundary)
+        result = db.execute(query.statement.execution_options(stream_results = True, yield_per = chunk_rows))
+        for partition in result.partitions():
+            for plate_number, access_status, timestamp in partition:
+                batch.add(plate_number, access_status, timestamp)
+            rows += len(partition)
+
+        db.query(TrafficRollup).delete()
+        db.query(PlateStat).delete()
+        batch.apply(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    print(f"İstatistikler yeniden oluşturuldu: {rows} log, {len(batch.traffic)} dilim, {len(batch.plates)} plaka "
+          f"({time.perf_counter() - start:.1f} sn)")
+    return rows
+
+
+def traffic_stats(db, bucket = "hour", date_from = None, date_to = None, top = 10, repeat_min_visits = 2):
+    """
+    İstatistik ekranı verisi: dilim serisi, toplamlar, en sık gelen plakalar ve tekrar gelen misafirler.
+    Seri ve toplamlar date_from / date_to aralığındadır; plaka listeleri tüm zamanlardır ("plates_range").
+    Okunan satır sayısı dilim sayısı + 2 * top ile sınırlıdır.
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(f"Bilinmeyen dilim: {bucket}")
+
+    date_to = date_to or datetime.now()
+    date_from = date_from or date_to - DEFAULT_WINDOWS[bucket]
+
+    series = db.query(TrafficRollup.bucket_start, TrafficRollup.allowed, TrafficRollup.denied) \
+        .filter(TrafficRollup.bucket == bucket,
+                TrafficRollup.bucket_start >= bucket_start(date_from, bucket),
+                TrafficRollup.bucket_start < date_to) \
+        .order_by(TrafficRollup.bucket_start).all()
+
+    allowed = sum(row.allowed for row in series)
+    denied = sum(row.denied for row in series)
+
+    top_plates = db.query(PlateStat).order_by(PlateStat.visits.desc()).limit(top).all()
+    # Kayıtlı olmadığı halde tekrar tekrar gelen araçlar
+    repeat_guests = db.query(PlateStat).filter(PlateStat.denied >= repeat_min_visits) \
+        .order_by(PlateStat.denied.desc()).limit(top).all()
+
+    def plate_dict(stat):
+        return {"plate": stat.plate_number, "visits": stat.visits, "allowed": stat.allowed, "denied": stat.denied,
+                "first_seen": stat.first_seen, "last_seen": stat.last_seen}
+
+    return {
+        "bucket": bucket,
+        "from": date_from,
+        "to": date_to,
+        "series": [{"start": row.bucket_start, "allowed": row.allowed, "denied": row.denied} for row in series],
+        "totals": {
+            "allowed": allowed,
+            "denied": denied,
+            "allowed_ratio": round(allowed / (allowed + denied), 3) if allowed + denied else None,
+        },
+        "plates_range": "all_time", # Plaka sayaçları tarihe bölünmez
+        "top_plates": [plate_dict(stat) for stat in top_plates],
+        "repeat_guests": [plate_dict(stat) for stat in repeat_guests],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Trafik istatistikleri")
+    parser.add_argument("--backfill", action = "store_true", help = "Sayaçları var olan loglardan yeniden oluştur")
+    args = parser.parse_args()
+
+    from database import init_db
+
+    init_db()
+    if args.backfill:
+        rebuild_rollups()
+    else:
+        db = SessionLocal()
+        try:
+            print(traffic_stats(db)["totals"])
+        finally:
+            db.close()
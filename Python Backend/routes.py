@@ -1,4 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import APIRouter, Depends, HTTPException, Header, Response, status
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import List, Optional
@@ -6,10 +8,18 @@ from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, JSONResponse
+import metrics
 from ai import AccessControlSystem
-from database import AccessLog
-from database import get_db, User, Role, AllowedPlate
+from database import get_db, SessionLocal, User, Role, AllowedPlate
+from auth_cache import principal_cache, principal_from_user
+from plate_index import allowlist_index, normalize_plate
+from inference_service import INFERENCE_MODE, RemoteAccessControl, notify_allowlist_changed
+from events import event_bus, sse_stream
+from pipeline import stream_profile
+from log_queries import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, iter_log_export, log_page
+from plate_search import matching_plates
+from rollups import BUCKETS, traffic_stats
 
 router = APIRouter()
 
@@ -17,9 +27,13 @@ router = APIRouter()
 SECRET_KEY = "tahmin edilmesi zor bir string" 
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
+LOGIN_WORKERS = 2 # bcrypt doğrulaması için ayrı thread sayısı
+LOGIN_MAX_PENDING = 32 # Sırada bekleyen giriş sayısı bunu aşarsa 429
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
+login_pool = ThreadPoolExecutor(max_workers = LOGIN_WORKERS, thread_name_prefix = "login")
+login_slots = asyncio.Semaphore(LOGIN_MAX_PENDING)
 
 # --- 1. VERİ ŞEMALARI (Pydantic Models) ---
 # Gelen ve giden verinin kuralları burada belirlenir
@@ -47,6 +61,7 @@ class AdminLogResponse(BaseModel):
     vlm_description: str
     timestamp: datetime
     related_user: Optional[str] = "Bilinmiyor" # İlişkili kullanıcı adı
+    match_distance: Optional[float] = None # İzinli plakaya uzaklık (0: tam eşleşme)
 
 class AdminPlateResponse(BaseModel):
     id: int
@@ -65,10 +80,26 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm = ALGORITHM)
     return encoded_jwt
 
+def authenticate_user(username, password):
+    """Kullanıcıyı bulur ve şifresini doğrular. Başarılıysa (kullanıcı adı, rol id, rol adı), değilse None."""
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == username).first()
+        if not user or not verify_password(password, user.password_hash):
+            return None
+        return user.username, user.role_id, user.role.name
+    finally:
+        db.close()
+
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     """
     Gelen istekteki Token'ı kontrol eder, geçerliyse kullanıcıyı bulur.
+    Daha önce doğrulanmış token için kullanıcı ve rolü önbellekten döner (auth_cache), veritabanına gidilmez.
     """
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
     credentials_exception = HTTPException(
         status_code = status.HTTP_401_UNAUTHORIZED,
         detail = "Gecersiz kimlik bilgisi",
@@ -86,26 +117,39 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     user = db.query(User).filter(User.username == username).first()
     if user is None:
         raise credentials_exception
-    return user
+
+    principal = principal_from_user(user)
+    principal_cache.put(token, principal, payload.get("exp"))
+    return principal
 
 # API uçları
 @router.post("/login", response_model = Token)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == form_data.username).first()
-    
-    if not user or not verify_password(form_data.password, user.password_hash):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
+    """
+    bcrypt bilerek yavaştır. Doğrulama event loop'u ve diğer isteklerin thread havuzunu meşgul etmesin diye
+    LOGIN_WORKERS thread'lik ayrı havuzda yapılır; sırada LOGIN_MAX_PENDING'den fazla giriş varsa 429 döner.
+    """
+    if login_slots.locked():
+        raise HTTPException(status_code = 429, detail = "Cok fazla giris denemesi, biraz sonra tekrar deneyin")
+
+    async with login_slots:
+        user = await asyncio.get_running_loop().run_in_executor(
+            login_pool, authenticate_user, form_data.username, form_data.password)
+
+    if user is None:
         raise HTTPException(
             status_code = status.HTTP_401_UNAUTHORIZED,
             detail = "Kullanici adi veya sifre hatali",
             headers = {"WWW-Authenticate": "Bearer"},
         )
     
-    access_token = create_access_token(data = {"sub": user.username, "role": user.role_id})
+    username, role_id, role_name = user
+    access_token = create_access_token(data = {"sub": username, "role": role_id})
     
     return {
         "access_token": access_token, 
         "token_type": "bearer", 
-        "role": user.role.name 
+        "role": role_name 
     }
 
 @router.get("/users/me")
@@ -121,7 +165,9 @@ def add_plate(plate: PlateCreate, db: Session = Depends(get_db), current_user: U
     Yeni plaka ekler. (Sadece giriş yapmış kullanıcı ekleyebilir)
     """
 
-    clean_plate = plate.plate_number.upper().replace(" ", "") # Plakayı büyük harfe çevirip boşlukları sil
+    clean_plate = normalize_plate(plate.plate_number) # Plakayı büyük harfe çevirip boşluk ve işaretleri sil
+    if not clean_plate:
+        raise HTTPException(status_code = 400, detail = "Geçersiz plaka.")
     
     # Aynı plaka daha önce eklenmiş mi?
     existing_plate = db.query(AllowedPlate).filter(AllowedPlate.plate_number == clean_plate).first()
@@ -136,8 +182,31 @@ def add_plate(plate: PlateCreate, db: Session = Depends(get_db), current_user: U
     db.add(new_plate)
     db.commit()
     db.refresh(new_plate)
+
+    allowlist_index.add(clean_plate, current_user.id, current_user.username) # Kapı kararı hemen güncellensin
+    notify_allowlist_changed() # Ayrı çıkarım süreci varsa o da güncellensin
     return new_plate
 
+@router.delete("/plates/{plate_id}")
+def delete_plate(plate_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """
+    Plakayı siler. Site sakini sadece kendi eklediği plakayı, admin ve güvenlik tüm plakaları silebilir.
+    """
+    plate = db.query(AllowedPlate).filter(AllowedPlate.id == plate_id).first()
+    if plate is None:
+        raise HTTPException(status_code = 404, detail = "Plaka bulunamadı.")
+
+    if current_user.role.name not in ["Admin", "Security"] and plate.user_id != current_user.id:
+        raise HTTPException(status_code = 403, detail = "Yetkiniz yok")
+
+    plate_number = plate.plate_number
+    db.delete(plate)
+    db.commit()
+
+    allowlist_index.remove(normalize_plate(plate_number))
+    notify_allowlist_changed()
+    return {"detail": "Plaka silindi."}
+
 @router.get("/plates/", response_model =List[PlateResponse])
 def read_plates(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     """
@@ -153,49 +222,203 @@ def read_plates(db: Session = Depends(get_db), current_user: User = Depends(get_
         return db.query(AllowedPlate).filter(AllowedPlate.user_id == current_user.id).all()
 
 try:
-    ai_system = AccessControlSystem()
+    if INFERENCE_MODE == "external":
+        ai_system = RemoteAccessControl() # Kamera ve modeller inference_service.py sürecinde
+    else:
+        ai_system = AccessControlSystem(lazy = True) # Modeller açılışta arka planda yüklenir (app.py lifespan)
 except Exception as e:
     print(f"AI Sistem başlatılamadı: {e}")
     ai_system = None
 
+@router.get("/health/live")
+def liveness():
+    """
+    API ayakta mı? Modellerin yüklenmesini beklemez.
+    """
+    return {"status": "ok"}
+
+@router.get("/health/ready")
+def readiness():
+    """
+    Yapay zeka modelleri hazır mı? Model başına yükleme durumu ve süresini döner.
+    Hazır değilse 503 döner.
+    """
+    if ai_system is None:
+        return JSONResponse(status_code = 503, content = {"ready": False, "error": "AI Sistemi aktif degil"})
+
+    status_code = 200 if ai_system.is_ready() else 503
+    return JSONResponse(status_code = status_code, content = ai_system.readiness())
+
 @router.get("/video_feed")
-def video_feed():
+async def video_feed(camera: int = 0, tier: str = "full", width: Optional[int] = None, quality: Optional[int] = None,
+               fps: Optional[float] = None):
+    """
+    Tarayıcıda canlı yayın izlemek için endpoint. camera parametresi ile kapı kamerası seçilir.
+    tier (full / high / medium / low) hazır çözünürlük, JPEG kalitesi ve FPS seçer; width, quality ve fps ile değiştirilebilir.
+    Aynı ayarları isteyen izleyiciler aynı kodlanmış kareyi alır.
+    """
+    if ai_system is None:
+        return {"error": "AI Sistemi aktif degil"}
+
+    try:
+        profile = stream_profile(tier, width, quality, fps)
+    except ValueError as e:
+        raise HTTPException(status_code = 400, detail = str(e))
+
+    # Önce hazır mı: ayrı çıkarım servisinde kamera listesi servise bağlanınca öğrenilir
+    if not ai_system.is_ready():
+        raise HTTPException(status_code = 503, detail = "Yapay zeka modelleri yükleniyor")
+
+    if camera < 0 or camera >= len(ai_system.camera_sources):
+        raise HTTPException(status_code = 404, detail = "Kamera bulunamadı")
+
+    return StreamingResponse(ai_system.generate_frames(camera, profile), media_type = "multipart/x-mixed-replace; boundary=frame")
+
+@router.get("/events")
+async def gate_events(last_id: Optional[int] = None, last_event_id: Optional[str] = Header(default = None)):
+    """
+    Kapı olaylarını (plaka, izin durumu, sahip, araç tanımı, saat) Server-Sent Events ile anında gönderir.
+    Tarayıcı bağlantı kopunca Last-Event-ID ile yeniden bağlanır ve kaçırdığı olayları alır.
+    """
+    if last_id is None and last_event_id and last_event_id.isdigit():
+        last_id = int(last_event_id)
+
+    return StreamingResponse(sse_stream(event_bus, last_id), media_type = "text/event-stream",
+                             headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.get("/admin/ai-stats")
+def get_ai_stats(current_user: User = Depends(get_current_user)):
     """
-    Tarayıcıda canlı yayın izlemek için endpoint.
+    Yapay zeka tarafının çalışma istatistikleri (atlanan kareler, kuyruklar, VLM, olay akışı, kullanıcı önbelleği).
     """
+    if current_user.role.name not in ["Admin", "Security"]:
+        raise HTTPException(status_code = 403, detail = "Yetkiniz yok")
+
     if ai_system is None:
         return {"error": "AI Sistemi aktif degil"}
 
-    return StreamingResponse(ai_system.generate_frames(), media_type = "multipart/x-mixed-replace; boundary=frame")
+    return dict(ai_system.stats(), events = event_bus.stats(), auth = principal_cache.stats())
+
+@router.get("/metrics")
+def get_metrics(authorization: Optional[str] = Header(default = None)):
+    """
+    Prometheus metin formatında izleme verileri (aşama süreleri, kare / OCR / VLM sayaçları, kuyruklar, istek süreleri).
+    GUVENLIK_METRICS_TOKEN ayarlıysa "Authorization: Bearer <token>" ister, değilse açıktır.
+    """
+    if not metrics.authorized(authorization):
+        raise HTTPException(status_code = 401, detail = "Geçersiz metrik anahtarı")
+    return Response(metrics.render(), media_type = metrics.CONTENT_TYPE)
 
 @router.get("/admin/logs", response_model = List[AdminLogResponse])
-def get_all_logs(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def get_all_logs(response: Response, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None,
+                 plate: Optional[str] = None, status: Optional[bool] = None,
+                 date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                 db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     """
-    Tüm geçiş loglarını getirir. Sadece Admin ve Security yetkisi olanlar görebilir.
+    Geçiş loglarını yeniden eskiye sayfa sayfa getirir. Sadece Admin ve Security yetkisi olanlar görebilir.
+    Sonraki sayfa varsa imleci X-Next-Cursor başlığında döner, ?cursor= ile istenir.
+    plate, status ve tarih aralığı (date_from dahil, date_to hariç) ile filtrelenebilir.
     """
     if current_user.role.name not in ["Admin", "Security"]:
         raise HTTPException(status_code = 403, detail = "Yetkiniz yok")
 
-    logs = db.query(AccessLog).order_by(AccessLog.timestamp.desc()).all()
-    
-    response_data = []
-    for log in logs:
-        user_name = "Misafir/Tanımsız"
-        if log.related_user_id:
-            user = db.query(User).filter(User.id == log.related_user_id).first()
-            if user:
-                user_name = user.username
-        
-        response_data.append(AdminLogResponse(
-            id = log.id,
-            plate_number = log.plate_number,
-            access_status = log.access_status,
-            vlm_description = log.vlm_description,
-            timestamp = log.timestamp,
-            related_user = user_name
-        ))
-        
-    return response_data
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise HTTPException(status_code = 400, detail = f"limit 1-{MAX_PAGE_SIZE} arasında olmalı")
+
+    try:
+        rows, next_cursor = log_page(db, limit = limit, cursor = cursor, plate = plate, status = status,
+                                     date_from = date_from, date_to = date_to)
+    except ValueError:
+        raise HTTPException(status_code = 400, detail = "Geçersiz imleç")
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    return [admin_log_response(row) for row in rows]
+
+@router.get("/admin/logs/search", response_model = List[AdminLogResponse])
+def search_logs(response: Response, q: str, mode: str = "auto", fuzzy: bool = True,
+                limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None, status: Optional[bool] = None,
+                date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """
+    Plakanın bir kısmıyla geçiş loglarını arar: q=34*12, q=34 ... 12, q=ABC (içeren), mode=prefix, mode=similar.
+    fuzzy=true iken OCR karışıklıkları (0/O, 8/B) de eşleşir. /admin/logs gibi sayfalanır ve tarih / durum filtreleriyle birleşir.
+    Eşleşen farklı plaka sayısı X-Matched-Plates başlığında döner.
+    """
+    if current_user.role.name not in ["Admin", "Security"]:
+        raise HTTPException(status_code = 403, detail = "Yetkiniz yok")
+
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise HTTPException(status_code = 400, detail = f"limit 1-{MAX_PAGE_SIZE} arasında olmalı")
+
+    try:
+        plates = matching_plates(db, q, mode, fuzzy)
+    except ValueError as e:
+        raise HTTPException(status_code = 400, detail = str(e))
+
+    response.headers["X-Matched-Plates"] = str(len(plates))
+    if not plates:
+        return []
+
+    try:
+        rows, next_cursor = log_page(db, limit = limit, cursor = cursor, plates = plates, status = status,
+                                     date_from = date_from, date_to = date_to)
+    except ValueError:
+        raise HTTPException(status_code = 400, detail = "Geçersiz imleç")
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    return [admin_log_response(row) for row in rows]
+
+def admin_log_response(row):
+    return AdminLogResponse(
+        id = row.id,
+        plate_number = row.plate_number,
+        access_status = row.access_status,
+        vlm_description = row.vlm_description,
+        timestamp = row.timestamp,
+        related_user = row.username or "Misafir/Tanımsız",
+        match_distance = row.match_distance
+    )
+
+@router.get("/admin/logs/export")
+def export_logs(format: str = "csv", gzip: bool = False, plate: Optional[str] = None, status: Optional[bool] = None,
+                date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                current_user: User = Depends(get_current_user)):
+    """
+    Logları CSV veya NDJSON dosyası olarak akış halinde indirir (denetim için aylarca veri).
+    Satırlar veritabanından parça parça okunup gönderilir, bellek kullanımı satır sayısından bağımsızdır.
+    gzip=true ile çıktı sıkıştırılır.
+    """
+    if current_user.role.name not in ["Admin", "Security"]:
+        raise HTTPException(status_code = 403, detail = "Yetkiniz yok")
+
+    if format not in ["csv", "ndjson"]:
+        raise HTTPException(status_code = 400, detail = "format csv veya ndjson olmalı")
+
+    filename = f"gecis_loglari.{format}" + (".gz" if gzip else "")
+    media_type = "application/gzip" if gzip else ("text/csv" if format == "csv" else "application/x-ndjson")
+
+    chunks = iter_log_export(format, compress = gzip, plate = plate, status = status, date_from = date_from, date_to = date_to)
+    return StreamingResponse(chunks, media_type = media_type,
+                             headers = {"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@router.get("/admin/stats")
+def get_traffic_stats(bucket: str = "hour", date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                      top: int = 10, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """
+    Yönetici paneli istatistikleri: dakika / saat / gün bazında izinli ve izinsiz geçişler,
+    en sık gelen plakalar ve tekrar gelen misafirler (tüm zamanlar). Log tablosu taranmaz, sayaç tablolarından okunur.
+    """
+    if current_user.role.name not in ["Admin", "Security"]:
+        raise HTTPException(status_code = 403, detail = "Yetkiniz yok")
+
+    if bucket not in BUCKETS:
+        raise HTTPException(status_code = 400, detail = f"bucket {', '.join(BUCKETS)} olmalı")
+
+    return traffic_stats(db, bucket, date_from, date_to, top = max(1, min(top, 100)))
 
 @router.get("/admin/plates", response_model = List[AdminPlateResponse])
 def get_all_plates_detail(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
@@ -219,4 +442,14 @@ def get_all_plates_detail(db: Session = Depends(get_db), current_user: User = De
             owner_username = owner_name
         ))
         
-    return response_data
\ No newline at end of file
+    return response_data
+
+@router.get("/admin/allowlist")
+def get_allowlist_stats(current_user: User = Depends(get_current_user)):
+    """
+    Bellekteki izinli plaka listesinin durumunu (isabet, ıskalama, yeniden yükleme) döner.
+    """
+    if current_user.role.name not in ["Admin", "Security"]:
+        raise HTTPException(status_code = 403, detail = "Yetkiniz yok")
+
+    return allowlist_index.stats()
@@ -0,0 +1,73 @@
+"""
+Kare işleme aşamalarının süre ölçümü.
+
+process_batch her aşamayı ayrı ölçer: hareket kontrolü, araç tespiti, takip, plaka tespiti, OCR, oylama,
+kapı kararı (izin kontrolü + log kuyruğu + olay yayını) ve VLM kuyruğuna bırakma. Her aşamanın son window ölçümü
+bellekte tutulur, yüzdelikler (p50 / p95 / p99) bunlardan hesaplanır. Toplam süre ve çağrı sayısı baştan beri tutulur.
+
+time_to_plate aşama değil araç başına ölçümdür: aracın ilk görüldüğü kare ile plakasının kesinleşip
+kararın verildiği kare arasındaki süre (kare zamanıyla). vlm_describe da kare dışında, VLM worker'larında
+deneme başına ölçülür.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+STAGES = ["motion", "vehicle_detect", "tracking", "plate_detect", "ocr", "voting", "decision", "vlm_submit", "batch"]
+
+
+class StageTimer:
+
+    def __init__(self, window = 1024):
+        self.window = window
+        self.lock = threading.Lock()
+        self.listeners = [] # (aşama, saniye) ile çağrılır, ör. izleme histogramları
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.samples = {}
+            self.totals = {}
+            self.counts = {}
+
+    def record(self, stage, seconds):
+        with self.lock:
+            samples = self.samples.get(stage)
+            if samples is None:
+                samples = self.samples[stage] = deque(maxlen = self.window)
+                self.totals[stage] = 0.0
+                self.counts[stage] = 0
+            samples.append(seconds)
+            self.totals[stage] += seconds
+            self.counts[stage] += 1
+        for listener in self.listeners:
+            listener(stage, seconds)
+
+    @contextmanager
+    def measure(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def percentiles(self, stage, points = (50, 95, 99)):
+        """Son ölçümlerin yüzdelikleri (saniye). Ölçüm yoksa boş sözlük."""
+        with self.lock:
+            values = sorted(self.samples.get(stage, ()))
+        if not values:
+            return {}
+        return {p: values[min(len(values) - 1, int(len(values) * p / 100))] for p in points}
+
+    def summary(self):
+        """Aşama başına çağrı sayısı, ortalama ve yüzdelikler (ms)."""
+        result = {}
+        for stage in list(self.samples):
+            points = self.percentiles(stage)
+            result[stage] = {
+                "calls": self.counts[stage],
+                "mean_ms": round(self.totals[stage] / self.counts[stage] * 1000, 3),
+                **{f"p{p}_ms": round(value * 1000, 3) for p, value in points.items()},
+            }
+        return result
@@ -0,0 +1,66 @@
+"""
+Hareket kontrolü testleri: durgun sahnede takipte araç olsa da tespit her karede çalışmamalı.
+
+Çalıştırmak için:
+    python -m unittest test_motion_gating
+"""
+import os
+import unittest
+from types import SimpleNamespace
+
+os.environ.setdefault("GUVENLIK_DB_URL", "sqlite:///file:test_motion_gating?mode=memory&cache=shared&uri=true")
+
+import numpy as np
+
+from ai import STILL_DETECT_INTERVAL, AccessControlSystem
+
+FPS = 25.0
+
+
+class CountingVehicleModel:
+    """Her karede aynı yerde duran tek bir araç döner, kaç kare işlendiğini sayar."""
+
+    def __init__(self):
+        self.frames = 0
+
+    def __call__(self, frames, **kwargs):
+        self.frames += len(frames)
+        box = SimpleNamespace(xyxy = [(200, 150, 440, 300)], conf = [0.9])
+        return [SimpleNamespace(boxes = [box]) for _ in frames]
+
+
+def no_plates(crops, **kwargs):
+    return [SimpleNamespace(boxes = []) for _ in crops]
+
+
+class StaticSceneTest(unittest.TestCase):
+
+    def setUp(self):
+        self.system = AccessControlSystem(camera_sources = [], lazy = True, use_vlm = False)
+        self.system.vehicle_model = CountingVehicleModel()
+        self.system.vehicle_imgsz = None
+        self.system.plate_model = no_plates
+        self.frame = np.full((360, 640, 3), 90, dtype = np.uint8)
+        self.frame[150:300, 200:440] = (40, 40, 200) # Park etmiş araç
+
+    def play(self, seconds, start = 1_800_000_000.0):
+        for n in range(int(seconds * FPS)):
+            self.system.process_batch([self.frame.copy()], [0], timestamps = [start + n / FPS], draw = False)
+
+    def test_parked_vehicle_stops_detector(self):
+        self.play(10)
+        state = self.system.get_camera_state(0)
+        model = self.system.vehicle_model
+
+        self.assertEqual(len(state.tracker.tracks), 1) # Araç takipte kalır
+        # İlk karede hareket var sayılır (hold_seconds boyunca), sonra STILL_DETECT_INTERVAL'da bir
+        self.assertLessEqual(model.frames, state.motion_gate.hold_seconds * FPS + 10 / STILL_DETECT_INTERVAL + 1)
+        self.assertGreater(state.skipped_frames, 10 * FPS / 2)
+
+        before = model.frames
+        self.play(5, start = 1_800_000_010.0)
+        self.assertLessEqual(model.frames - before, 5 / STILL_DETECT_INTERVAL + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+"""
+İzinli plaka eşleştirme testleri.
+
+Çalıştırmak için:
+    python -m unittest test_plate_match
+"""
+import os
+import unittest
+
+os.environ.setdefault("GUVENLIK_DB_URL", "sqlite:///file:test_plate_match?mode=memory&cache=shared&uri=true")
+
+from ai import PLATE_INDEL_THRESHOLD, PLATE_MATCH_THRESHOLD
+from database import SessionLocal, AllowedPlate, User, init_db
+from plate_index import AllowlistIndex
+from plate_match import INDEL_COST, match_threshold
+
+
+class AllowlistMatchTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        init_db()
+        db = SessionLocal()
+        try:
+            user = User(username = "test_plate_match")
+            db.add(user)
+            db.flush()
+            db.add_all([AllowedPlate(plate_number = plate, user_id = user.id) for plate in ["34ABC123", "06AB1234", "34OB012"]])
+            db.commit()
+        finally:
+            db.close()
+        cls.index = AllowlistIndex()
+
+    def match(self, plate):
+        return self.index.match(plate, PLATE_MATCH_THRESHOLD, PLATE_INDEL_THRESHOLD)
+
+    def test_default_threshold_below_indel_cost(self):
+        self.assertLess(PLATE_MATCH_THRESHOLD, INDEL_COST)
+
+    def test_missing_character_is_another_plate(self):
+        # 34ABC12 de geçerli bir plaka: 34ABC123'ün eksik okunmuşu sayılmaz
+        self.assertIsNone(self.match("34ABC12"))
+        self.assertIsNone(self.match("06AB123"))
+
+    def test_extra_character_is_another_plate(self):
+        self.assertIsNone(self.match("34ABC1234"))
+
+    def test_confusable_characters_are_forgiven(self):
+        self.assertEqual(self.match("34OB0I2")[2], "34OB012")
+        self.assertEqual(self.match("06A81234")[2], "06AB1234")
+
+    def test_indel_only_for_layout_failures(self):
+        self.assertLess(match_threshold("34ABC12", 0.8, 0.8), INDEL_COST)
+        self.assertGreaterEqual(match_threshold("34ABCXY12", PLATE_MATCH_THRESHOLD, PLATE_INDEL_THRESHOLD), INDEL_COST)
+
+
+if __name__ == "__main__":
+    unittest.main()
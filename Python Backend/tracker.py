@@ -0,0 +1,150 @@
+from collections import Counter, deque
+
+
+def box_iou(a, b):
+    """İki kutunun (x1, y1, x2, y2) kesişim / birleşim oranı."""
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0, ix2 - ix1) * max(0, iy2 - iy1)
+    if inter == 0:
+        return 0.0
+    area_a = (a[2] - a[0]) * (a[3] - a[1])
+    area_b = (b[2] - b[0]) * (b[3] - b[1])
+    return inter / float(area_a + area_b - inter)
+
+
+class Track:
+    """
+    Takip edilen tek bir araç. Plaka oylaması her aracın kendi geçmişinde yapılır,
+    böylece kadrajdaki iki aracın okumaları birbirine karışmaz.
+    """
+
+    def __init__(self, track_id, box, conf, now, min_votes = 3):
+        self.track_id = track_id
+        self.box = box
+        self.conf = conf
+        self.first_seen = now
+        self.last_seen = now
+        self.hits = 1
+        self.min_votes = min_votes
+
+        self.plate_history = deque(maxlen = 20)
+        self.stable_plate = None
+        self.mismatches = 0 # Kesinleşen plakadan farklı art arda okuma sayısı
+        self.plate_box = None # Araç kırpıntısına göre son plaka kutusu
+        self.decided_plate = None # Bu araç için kapı kararı verilen son plaka
+        self.suppressed_plate = None # Bekleme süresi yüzünden karar verilmeyen plaka
+
+        self.ocr_calls = 0
+        self.last_ocr_at = None
+        self.ocr_candidate = None # (kalite puanı, plaka görüntüsü), bir sonraki OCR için en iyi aday
+
+    def add_reading(self, plate_text, max_mismatches = 2):
+        """
+        Yeni OCR okumasını oylamaya ekler. Kesinleşen plakadan art arda max_mismatches kez
+        farklı okuma gelirse plaka geçersiz sayılır ve oylama yeniden başlar.
+        """
+        if self.stable_plate and plate_text != self.stable_plate:
+            self.mismatches += 1
+            if self.mismatches < max_mismatches:
+                return
+            self.plate_history.clear()
+            self.stable_plate = None
+
+        self.mismatches = 0
+        self.plate_history.append(plate_text)
+        best = self.best_plate()
+        if best:
+            self.stable_plate = best
+
+    def leading_votes(self):
+        """(en çok okunan plaka, oy sayısı)"""
+        if not self.plate_history:
+            return None, 0
+        return Counter(self.plate_history).most_common(1)[0]
+
+    def best_plate(self):
+        """Geçmişte en az min_votes kez okunmuş en yaygın plaka."""
+        plate, count = self.leading_votes()
+        if count >= self.min_votes:
+            return plate
+        return None
+
+    def has_confident_plate(self):
+        return self.stable_plate is not None
+
+
+class VehicleTracker:
+    """
+    IoU tabanlı çoklu araç takibi (ByteTrack benzeri iki aşamalı eşleştirme).
+
+    1. Yüksek güvenli tespitler mevcut araçlarla eşleştirilir.
+    2. Eşleşmeyen araçlar düşük güvenli tespitlerle eşleştirilir (kısmen kapanan araç kaybolmasın).
+    3. Eşleşmeyen yüksek güvenli tespitler yeni araç olarak açılır.
+
+    max_age saniye boyunca görülmeyen araçlar silinir (eski 3 saniyelik hafıza temizliği).
+    """
+
+    def __init__(self, iou_threshold = 0.3, high_conf = 0.5, max_age = 3.0):
+        self.iou_threshold = iou_threshold
+        self.high_conf = high_conf
+        self.max_age = max_age
+        self.tracks = []
+        self.next_id = 1
+
+    def _match(self, tracks, detections):
+        """Açgözlü IoU eşleştirmesi. (eşleşmeler, eşleşmeyen araçlar, eşleşmeyen tespitler) döner."""
+        pairs = []
+        for ti, track in enumerate(tracks):
+            for di, (box, _) in enumerate(detections):
+                iou = box_iou(track.box, box)
+                if iou >= self.iou_threshold:
+                    pairs.append((iou, ti, di))
+        pairs.sort(reverse = True)
+
+        matched_tracks, matched_dets, matches = set(), set(), []
+        for _, ti, di in pairs:
+            if ti in matched_tracks or di in matched_dets:
+                continue
+            matched_tracks.add(ti)
+            matched_dets.add(di)
+            matches.append((tracks[ti], detections[di]))
+
+        unmatched_tracks = [t for i, t in enumerate(tracks) if i not in matched_tracks]
+        unmatched_dets = [d for i, d in enumerate(detections) if i not in matched_dets]
+        return matches, unmatched_tracks, unmatched_dets
+
+    def update(self, detections, now):
+        """
+        detections: [(kutu, güven), ...]
+        Bu karede görülen araçları döner.
+        """
+        high = [d for d in detections if d[1] >= self.high_conf]
+        low = [d for d in detections if d[1] < self.high_conf]
+
+        matches, remaining_tracks, new_dets = self._match(self.tracks, high)
+        low_matches, _, _ = self._match(remaining_tracks, low)
+
+        seen = []
+        for track, (box, conf) in matches + low_matches:
+            track.box = box
+            track.conf = conf
+            track.last_seen = now
+            track.hits += 1
+            seen.append(track)
+
+        for box, conf in new_dets:
+            track = Track(self.next_id, box, conf, now)
+            self.next_id += 1
+            self.tracks.append(track)
+            seen.append(track)
+
+        self.expire(now)
+        return seen
+
+    def expire(self, now):
+        """Uzun süredir görülmeyen araçları siler ve döner."""
+        expired = [t for t in self.tracks if now - t.last_seen > self.max_age]
+        if expired:
+            self.tracks = [t for t in self.tracks if now - t.last_seen <= self.max_age]
+        return expired
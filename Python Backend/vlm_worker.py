@@ -0,0 +1,202 @@
+import random
+import threading
+import time
+from collections import deque
+
+import cv2
+from PIL import Image
+
+VLM_PROMPT = """
+Bu aracı kısaca tanımla. Sadece Marka, Model (tahmini), Renk ve Kasa Tipi (Sedan/Hatchback/SUV/Kamyon) bilgisini Türkçe olarak,
+virgülle ayırarak kısaca yaz.
+Örnek: Beyaz, Toyota Corolla, Sedan.
+"""
+
+VLM_PENDING_TEXT = "Analiz ediliyor..."
+VLM_FAILED_TEXT = "Tanımlanamadı"
+VLM_CANCELLED_TEXT = "VLM analizi yapılamadı" # Kapanışta kuyrukta kalan işler
+
+
+class GeminiBackend:
+    """
+    Google Gemini ile araç tanımlama.
+    """
+
+    def __init__(self, api_key, model_name = "gemini-2.5-flash"):
+        import google.generativeai as genai
+        from google.api_core.exceptions import DeadlineExceeded
+
+        genai.configure(api_key = api_key)
+        self.model = genai.GenerativeModel(model_name)
+        self.deadline_error = DeadlineExceeded
+
+    def describe(self, vehicle_img_array, timeout = None):
+        rgb_img = cv2.cvtColor(vehicle_img_array, cv2.COLOR_BGR2RGB) # BGR - RGB dönüşümü
+        pil_img = Image.fromarray(rgb_img) # Numpy Array - PIL Image
+
+        request_options = {"timeout": timeout} if timeout else None
+        try:
+            response = self.model.generate_content([VLM_PROMPT, pil_img], request_options = request_options)
+        except self.deadline_error as e: # İstemci zaman aşımı; havuz bunu TimeoutError olarak sayar
+            raise TimeoutError(str(e)) from e
+        return response.text.strip()
+
+
+class FakeVLMBackend:
+    """
+    Ağ bağlantısı olmadan test ve benchmark için sahte VLM.
+    Gecikme ve hata oranı ayarlanabilir.
+    """
+
+    def __init__(self, latency = 0.5, jitter = 0.1, failure_rate = 0.0, seed = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def describe(self, vehicle_img_array, timeout = None):
+        with self.lock:
+            self.calls += 1
+            delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+            fail = self.random.random() < self.failure_rate
+
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError("Sahte VLM zaman aşımı")
+
+        time.sleep(delay)
+        if fail:
+            raise RuntimeError("Sahte VLM hatası")
+
+        height, width = vehicle_img_array.shape[:2]
+        return f"Beyaz, Test Araç ({width}x{height}), Sedan"
+
+
+class VLMWorkerPool:
+    """
+    Araç tanımlama işlerini arka planda yürütür.
+
+    Ana döngü sadece işi kuyruğa bırakır, beklemez. Sonuç geldiğinde on_result(log_id, açıklama)
+    çağrılır ve log kaydı sonradan güncellenir. Kuyruk dolarsa en eski iş atılır.
+    Eş zamanlı istek sayısı worker sayısı ile sınırlıdır. Durdurulurken kuyrukta kalan işlerin logları
+    VLM_CANCELLED_TEXT ile kapatılır, "Analiz ediliyor..." olarak kalmaz.
+    """
+
+    def __init__(self, backend, on_result, workers = 2, queue_size = 16, timeout = 8.0, retries = 2, backoff = 0.5,
+                 timer = None):
+        self.backend = backend
+        self.timer = timer # Verilirse her deneme süresi "vlm_describe" aşaması olarak kaydedilir (StageTimer)
+        self.on_result = on_result
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+
+        self.queue_size = queue_size
+        self.jobs = deque()
+        self.cond = threading.Condition()
+        self.stop_event = threading.Event()
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self.dropped = 0
+        self.cancelled = 0
+        self.timeouts = 0
+
+        self.threads = []
+        for i in range(workers):
+            thread = threading.Thread(target = self._worker_loop, name = f"vlm-worker-{i}", daemon = True)
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, log_id, vehicle_img_array):
+        """İşi kuyruğa ekler ve hemen döner."""
+        dropped_job = None
+        with self.cond:
+            if len(self.jobs) >= self.queue_size:
+                dropped_job = self.jobs.popleft()
+                self.dropped += 1
+            self.jobs.append((log_id, vehicle_img_array))
+            self.submitted += 1
+            self.cond.notify()
+
+        if dropped_job is not None:
+            self._deliver(dropped_job[0], VLM_FAILED_TEXT)
+
+    def pending(self):
+        return len(self.jobs)
+
+    def stop(self, timeout = 2.0):
+        self.stop_event.set()
+        with self.cond:
+            self.cond.notify_all()
+        for thread in self.threads:
+            thread.join(timeout)
+
+        with self.cond:
+            remaining = list(self.jobs)
+            self.jobs.clear()
+            self.cancelled += len(remaining)
+        for log_id, _ in remaining:
+            self._deliver(log_id, VLM_CANCELLED_TEXT)
+
+    def _next_job(self):
+        with self.cond:
+            self.cond.wait_for(lambda: self.jobs or self.stop_event.is_set(), 0.5)
+            if self.stop_event.is_set() or not self.jobs:
+                return None
+            return self.jobs.popleft()
+
+    def _worker_loop(self):
+        while not self.stop_event.is_set():
+            job = self._next_job()
+            if job is None:
+                continue
+
+            log_id, vehicle_img_array = job
+            self._deliver(log_id, self._describe_with_retry(vehicle_img_array))
+
+    def _describe_with_retry(self, vehicle_img_array):
+        for attempt in range(self.retries + 1):
+            start = time.perf_counter()
+            try:
+                description = self.backend.describe(vehicle_img_array, timeout = self.timeout)
+                self.completed += 1
+                return description
+
+            except TimeoutError:
+                self.timeouts += 1
+            except Exception as e:
+                print(f"VLM Analizinde Hata: {e}")
+            finally:
+                if self.timer is not None:
+                    self.timer.record("vlm_describe", time.perf_counter() - start)
+
+            if attempt < self.retries:
+                self.retried += 1
+                if self.stop_event.wait(self.backoff * (2 ** attempt)): # Üstel bekleme
+                    break
+
+        self.failed += 1
+        return VLM_FAILED_TEXT
+
+    def _deliver(self, log_id, description):
+        try:
+            self.on_result(log_id, description)
+        except Exception as e:
+            print(f"VLM sonucu kaydedilemedi: {e}")
+
+    def stats(self):
+        return {
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "dropped": self.dropped,
+            "cancelled": self.cancelled,
+            "timeouts": self.timeouts,
+            "pending": self.pending(),
+        }